@@ -8,8 +8,10 @@ import sys
 import json
 import os
 from flow.core.experiment import Experiment
+from flow.core.metrics import FleetMetrics, SteadyState
 
 from flow.core.params import AimsunParams
+from flow.utils.catalog import write_catalog
 from flow.utils.rllib import FlowParamsEncoder
 
 from exp_configs.non_rl.exp_ring import get_ring_params
@@ -52,6 +54,20 @@ def parse_args(args):
         action='store_true',
         help='Specifies whether to generate an emission file from the '
              'simulation.')
+    parser.add_argument(
+        '--callables_interval', type=int, default=1,
+        help='Number of steps between two calls of the custom callables of '
+             'the experiment configuration. Defaults to 1.')
+    parser.add_argument(
+        '--metrics',
+        action='store_true',
+        help='Specifies whether to compute statistics of the speeds, headways '
+             'and accelerations of the vehicles during the simulation.')
+    parser.add_argument(
+        '--early_stop',
+        action='store_true',
+        help='Specifies whether to end every run once the speeds and '
+             'headways of the vehicles have reached a steady state.')
 
     return parser.parse_known_args(args)[0]
 
@@ -184,7 +200,19 @@ if __name__ == "__main__":
                     cls=FlowParamsEncoder, sort_keys=True, indent=4)
 
     # Create the experiment object.
-    exp = Experiment(flow_params, callables)
+    metrics = []
+    if flags.metrics:
+        metrics.append(FleetMetrics())
+    if flags.early_stop:
+        metrics.append(SteadyState())
+    exp = Experiment(flow_params, callables, metrics)
 
     # Run for the specified number of rollouts.
-    exp.run(flags.num_runs, convert_to_csv=flags.gen_emission)
+    exp.run(flags.num_runs, convert_to_csv=flags.gen_emission,
+            callables_interval=flags.callables_interval)
+
+    # Record the generated runs and their sweep parameters in the catalog.
+    if flags.gen_emission:
+        write_catalog(
+            os.path.join(flow_params['sim'].emission_path, "catalog.jsonl"),
+            exp.emission_files, flow_params, params=exp_kwargs)
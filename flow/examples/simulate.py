@@ -49,6 +49,10 @@ def parse_args(args):
         action='store_true',
         help='Specifies whether to generate an emission file from the '
              'simulation.')
+    parser.add_argument(
+        '--callables_interval', type=int, default=1,
+        help='Number of steps between two calls of the custom callables of '
+             'the experiment configuration. Defaults to 1.')
 
     return parser.parse_known_args(args)[0]
 
@@ -90,4 +94,5 @@ if __name__ == "__main__":
     exp = Experiment(flow_params, callables)
 
     # Run for the specified number of rollouts.
-    exp.run(flags.num_runs, convert_to_csv=flags.gen_emission)
+    exp.run(flags.num_runs, convert_to_csv=flags.gen_emission,
+            callables_interval=flags.callables_interval)
@@ -55,6 +55,12 @@ def parse_args(args):
     parser.add_argument(
         '--checkpoint_path', type=str, default=None,
         help='Directory with checkpoint to restore training from.')
+    parser.add_argument(
+        '--num_envs_per_worker', type=int, default=1,
+        help='Number of environments stepped in parallel by every RLlib '
+             'worker, each in its own process. Only single-agent '
+             'environments can be vectorized, and Python 3.8 or later is '
+             'required.')
 
     return parser.parse_known_args(args)[0]
 
@@ -89,9 +95,13 @@ def run_model_stablebaseline(flow_params,
         constructor = env_constructor(params=flow_params, version=0)()
         # The algorithms require a vectorized environment to run
         env = DummyVecEnv([lambda: constructor])
-    else:
+    elif sys.version_info < (3, 8):
+        # the shared-memory vectorized environment requires python 3.8
         env = SubprocVecEnv([env_constructor(params=flow_params, version=i)
                              for i in range(num_cpus)])
+    else:
+        from flow.utils.vec_env import make_stable_baselines_vec_env
+        env = make_stable_baselines_vec_env(flow_params, num_cpus)
 
     train_model = PPO2('MlpPolicy', env, verbose=1, n_steps=rollout_size)
     train_model.learn(total_timesteps=num_steps)
@@ -103,7 +113,8 @@ def setup_exps_rllib(flow_params,
                      n_rollouts,
                      policy_graphs=None,
                      policy_mapping_fn=None,
-                     policies_to_train=None):
+                     policies_to_train=None,
+                     num_envs_per_worker=1):
     """Return the relevant components of an RLlib experiment.
 
     Parameters
@@ -120,6 +131,10 @@ def setup_exps_rllib(flow_params,
         TODO
     policies_to_train : list of str, optional
         TODO
+    num_envs_per_worker : int, optional
+        number of environments stepped in parallel by every worker. If more
+        than one, the environments of a worker run in subprocesses and
+        exchange data through shared memory (see flow/utils/vec_env.py)
 
     Returns
     -------
@@ -172,6 +187,20 @@ def setup_exps_rllib(flow_params,
 
     create_env, gym_name = make_create_env(params=flow_params)
 
+    if num_envs_per_worker > 1:
+        from flow.utils.vec_env import make_rllib_vec_env
+        assert policy_graphs is None, \
+            "Only single-agent environments can be vectorized."
+
+        create_single_env = create_env
+
+        def create_env(env_config):
+            # when there are remote workers, the local worker of RLlib only
+            # needs the spaces of the environment, so it gets a single one
+            if n_cpus > 0 and getattr(env_config, 'worker_index', 0) == 0:
+                return create_single_env(env_config)
+            return make_rllib_vec_env(flow_params, num_envs_per_worker)
+
     # Register as rllib env
     register_env(gym_name, create_env)
     return alg_run, gym_name, config
@@ -191,7 +220,8 @@ def train_rllib(submodule, flags):
 
     alg_run, gym_name, config = setup_exps_rllib(
         flow_params, n_cpus, n_rollouts,
-        policy_graphs, policy_mapping_fn, policies_to_train)
+        policy_graphs, policy_mapping_fn, policies_to_train,
+        flags.num_envs_per_worker)
 
     ray.init(num_cpus=n_cpus + 1, object_store_memory=200 * 1024 * 1024)
     exp_config = {
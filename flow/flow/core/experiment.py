@@ -1,4 +1,5 @@
 """Contains an experiment class for running simulations."""
+from flow.core.metrics import RunningStats, get_reduction
 from flow.utils.registry import make_create_env
 from datetime import datetime
 import logging
@@ -48,29 +49,47 @@ class Experiment:
 
     Attributes
     ----------
-    custom_callables : dict < str, lambda >
+    custom_callables : dict < str, lambda or (lambda, str or Reduction) >
         strings and lambda functions corresponding to some information we want
         to extract from the environment. The lambda will be called at each step
-        to extract information from the env and it will be stored in a dict
-        keyed by the str.
+        to extract information from the env, and its values will be reduced
+        over each run (by default, averaged) and stored in a dict keyed by the
+        str.
+    metrics : list of flow.core.metrics.Metric
+        metrics updated online at every step, whose summaries are added to the
+        results of every run. See flow/core/metrics.py.
     env : flow.envs.Env
         the environment object the simulator will run
+    emission_files : list of str
+        paths to the emission files generated by the last call to `run`, one
+        per run (empty if no emission path was specified)
     """
 
-    def __init__(self, flow_params, custom_callables=None):
+    def __init__(self, flow_params, custom_callables=None, metrics=None):
         """Instantiate the Experiment class.
 
         Parameters
         ----------
         flow_params : dict
             flow-specific parameters
-        custom_callables : dict < str, lambda >
+        custom_callables : dict < str, lambda or (lambda, str or Reduction) >
             strings and lambda functions corresponding to some information we
             want to extract from the environment. The lambda will be called at
             each step to extract information from the env and it will be stored
-            in a dict keyed by the str.
+            in a dict keyed by the str. The values of a lambda are averaged
+            over each run, unless a reduction is declared with the lambda as a
+            (lambda, reduction) tuple. The reduction is either one of "mean",
+            "max", "last" and "quantiles", or any
+            flow.core.metrics.Reduction object, e.g. Histogram(bins).
+        metrics : list of flow.core.metrics.Metric, optional
+            metrics computed online during every run, such as
+            flow.core.metrics.FleetMetrics. Their summaries are added to the
+            results of the run. Metrics may also end runs early, e.g.
+            flow.core.metrics.SteadyState.
         """
         self.custom_callables = custom_callables or {}
+        self.metrics = metrics or []
+        self.emission_files = []
 
         # Get the env name and a creator for the environment.
         create_env, _ = make_create_env(flow_params)
@@ -83,7 +102,7 @@ class Experiment:
 
         logging.info("Initializing environment.")
 
-    def run(self, num_runs, rl_actions=None, convert_to_csv=False):
+    def run(self, num_runs, rl_actions=None, convert_to_csv=False, callables_interval=1):
         """Run the given network for a set number of runs.
 
         Parameters
@@ -96,11 +115,16 @@ class Experiment:
         convert_to_csv : bool
             Specifies whether to convert the emission file created by sumo
             into a csv file
+        callables_interval : int, optional
+            number of steps between two calls of the custom callables. The
+            callables are called at the first step of every run, and every
+            `callables_interval` steps after that.
 
         Returns
         -------
         info_dict : dict < str, Any >
-            contains returns, average speed per step
+            contains returns, average speed per step, and the summaries of the
+            metrics, with one value per run
         """
         num_steps = self.env.env_params.horizon
 
@@ -123,9 +147,13 @@ class Experiment:
             "velocities": [],
             "outflows": [],
         }
-        info_dict.update({
-            key: [] for key in self.custom_callables.keys()
-        })
+
+        # the values of the custom callables are folded into their reductions
+        callables = {}
+        for key, value in self.custom_callables.items():
+            lambda_func, reduction = value if isinstance(value, tuple) \
+                else (value, "mean")
+            callables[key] = (lambda_func, get_reduction(reduction))
 
         if rl_actions is None:
             def rl_actions(*_):
@@ -134,12 +162,16 @@ class Experiment:
         # time profiling information
         t = time.time()
         times = []
+        self.emission_files = []
 
         for i in range(num_runs):
             ret = 0
-            vel = []
-            custom_vals = {key: [] for key in self.custom_callables.keys()}
+            vel = RunningStats()
+            for _, reduction in callables.values():
+                reduction.reset()
             state = self.env.reset()
+            for metric in self.metrics:
+                metric.reset()
             for j in range(num_steps):
                 t0 = time.time()
                 state, reward, done, _ = self.env.step(rl_actions(state))
@@ -148,30 +180,48 @@ class Experiment:
 
                 # Compute the velocity speeds and cumulative returns.
                 veh_ids = self.env.k.vehicle.get_ids()
-                vel.append(np.mean(self.env.k.vehicle.get_speed(veh_ids)))
+                if len(veh_ids) > 0:
+                    vel.update(np.mean(self.env.k.vehicle.get_speed(veh_ids)))
                 ret += reward
 
                 # Compute the results for the custom callables.
-                for (key, lambda_func) in self.custom_callables.items():
-                    custom_vals[key].append(lambda_func(self.env))
+                if j % callables_interval == 0:
+                    for lambda_func, reduction in callables.values():
+                        reduction.update(lambda_func(self.env))
+
+                # Update the online metrics.
+                for metric in self.metrics:
+                    metric.update(self.env)
 
-                if done:
+                # End the run early if any of the metrics requests it.
+                if done or any(metric.done for metric in self.metrics):
                     break
 
             # Store the information from the run in info_dict.
             outflow = self.env.k.vehicle.get_outflow_rate(int(500))
             info_dict["returns"].append(ret)
-            info_dict["velocities"].append(np.mean(vel))
+            info_dict["velocities"].append(vel.mean if vel.count else np.nan)
             info_dict["outflows"].append(outflow)
-            for key in custom_vals.keys():
-                info_dict[key].append(np.mean(custom_vals[key]))
+            for key, (_, reduction) in callables.items():
+                result = reduction.result()
+                if isinstance(result, dict):
+                    for suffix, value in result.items():
+                        info_dict.setdefault(
+                            "{}_{}".format(key, suffix), []).append(value)
+                else:
+                    info_dict.setdefault(key, []).append(result)
+            for metric in self.metrics:
+                for key, value in metric.summary().items():
+                    info_dict.setdefault(key, []).append(value)
 
             print("Round {0}, return: {1}".format(i, ret))
 
             # Save emission data at the end of every rollout. This is skipped
             # by the internal method if no emission path was specified.
             if self.env.simulator == "traci":
-                self.env.k.simulation.save_emission(run_id=i)
+                emission_file = self.env.k.simulation.save_emission(run_id=i)
+                if emission_file is not None:
+                    self.emission_files.append(emission_file)
 
         # Print the averages/std for all variables in the info_dict.
         for key in info_dict.keys():
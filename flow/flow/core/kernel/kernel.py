@@ -1,11 +1,10 @@
 """Script containing the Flow kernel object for interacting with simulators."""
 
 import warnings
-from flow.core.kernel.simulation import TraCISimulation, AimsunKernelSimulation
-from flow.core.kernel.network import TraCIKernelNetwork, AimsunKernelNetwork
-from flow.core.kernel.vehicle import TraCIVehicle, AimsunKernelVehicle
-from flow.core.kernel.traffic_light import TraCITrafficLight, \
-    AimsunKernelTrafficLight
+from flow.core.kernel.simulation import TraCISimulation
+from flow.core.kernel.network import TraCIKernelNetwork
+from flow.core.kernel.vehicle import TraCIVehicle
+from flow.core.kernel.traffic_light import TraCITrafficLight
 from flow.utils.exceptions import FatalFlowError
 
 
@@ -62,12 +61,23 @@ class Kernel(object):
         """
         self.kernel_api = None
 
+        # number of times the kernel subclasses have been updated. This may be
+        # used to invalidate data that is cached for a single simulation step
+        self.update_count = 0
+
         if simulator == "traci":
             self.simulation = TraCISimulation(self)
             self.network = TraCIKernelNetwork(self, sim_params)
             self.vehicle = TraCIVehicle(self, sim_params)
             self.traffic_light = TraCITrafficLight(self)
         elif simulator == 'aimsun':
+            # the Aimsun kernel (and its API) is only imported when used
+            from flow.core.kernel.simulation import AimsunKernelSimulation
+            from flow.core.kernel.network import AimsunKernelNetwork
+            from flow.core.kernel.vehicle import AimsunKernelVehicle
+            from flow.core.kernel.traffic_light import \
+                AimsunKernelTrafficLight
+
             self.simulation = AimsunKernelSimulation(self)
             self.network = AimsunKernelNetwork(self, sim_params)
             self.vehicle = AimsunKernelVehicle(self, sim_params)
@@ -102,6 +112,7 @@ class Kernel(object):
         self.traffic_light.update(reset)
         self.network.update(reset)
         self.simulation.update(reset)
+        self.update_count += 1
 
     def close(self):
         """Terminate all components within the simulation and network."""
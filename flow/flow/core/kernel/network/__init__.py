@@ -2,6 +2,11 @@
 
 from flow.core.kernel.network.base import BaseKernelNetwork
 from flow.core.kernel.network.traci import TraCIKernelNetwork
-from flow.core.kernel.network.aimsun import AimsunKernelNetwork
+from flow.utils.lazy import lazy_attributes
+
+# the Aimsun kernel is only imported when used
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'AimsunKernelNetwork': 'flow.core.kernel.network.aimsun',
+})
 
 __all__ = ["BaseKernelNetwork", "TraCIKernelNetwork", "AimsunKernelNetwork"]
@@ -187,6 +187,24 @@ class BaseKernelNetwork(object):
         """
         raise NotImplementedError
 
+    def get_x_array(self, edges, positions):
+        """Return the absolute positions of several edge/position pairs.
+
+        Parameters
+        ----------
+        edges : list of str
+            names of the edges
+        positions : array_like
+            relative positions on the edges
+
+        Returns
+        -------
+        np.ndarray
+            positions with respect to some global reference
+        """
+        return np.array([self.get_x(edge, pos)
+                         for edge, pos in zip(edges, positions)], dtype=float)
+
     def next_edge(self, edge, lane):
         """Return the next edge/lane pair from the given edge/lane.
 
@@ -9,6 +9,7 @@ import subprocess
 import xml.etree.ElementTree as ElementTree
 from lxml import etree
 from copy import deepcopy
+import numpy as np
 
 E = etree.Element
 
@@ -82,6 +83,9 @@ class TraCIKernelNetwork(BaseKernelNetwork):
         self.__non_internal_length = None  # total length of non-internal edges
         self.rts = None
         self.cfg = None
+        self._edge_index = None
+        self._edgestart = None
+        self._edge_scale = None
 
     def generate_network(self, network):
         """See parent class.
@@ -118,7 +122,13 @@ class TraCIKernelNetwork(BaseKernelNetwork):
             or self.network.net_params.osm_path is None
 
         # create the network configuration files
-        if self.network.net_params.template is not None:
+        if self.sim_params.replay_path is not None:
+            # the network data is stored with the replayed trace, and no sumo
+            # instance needs to be configured
+            self._edges, self._connections = \
+                self.master_kernel.simulation.replay_network(
+                    self.sim_params.replay_path)
+        elif self.network.net_params.template is not None:
             self._edges, self._connections = self.generate_net_from_template(
                 self.network.net_params)
         elif self.network.net_params.osm_path is not None:
@@ -190,6 +200,11 @@ class TraCIKernelNetwork(BaseKernelNetwork):
 
         self.total_edgestarts_dict = dict(self.total_edgestarts)
 
+        # intern every known edge to an integer id, so that the absolute
+        # positions of many vehicles can be computed with a single array
+        # operation (see `get_x_array`)
+        self._intern_edges()
+
         self.__length = sum(
             self._edges[edge_id]['length'] for edge_id in self._edges
         )
@@ -201,6 +216,15 @@ class TraCIKernelNetwork(BaseKernelNetwork):
         # specify routes vehicles can take  # TODO: move into a method
         self.rts = self.network.routes
 
+        if self.sim_params.replay_path is not None:
+            # no configuration files are needed, but the routes are still
+            # converted into lists of (route, probability) pairs, as done in
+            # generate_cfg
+            for route_id in self.rts:
+                if isinstance(self.rts[route_id][0], str):
+                    self.rts[route_id] = [(self.rts[route_id], 1)]
+            return
+
         # create the sumo configuration files
         cfg_name = self.generate_cfg(self.network.net_params,
                                      self.network.traffic_lights,
@@ -251,6 +275,61 @@ class TraCIKernelNetwork(BaseKernelNetwork):
 
     def get_x(self, edge, position):
         """See parent class."""
+        index = self._edge_index.get(edge)
+        if index is not None:
+            return float(self._edgestart[index] +
+                         self._edge_scale[index] * position)
+        return self._get_x(edge, position)
+
+    def get_x_array(self, edges, positions):
+        """See parent class.
+
+        Edges that were interned by `generate_network` are resolved with a
+        single gather from the `edgestart` array; any other edge falls back to
+        the element-wise computation.
+        """
+        index = np.fromiter(
+            (self._edge_index.get(edge, -1) for edge in edges),
+            dtype=int, count=len(edges))
+        x = self._edgestart[index] + \
+            self._edge_scale[index] * np.asarray(positions, dtype=float)
+
+        for i in np.flatnonzero(index < 0):
+            x[i] = self._get_x(edges[i], positions[i])
+
+        return x
+
+    def _intern_edges(self):
+        """Assign an integer id and a starting position to every edge.
+
+        The starting position of an edge is stored in `self._edgestart`, and
+        `self._edge_scale` denotes whether the relative position of a vehicle
+        on the edge is added to it (internal links that are generalized by a
+        single element do not add it, see `_get_x`). Edges whose absolute
+        position cannot be computed are not interned.
+        """
+        self._edge_index = {}
+        edgestart = []
+        edge_scale = []
+        for edge in [''] + list(self._edges) + \
+                list(self.total_edgestarts_dict):
+            if edge in self._edge_index:
+                continue
+            try:
+                start = self._get_x(edge, 0)
+                scale = self._get_x(edge, 1) - start
+            except KeyError:
+                continue
+            self._edge_index[edge] = len(edgestart)
+            edgestart.append(start)
+            edge_scale.append(scale)
+
+        # a trailing element for edges that were not interned (index -1)
+        self._edgestart = np.array(edgestart + [0.], dtype=float)
+        self._edge_scale = np.array(edge_scale + [0.], dtype=float)
+
+    def _get_x(self, edge, position):
+        """Compute the absolute position on the track from the edge name."""
         # if there was a collision which caused the vehicle to disappear,
         # return an x value of -1001
         if len(edge) == 0:
@@ -2,7 +2,12 @@
 
 from flow.core.kernel.simulation.base import KernelSimulation
 from flow.core.kernel.simulation.traci import TraCISimulation
-from flow.core.kernel.simulation.aimsun import AimsunKernelSimulation
+from flow.utils.lazy import lazy_attributes
+
+# the Aimsun kernel is only imported when used
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'AimsunKernelSimulation': 'flow.core.kernel.simulation.aimsun',
+})
 
 
 __all__ = ['KernelSimulation', 'TraCISimulation', 'AimsunKernelSimulation']
@@ -1,6 +1,10 @@
 """Script containing the TraCI simulation kernel class."""
 
 from flow.core.kernel.simulation import KernelSimulation
+from flow.core.kernel.simulation.traci_trace import TraceReader
+from flow.core.kernel.simulation.traci_trace import TraceWriter
+from flow.core.kernel.simulation.traci_trace import RecordingConnection
+from flow.core.kernel.simulation.traci_trace import ReplayConnection
 from flow.core.util import ensure_dir
 import flow.config as config
 import traci.constants as tc
@@ -62,6 +66,7 @@ class TraCISimulation(KernelSimulation):
         KernelSimulation.__init__(self, master_kernel)
 
         self.sumo_proc = None
+        self.trace = None
         self.sim_step = None
         self.emission_path = None
         self.time = 0
@@ -166,6 +171,11 @@ class TraCISimulation(KernelSimulation):
            initialize a sumo instance.
         3. Finally, It initializes a traci connection to interface with sumo
            from Python and returns the connection.
+
+        If a `replay_path` is specified in the simulation parameters, no sumo
+        instance is started, and the returned connection instead replays the
+        responses recorded in the trace. If a `record_path` is specified, the
+        responses to all commands issued through the connection are recorded.
         """
         # Save the simulation step size (for later use).
         self.sim_step = sim_params.sim_step
@@ -175,6 +185,13 @@ class TraCISimulation(KernelSimulation):
         if self.emission_path is not None:
             ensure_dir(self.emission_path)
 
+        if sim_params.replay_path is not None:
+            traci_connection = ReplayConnection(
+                self._trace_reader(sim_params.replay_path))
+            traci_connection.setOrder(0)
+            traci_connection.simulationStep()
+            return traci_connection
+
         error = None
         for _ in range(RETRIES_ON_ERROR):
             try:
@@ -248,6 +265,13 @@ class TraCISimulation(KernelSimulation):
                     time.sleep(config.SUMO_SLEEP)
 
                 traci_connection = traci.connect(port, numRetries=100)
+                if sim_params.record_path is not None:
+                    if self.trace is None:
+                        self.trace = TraceWriter(sim_params.record_path)
+                    self.trace.write(('network', network._edges,
+                                      network._connections))
+                    traci_connection = RecordingConnection(
+                        traci_connection, self.trace)
                 traci_connection.setOrder(0)
                 traci_connection.simulationStep()
 
@@ -258,8 +282,34 @@ class TraCISimulation(KernelSimulation):
                 self.teardown_sumo()
         raise error
 
+    def replay_network(self, replay_path):
+        """Return the network data of the next simulation in a trace.
+
+        Parameters
+        ----------
+        replay_path : str
+            path to the trace recorded with the `record_path` simulation
+            parameter
+
+        Returns
+        -------
+        dict
+            data on the edges and junctions of the network
+        dict
+            connections between edges in the network
+        """
+        return self._trace_reader(replay_path).read_network()
+
+    def _trace_reader(self, replay_path):
+        """Return the reader of the trace, opening it if needed."""
+        if self.trace is None:
+            self.trace = TraceReader(replay_path)
+        return self.trace
+
     def teardown_sumo(self):
         """Kill the sumo subprocess instance."""
+        if self.sumo_proc is None:
+            return
         try:
             os.killpg(self.sumo_proc.pid, signal.SIGTERM)
         except Exception as e:
@@ -276,11 +326,16 @@ class TraCISimulation(KernelSimulation):
         run_id : int
             the rollout number, appended to the name of the emission file. Used
             to store emission files from multiple rollouts run sequentially.
+
+        Returns
+        -------
+        str or None
+            path to the emission file, or None if no data was collected
         """
         # If there is no stored data, ignore this operation. This is to ensure
         # that data isn't deleted if the operation is called twice.
         if len(self.stored_data) == 0:
-            return
+            return None
 
         # Get a csv name for the emission file.
         name = "{}-{}_emission.csv".format(
@@ -327,3 +382,5 @@ class TraCISimulation(KernelSimulation):
         # Clear all memory from the stored data. This is useful if this
         # function is called in between resets.
         self.stored_data.clear()
+
+        return os.path.join(self.emission_path, name)
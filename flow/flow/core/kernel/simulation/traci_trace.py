@@ -0,0 +1,257 @@
+"""Record and replay TraCI connections.
+
+A RecordingConnection wraps the connection returned by `traci.connect`, and
+logs the response to every command issued through it (including subscription
+results and errors) to a compact binary trace. A ReplayConnection later feeds
+these responses back in the same order, without a sumo instance. This allows
+the Python side of a simulation (vehicle kernel updates, controllers, states,
+rewards) to be run and profiled deterministically on machines without sumo.
+
+The trace is a gzip-compressed sequence of pickled records, each of which is
+one of:
+
+* ('network', edges, connections): the network data imported by the network
+  kernel, recorded every time the simulation is started
+* ('call', domain, method, args, kwargs, result): a command and its response
+* ('error', domain, method, args, kwargs, exception): a command that raised an
+  exception
+"""
+import gzip
+import pickle
+
+import traci.domain
+
+from flow.utils.exceptions import FatalFlowError
+
+#: identifier and version of the trace format, stored as the first record
+TRACE_VERSION = ('flow-traci-trace', 1)
+
+
+class TraceWriter(object):
+    """Write records to a TraCI trace.
+
+    Records are flushed whenever the connection they are issued from is
+    closed, so that the trace remains readable if the process is terminated
+    without closing the writer.
+    """
+
+    def __init__(self, path):
+        """Open a trace for writing.
+
+        Parameters
+        ----------
+        path : str
+            path to the trace file
+        """
+        self._file = gzip.open(path, 'wb', compresslevel=6)
+        self.write(TRACE_VERSION)
+
+    def write(self, record):
+        """Append a record to the trace."""
+        pickle.dump(record, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def flush(self):
+        """Flush the records written so far to the trace file."""
+        self._file.flush()
+
+    def close(self):
+        """Close the trace file."""
+        self._file.close()
+
+
+class TraceReader(object):
+    """Read records from a TraCI trace."""
+
+    def __init__(self, path):
+        """Open a trace for reading.
+
+        Parameters
+        ----------
+        path : str
+            path to the trace file
+
+        Raises
+        ------
+        flow.utils.exceptions.FatalFlowError
+            if the file is not a TraCI trace of a supported version
+        """
+        self._file = gzip.open(path, 'rb')
+        version = self.read()
+        if version != TRACE_VERSION:
+            raise FatalFlowError(
+                '{} is not a TraCI trace of version {}.'.format(
+                    path, TRACE_VERSION[1]))
+
+    def read(self):
+        """Return the next record in the trace, or None if it ended."""
+        try:
+            return pickle.load(self._file)
+        except EOFError:
+            # also raised when the trace was truncated after its last flush
+            return None
+
+    def read_network(self):
+        """Return the next network data in the trace.
+
+        Returns
+        -------
+        dict
+            data on the edges and junctions of the network
+        dict
+            connections between edges in the network
+
+        Raises
+        ------
+        flow.utils.exceptions.FatalFlowError
+            if the next record in the trace is not network data
+        """
+        record = self.read()
+        if record is None or record[0] != 'network':
+            raise FatalFlowError(
+                'Expected network data in the trace, found {}.'.format(
+                    record if record is None else record[:3]))
+        return record[1], record[2]
+
+    def close(self):
+        """Close the trace file."""
+        self._file.close()
+
+
+class RecordingConnection(object):
+    """Proxy around a TraCI connection recording all responses to a trace.
+
+    Commands are issued either to the connection itself (e.g.
+    `simulationStep`) or to one of its domains (e.g. `vehicle.getSpeed`), and
+    both are forwarded to the wrapped connection.
+    """
+
+    def __init__(self, connection, writer):
+        """Instantiate the recording connection.
+
+        Parameters
+        ----------
+        connection : traci.connection.Connection
+            the connection to the sumo instance
+        writer : TraceWriter
+            the trace the responses are recorded to
+        """
+        self._connection = connection
+        self._writer = writer
+        self._domains = {}
+
+    def __getattr__(self, name):
+        """Return a recording proxy of a domain or command."""
+        attr = getattr(self._connection, name)
+        if isinstance(attr, traci.domain.Domain):
+            if name not in self._domains:
+                self._domains[name] = _RecordingDomain(name, attr, self)
+            return self._domains[name]
+        elif callable(attr):
+            return self._record(None, name, attr)
+        return attr
+
+    def _record(self, domain, method, func):
+        """Wrap a command so that its response is recorded."""
+        def recorded(*args, **kwargs):
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self._writer.write(('error', domain, method, args, kwargs, e))
+                raise
+            self._writer.write(
+                ('call', domain, method, args, kwargs, result))
+            if domain is None and method == 'close':
+                self._writer.flush()
+            return result
+        return recorded
+
+
+class _RecordingDomain(object):
+    """Proxy around a TraCI domain recording all responses to a trace."""
+
+    def __init__(self, name, domain, connection):
+        self._name = name
+        self._domain = domain
+        self._connection = connection
+
+    def __getattr__(self, name):
+        attr = getattr(self._domain, name)
+        if callable(attr):
+            return self._connection._record(self._name, name, attr)
+        return attr
+
+
+class ReplayConnection(object):
+    """Stand-in for a TraCI connection replaying the responses in a trace.
+
+    Commands must be issued in the same order as they were recorded. Their
+    arguments are not compared to the recorded ones unless `check_args` is
+    set, so that controllers that add noise to their actions can be replayed.
+    """
+
+    def __init__(self, reader, check_args=False):
+        """Instantiate the replay connection.
+
+        Parameters
+        ----------
+        reader : TraceReader
+            the trace the responses are read from
+        check_args : bool, optional
+            whether to ensure that the arguments of commands match the
+            recorded ones
+        """
+        self._reader = reader
+        self._check_args = check_args
+        self._closed = False
+
+    def __getattr__(self, name):
+        """Return a replaying proxy of a domain or command."""
+        return _ReplayAttribute(name, self)
+
+    def close(self):
+        """Close the connection.
+
+        Any command left in the trace before the recorded connection was
+        closed is skipped, so that the next simulation in the trace can be
+        replayed after a replay was interrupted. As with TraCI connections,
+        closing the connection a second time does nothing.
+        """
+        if self._closed:
+            return
+        self._closed = True
+
+        record = self._reader.read()
+        while record is not None and record[:3] != ('call', None, 'close'):
+            record = self._reader.read()
+
+    def _replay(self, domain, method, args, kwargs):
+        """Return the recorded response to a command."""
+        record = self._reader.read()
+        if record is None or record[0] not in ('call', 'error') or \
+                record[1:3] != (domain, method) or \
+                (self._check_args and record[3:5] != (args, kwargs)):
+            raise FatalFlowError(
+                'The replayed commands diverged from the trace: expected {}, '
+                'received {}.'.format(
+                    record if record is None else record[1:5],
+                    (domain, method, args, kwargs)))
+
+        if record[0] == 'error':
+            raise record[5]
+        return record[5]
+
+
+class _ReplayAttribute(object):
+    """Replayed domain or command of a ReplayConnection."""
+
+    def __init__(self, name, connection):
+        self._name = name
+        self._connection = connection
+
+    def __call__(self, *args, **kwargs):
+        return self._connection._replay(None, self._name, args, kwargs)
+
+    def __getattr__(self, method):
+        def replayed(*args, **kwargs):
+            return self._connection._replay(self._name, method, args, kwargs)
+        return replayed
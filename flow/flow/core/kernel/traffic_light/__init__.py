@@ -2,7 +2,12 @@
 
 from flow.core.kernel.traffic_light.base import KernelTrafficLight
 from flow.core.kernel.traffic_light.traci import TraCITrafficLight
-from flow.core.kernel.traffic_light.aimsun import AimsunKernelTrafficLight
+from flow.utils.lazy import lazy_attributes
+
+# the Aimsun kernel is only imported when used
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'AimsunKernelTrafficLight': 'flow.core.kernel.traffic_light.aimsun',
+})
 
 
 __all__ = ["KernelTrafficLight", "TraCITrafficLight",
@@ -2,7 +2,12 @@
 
 from flow.core.kernel.vehicle.base import KernelVehicle
 from flow.core.kernel.vehicle.traci import TraCIVehicle
-from flow.core.kernel.vehicle.aimsun import AimsunKernelVehicle
+from flow.utils.lazy import lazy_attributes
+
+# the Aimsun kernel is only imported when used
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'AimsunKernelVehicle': 'flow.core.kernel.vehicle.aimsun',
+})
 
 
 __all__ = ['KernelVehicle', 'TraCIVehicle', 'AimsunKernelVehicle']
@@ -195,17 +195,20 @@ class AimsunKernelVehicle(KernelVehicle):
 
         # start = time.time()
 
-        for veh_id in self.__ids:
-            aimsun_id = self._id_flow2aimsun[veh_id]
-
-            # update the vehicle's tracking information
-            self.__vehicles[veh_id]['tracking_info'] = \
-                self.kernel_api.get_vehicle_tracking_info(
-                    aimsun_id, self.tracked_info_bitmap
-                )
-
+        # collect the tracking information, leader, and next section of all
+        # tracked vehicles in a single command
+        bulk_info = self.kernel_api.get_vehicles_tracking_info(
+            [self._id_flow2aimsun[veh_id] for veh_id in self.__ids],
+            self.tracked_info_bitmap
+        )
+
+        # update the vehicles' tracking information
+        for veh_id, (tracking_info, _, _) in zip(self.__ids, bulk_info):
+            self.__vehicles[veh_id]['tracking_info'] = tracking_info
+
+        for veh_id, (_, lead_id_aimsun, next_section) in zip(self.__ids,
+                                                             bulk_info):
             # get the leader, follower, and headway for each tracked vehicle
-            lead_id_aimsun = self.kernel_api.get_vehicle_leader(aimsun_id)
             if lead_id_aimsun < -1:
                 self.__vehicles[veh_id]['leader'] = None
                 self.__vehicles[veh_id]['headway'] = 1000
@@ -236,8 +239,6 @@ class AimsunKernelVehicle(KernelVehicle):
 
                 # FIXME can be simplified
                 if inf_veh.idSection != -1:  # vehicle is in a section
-                    next_section = self.kernel_api.get_next_section(
-                        aimsun_id, inf_veh.idSection)
                     # leader is in a section
                     if inf_veh_leader.idSection != -1:
                         # veh in section and leader in same section
@@ -449,12 +450,17 @@ class AimsunKernelVehicle(KernelVehicle):
             veh_id = [veh_id]
             acc = [acc]
 
+        aimsun_ids = []
+        speeds = []
         for i, veh_id in enumerate(veh_id):
             if acc[i] is not None:
                 this_vel = self.get_speed(veh_id)
                 next_vel = max(this_vel + acc[i] * self.sim_step, 0)
-                aimsun_id = self._id_flow2aimsun[veh_id]
-                self.kernel_api.set_speed(aimsun_id, next_vel)
+                aimsun_ids.append(self._id_flow2aimsun[veh_id])
+                speeds.append(next_vel)
+
+        # send all speeds to Aimsun in a single round trip
+        self.kernel_api.set_speeds(aimsun_ids, speeds)
 
     def apply_lane_change(self, veh_id, direction):
         """Apply an instantaneous lane-change to a set of vehicles.
@@ -490,6 +496,8 @@ class AimsunKernelVehicle(KernelVehicle):
                 "Direction values for lane changes may only be: -2, -1, 0, \
                 or 1.")
 
+        aimsun_ids = []
+        target_lanes = []
         for i, veh_id in enumerate(veh_id):
             # check for no lane change
             if direction[i] == 0:
@@ -503,15 +511,18 @@ class AimsunKernelVehicle(KernelVehicle):
                 max(this_lane + direction[i], 0),
                 self.master_kernel.network.num_lanes(this_edge) - 1)
 
-            # perform the requested lane action action in Aimsun
+            # collect the requested lane action action for Aimsun
             if target_lane != this_lane:
-                aimsun_id = self._id_flow2aimsun[veh_id]
-                self.kernel_api.apply_lane_change(aimsun_id, int(target_lane))
+                aimsun_ids.append(self._id_flow2aimsun[veh_id])
+                target_lanes.append(int(target_lane))
 
                 if veh_id in self.get_rl_ids():
                     self.prev_last_lc[veh_id] = \
                         self.__vehicles[veh_id]["last_lc"]
 
+        # perform the requested lane actions in Aimsun in a single round trip
+        self.kernel_api.apply_lane_changes(aimsun_ids, target_lanes)
+
     def choose_routes(self, veh_id, route_choices):
         """Update the route choice of vehicles in the network.
 
@@ -542,16 +553,21 @@ class AimsunKernelVehicle(KernelVehicle):
 
     def update_vehicle_colors(self):
         """Modify the color of vehicles if rendering is active."""
+        aimsun_ids = []
+        colors = []
+
         # color rl vehicles red
         for veh_id in self.get_rl_ids():
-            aimsun_id = self._id_flow2aimsun[veh_id]
-            self.kernel_api.set_color(veh_id=aimsun_id, color=RED)
+            aimsun_ids.append(self._id_flow2aimsun[veh_id])
+            colors.append(RED)
 
         # observed human-driven vehicles are cyan and unobserved are white
         for veh_id in self.get_human_ids():
-            aimsun_id = self._id_flow2aimsun[veh_id]
-            color = CYAN if veh_id in self.get_observed_ids() else WHITE
-            self.kernel_api.set_color(veh_id=aimsun_id, color=color)
+            aimsun_ids.append(self._id_flow2aimsun[veh_id])
+            colors.append(
+                CYAN if veh_id in self.get_observed_ids() else WHITE)
+
+        self.kernel_api.set_colors(aimsun_ids, colors)
 
         # clear the list of observed vehicles
         for veh_id in self.get_observed_ids():
@@ -618,9 +634,29 @@ class AimsunKernelVehicle(KernelVehicle):
     def get_ids_by_edge(self, edges):
         """See parent class."""
         if isinstance(edges, (list, np.ndarray)):
-            return sum([self.get_ids_by_edge(edge) for edge in edges], [])
+            veh_ids = []
+            for edge in edges:
+                veh_ids.extend(self.get_ids_by_edge(edge))
+            return veh_ids
         return [veh for veh in self.__ids if self.get_edge(veh) == edges]
 
+    def get_closest_to_edge_end(self, edge, num_closest):
+        """See parent class."""
+        veh_ids = self.get_ids_by_edge(edge)
+        veh_ids.sort(key=self.get_position, reverse=True)
+        return veh_ids[:num_closest]
+
+    def get_num_vehicles_by_edge(self, edge):
+        """See parent class."""
+        return len(self.get_ids_by_edge(edge))
+
+    def get_mean_speed_by_edge(self, edge, error=0):
+        """See parent class."""
+        veh_ids = self.get_ids_by_edge(edge)
+        if len(veh_ids) == 0:
+            return error
+        return np.mean(self.get_speed(veh_ids))
+
     def get_inflow_rate(self, time_span):
         """See parent class."""
         if len(self._num_departed) == 0:
@@ -871,3 +907,23 @@ class AimsunKernelVehicle(KernelVehicle):
     def get_max_speed(self, veh_id, error):
         """See parent class."""
         raise NotImplementedError
+
+    def get_accel(self, veh_id, noise=True, failsafe=True):
+        """See parent class."""
+        raise NotImplementedError
+
+    def update_accel(self, veh_id, accel, noise=True, failsafe=True):
+        """See parent class."""
+        raise NotImplementedError
+
+    def get_2d_position(self, veh_id, error=-1001):
+        """See parent class."""
+        raise NotImplementedError
+
+    def get_realized_accel(self, veh_id):
+        """See parent class."""
+        raise NotImplementedError
+
+    def get_road_grade(self, veh_id):
+        """See parent class."""
+        raise NotImplementedError
@@ -294,6 +294,39 @@ class KernelVehicle(object, metaclass=ABCMeta):
         """
         pass
 
+    @abstractmethod
+    def get_closest_to_edge_end(self, edge, num_closest):
+        """Return the names of the vehicles closest to the end of an edge.
+
+        Parameters
+        ----------
+        edge : str
+            name of the edge
+        num_closest : int
+            maximum number of vehicles to return
+
+        Returns
+        -------
+        list of str
+            names of at most num_closest vehicles on the edge, ordered by
+            increasing distance to the end of the edge
+        """
+        pass
+
+    @abstractmethod
+    def get_num_vehicles_by_edge(self, edge):
+        """Return the number of vehicles currently in the specified edge."""
+        pass
+
+    @abstractmethod
+    def get_mean_speed_by_edge(self, edge, error=0):
+        """Return the mean speed of the vehicles in the specified edge.
+
+        If no vehicles are currently in the edge, then returns the error
+        value.
+        """
+        pass
+
     @abstractmethod
     def get_inflow_rate(self, time_span):
         """Return the inflow rate (in veh/hr) of vehicles from the network.
@@ -11,6 +11,7 @@ from flow.controllers.car_following_models import SimCarFollowingController
 from flow.controllers.rlcontroller import RLController
 from flow.controllers.lane_change_controllers import SimLaneChangeController
 from bisect import bisect_left
+import heapq
 import itertools
 from copy import deepcopy
 
@@ -69,6 +70,25 @@ class TraCIVehicle(KernelVehicle):
         # list of vehicle ids located in each edge in the network
         self._ids_by_edge = dict()
 
+        # vehicle ids located in each lane of the edges with vehicles, sorted
+        # by position. Key = edge id, Element = list whose ith element is the
+        # list of vehicles in lane i. These are maintained incrementally from
+        # one step to the next (see _multi_lane_headways)
+        self._lane_buckets = dict()
+        # the (edge, lane) bucket each vehicle is stored in
+        self._bucket_of = dict()
+        # number of edges and junctions, and maximum number of lanes in the
+        # network, set on the first update after a reset
+        self._num_edges = None
+        self._max_lanes = None
+
+        # vehicle ids sorted by edge and by decreasing position within each
+        # edge, with the vehicles of the edge with index i located between
+        # offsets _edge_bounds[i] and _edge_bounds[i+1]
+        self._edge_index = dict()
+        self._edge_order_ids = []
+        self._edge_bounds = np.zeros(1, dtype=int)
+
         # number of vehicles that entered the network for every time-step
         self._num_departed = []
         self._departed_ids = 0
@@ -106,6 +126,8 @@ class TraCIVehicle(KernelVehicle):
         self.num_rl_vehicles = 0
         self.num_not_departed = 0
 
+        self._clear_lane_buckets()
+
         self.__vehicles.clear()
         for typ in vehicles.initial:
             for i in range(typ['num_vehicles']):
@@ -117,6 +139,22 @@ class TraCIVehicle(KernelVehicle):
                 if typ['acceleration_controller'][0] == RLController:
                     self.num_rl_vehicles += 1
 
+    def __deepcopy__(self, memo):
+        """Return a deep copy of the kernel sharing its vehicle types.
+
+        The type parameters and min gaps are only read by the kernel once it
+        is initialized, so they are shared with the copy instead of being
+        copied (with every controller and car following param in them) each
+        time the environment is reset.
+        """
+        memo[id(self.type_parameters)] = self.type_parameters
+        memo[id(self.minGap)] = self.minGap
+        new = self.__class__.__new__(self.__class__)
+        memo[id(self)] = new
+        for key, value in self.__dict__.items():
+            new.__dict__[key] = deepcopy(value, memo)
+        return new
+
     def update(self, reset):
         """See parent class.
 
@@ -177,6 +215,9 @@ class TraCIVehicle(KernelVehicle):
         if reset:
             self.time_counter = 0
 
+            # the network may have changed, so the lane buckets are rebuilt
+            self._clear_lane_buckets()
+
             # reset all necessary values
             self.prev_last_lc = dict()
             for veh_id in self.__rl_ids:
@@ -258,7 +299,10 @@ class TraCIVehicle(KernelVehicle):
         self.__sumo_obs = vehicle_obs.copy()
 
         # update the lane leaders data for each vehicle
-        self._multi_lane_headways()
+        positions = self._multi_lane_headways()
+
+        # sort the vehicles on every edge by position
+        self._update_edge_order(positions)
 
         # make sure the rl vehicle list is still sorted
         self.__rl_ids.sort()
@@ -494,9 +538,34 @@ class TraCIVehicle(KernelVehicle):
     def get_ids_by_edge(self, edges):
         """See parent class."""
         if isinstance(edges, (list, np.ndarray)):
-            return sum([self.get_ids_by_edge(edge) for edge in edges], [])
+            return list(itertools.chain.from_iterable(
+                self.get_ids_by_edge(edge) for edge in edges))
         return self._ids_by_edge.get(edges, []) or []
 
+    def _edge_slice(self, edge):
+        """Return the offsets of an edge's vehicles in _edge_order_ids."""
+        index = self._edge_index.get(edge)
+        if index is None or index + 1 >= len(self._edge_bounds):
+            return 0, 0
+        return self._edge_bounds[index], self._edge_bounds[index + 1]
+
+    def get_closest_to_edge_end(self, edge, num_closest):
+        """See parent class."""
+        start, end = self._edge_slice(edge)
+        return self._edge_order_ids[start:min(end, start + num_closest)]
+
+    def get_num_vehicles_by_edge(self, edge):
+        """See parent class."""
+        start, end = self._edge_slice(edge)
+        return int(end - start)
+
+    def get_mean_speed_by_edge(self, edge, error=0):
+        """See parent class."""
+        start, end = self._edge_slice(edge)
+        if end == start:
+            return error
+        return np.mean(self.get_speed(self._edge_order_ids[start:end]))
+
     def get_inflow_rate(self, time_span):
         """See parent class."""
         if len(self._num_departed) == 0:
@@ -711,45 +780,98 @@ class TraCIVehicle(KernelVehicle):
             return [self.get_lane_followers(vehID, error) for vehID in veh_id]
         return self.__vehicles.get(veh_id, {}).get("lane_followers", error)
 
+    def _clear_lane_buckets(self):
+        """Remove all vehicles from the lane buckets."""
+        self._lane_buckets = dict()
+        self._bucket_of = dict()
+        self._num_edges = None
+        self._max_lanes = None
+
+    def _update_lane_buckets(self):
+        """Update the vehicles in the lane bucket of every edge.
+
+        Most vehicles stay in the same lane of the same edge, and keep their
+        relative order, between two steps. Therefore, only the vehicles that
+        changed edge or lane (or entered or exited the network) are moved
+        between buckets, and the buckets, which are nearly sorted, are then
+        sorted again, which takes close to linear time for nearly sorted
+        lists. Vehicles at the same position keep their previous order, and
+        edges without vehicles are not stored.
+
+        Returns
+        -------
+        dict < str, float >
+            position of every vehicle in a bucket
+        """
+        network = self.master_kernel.network
+        if self._max_lanes is None:
+            tot_list = network.get_edge_list() + network.get_junction_list()
+            self._num_edges = len(tot_list)
+            self._max_lanes = max(
+                [network.num_lanes(edge_id) for edge_id in tot_list])
+
+        buckets = self._lane_buckets
+        bucket_of = self._bucket_of
+        ids = self.get_ids()
+
+        # remove the vehicles that exited the network
+        for veh_id in bucket_of.keys() - set(ids):
+            edge, lane = bucket_of.pop(veh_id)
+            buckets[edge][lane].remove(veh_id)
+
+        # move the vehicles that changed edge or lane. The subscription
+        # results are read directly (rather than through get_edge, etc.) since
+        # this is done for every vehicle at every step
+        sumo_obs = self.__sumo_obs
+        positions = {}
+        for veh_id in ids:
+            obs = sumo_obs.get(veh_id) or {}
+            edge = obs.get(tc.VAR_ROAD_ID, "")
+            if edge:
+                lane = obs.get(tc.VAR_LANE_INDEX, -1001)
+                positions[veh_id] = obs.get(tc.VAR_LANEPOSITION, -1001)
+                bucket = (edge, lane)
+            else:
+                bucket = None
+
+            prev_bucket = bucket_of.get(veh_id)
+            if bucket != prev_bucket:
+                if prev_bucket is not None:
+                    buckets[prev_bucket[0]][prev_bucket[1]].remove(veh_id)
+                    del bucket_of[veh_id]
+                if bucket is not None:
+                    if edge not in buckets:
+                        buckets[edge] = [[] for _ in range(self._max_lanes)]
+                    buckets[edge][lane].append(veh_id)
+                    bucket_of[veh_id] = bucket
+
+        # sort the vehicles in every lane by position, and discard the edges
+        # that no longer have any vehicles
+        for edge in list(buckets):
+            lanes = buckets[edge]
+            if not any(lanes):
+                del buckets[edge]
+                continue
+            for veh_ids in lanes:
+                if len(veh_ids) > 1:
+                    veh_ids.sort(key=positions.__getitem__)
+
+        return positions
+
     def _multi_lane_headways(self):
         """Compute multi-lane data for all vehicles.
 
         This includes the lane leaders/followers/headways/tailways/
         leader velocity/follower velocity for all
         vehicles in the network.
+
+        Returns
+        -------
+        dict < str, float >
+            position of every vehicle in a lane bucket
         """
-        edge_list = self.master_kernel.network.get_edge_list()
-        junction_list = self.master_kernel.network.get_junction_list()
-        tot_list = edge_list + junction_list
-        num_edges = (len(self.master_kernel.network.get_edge_list()) + len(
-            self.master_kernel.network.get_junction_list()))
-
-        # maximum number of lanes in the network
-        max_lanes = max([self.master_kernel.network.num_lanes(edge_id)
-                         for edge_id in tot_list])
-
-        # Key = edge id
-        # Element = list, with the ith element containing tuples with the name
-        #           and position of all vehicles in lane i
-        edge_dict = dict.fromkeys(tot_list)
-
-        # add the vehicles to the edge_dict element
-        for veh_id in self.get_ids():
-            edge = self.get_edge(veh_id)
-            lane = self.get_lane(veh_id)
-            pos = self.get_position(veh_id)
-            if edge:
-                if edge_dict[edge] is None:
-                    edge_dict[edge] = [[] for _ in range(max_lanes)]
-                edge_dict[edge][lane].append((veh_id, pos))
-
-        # sort all lanes in each edge by position
-        for edge in tot_list:
-            if edge_dict[edge] is None:
-                del edge_dict[edge]
-            else:
-                for lane in range(max_lanes):
-                    edge_dict[edge][lane].sort(key=lambda x: x[1])
+        positions = self._update_lane_buckets()
+        edge_dict = self._lane_buckets
 
         for veh_id in self.get_rl_ids():
             # collect the lane leaders, followers, headways, and tailways for
@@ -757,8 +879,8 @@ class TraCIVehicle(KernelVehicle):
             edge = self.get_edge(veh_id)
             if edge:
                 headways, tailways, leaders, followers = \
-                    self._multi_lane_headways_util(veh_id, edge_dict,
-                                                   num_edges)
+                    self._multi_lane_headways_util(
+                        veh_id, edge_dict, positions, self._num_edges)
 
                 # add the above values to the vehicles class
                 self.set_lane_headways(veh_id, headways)
@@ -766,28 +888,72 @@ class TraCIVehicle(KernelVehicle):
                 self.set_lane_leaders(veh_id, leaders)
                 self.set_lane_followers(veh_id, followers)
 
-        self._ids_by_edge = dict().fromkeys(edge_list)
+        self._ids_by_edge = {
+            edge_id: list(itertools.chain.from_iterable(edge_dict[edge_id]))
+            for edge_id in edge_dict}
+
+        return positions
+
+    def _update_edge_order(self, positions):
+        """Sort the vehicles in every edge by decreasing position.
+
+        The vehicles of all edges are stored contiguously in a single list,
+        grouped by edge, with the offsets of every edge stored in
+        _edge_bounds. This allows the vehicles closest to the end of an edge,
+        as well as the number of vehicles in an edge, to be collected without
+        sorting or scanning the vehicles in the edge.
 
-        for edge_id in edge_dict:
-            edges = list(itertools.chain.from_iterable(edge_dict[edge_id]))
-            # check for edges with no vehicles
-            if len(edges) > 0:
-                edges, _ = zip(*edges)
-                self._ids_by_edge[edge_id] = list(edges)
+        The lanes of every edge are already sorted by position in the lane
+        buckets (see _update_lane_buckets), so the vehicles of an edge are
+        obtained by merging its lanes, in linear time. Vehicles at the same
+        position are ordered by lane.
+
+        Parameters
+        ----------
+        positions : dict < str, float >
+            position of every vehicle in a lane bucket
+        """
+        buckets = self._lane_buckets
+
+        # assign a persistent integer index to every edge, and collect the
+        # edges in the order of their indices
+        edge_index = self._edge_index
+        edges = sorted(buckets, key=lambda edge: edge_index.setdefault(
+            edge, len(edge_index)))
+
+        # the lanes are sorted by increasing position, and thus merged from
+        # their ends
+        key = positions.__getitem__
+        counts = np.zeros(len(edge_index), dtype=int)
+        ordered_ids = []
+        for edge in edges:
+            lanes = [reversed(veh_ids) for veh_ids in buckets[edge] if veh_ids]
+            start = len(ordered_ids)
+            if len(lanes) == 1:
+                ordered_ids.extend(lanes[0])
             else:
-                self._ids_by_edge[edge_id] = []
+                ordered_ids.extend(heapq.merge(*lanes, key=key, reverse=True))
+            counts[edge_index[edge]] = len(ordered_ids) - start
+
+        self._edge_order_ids = ordered_ids
+        self._edge_bounds = np.concatenate(([0], np.cumsum(counts)))
 
-    def _multi_lane_headways_util(self, veh_id, edge_dict, num_edges):
+    def _multi_lane_headways_util(self, veh_id, edge_dict, positions,
+                                  num_edges):
         """Compute multi-lane data for the specified vehicle.
 
         Parameters
         ----------
         veh_id : str
             name of the vehicle
-        edge_dict : dict < list<tuple> >
+        edge_dict : dict < list<list> >
             Key = Edge name
                 Index = lane index
-                Element = list sorted by position of (vehicle id, position)
+                Element = list of vehicle ids sorted by position
+        positions : dict < str, float >
+            position of every vehicle in edge_dict
+        num_edges : int
+            number of edges and junctions in the network
 
         Returns
         -------
@@ -824,46 +990,46 @@ class TraCIVehicle(KernelVehicle):
         for lane in range(num_lanes):
             # check the vehicle's current  edge for lane leaders and followers
             if len(edge_dict[this_edge][lane]) > 0:
-                ids, positions = zip(*edge_dict[this_edge][lane])
-                ids = list(ids)
-                positions = list(positions)
-                index = bisect_left(positions, this_pos)
+                ids = edge_dict[this_edge][lane]
+                lane_pos = [positions[lane_id] for lane_id in ids]
+                index = bisect_left(lane_pos, this_pos)
 
                 # if you are at the end or the front of the edge, the lane
                 # leader is in the edges in front of you
-                if (lane == this_lane and index < len(positions) - 1) \
-                        or (lane != this_lane and index < len(positions)):
+                if (lane == this_lane and index < len(lane_pos) - 1) \
+                        or (lane != this_lane and index < len(lane_pos)):
                     # check if the index does not correspond to the current
                     # vehicle
                     if ids[index] == veh_id:
                         leader[lane] = ids[index + 1]
-                        headway[lane] = (positions[index + 1] - this_pos -
+                        headway[lane] = (lane_pos[index + 1] - this_pos -
                                          self.get_length(leader[lane]))
                     else:
                         leader[lane] = ids[index]
-                        headway[lane] = (positions[index] - this_pos
+                        headway[lane] = (lane_pos[index] - this_pos
                                          - self.get_length(leader[lane]))
 
                 # you are in the back of the queue, the lane follower is in the
                 # edges behind you
                 if index > 0:
                     follower[lane] = ids[index - 1]
-                    tailway[lane] = (this_pos - positions[index - 1]
+                    tailway[lane] = (this_pos - lane_pos[index - 1]
                                      - self.get_length(veh_id))
 
             # if lane leader not found, check next edges
             if leader[lane] == "":
                 headway[lane], leader[lane] = self._next_edge_leaders(
-                    veh_id, edge_dict, lane, num_edges)
+                    veh_id, edge_dict, positions, lane, num_edges)
 
             # if lane follower not found, check previous edges
             if follower[lane] == "":
                 tailway[lane], follower[lane] = self._prev_edge_followers(
-                    veh_id, edge_dict, lane, num_edges)
+                    veh_id, edge_dict, positions, lane, num_edges)
 
         return headway, tailway, leader, follower
 
-    def _next_edge_leaders(self, veh_id, edge_dict, lane, num_edges):
+    def _next_edge_leaders(self, veh_id, edge_dict, positions, lane,
+                           num_edges):
         """Search for leaders in the next edge.
 
         Looks to the edges/junctions in front of the vehicle's current edge
@@ -894,8 +1060,8 @@ class TraCIVehicle(KernelVehicle):
 
             try:
                 if len(edge_dict[edge][lane]) > 0:
-                    leader = edge_dict[edge][lane][0][0]
-                    headway = edge_dict[edge][lane][0][1] - pos + add_length \
+                    leader = edge_dict[edge][lane][0]
+                    headway = positions[leader] - pos + add_length \
                         - self.get_length(leader)
             except KeyError:
                 # current edge has no vehicles, so move on
@@ -908,7 +1074,8 @@ class TraCIVehicle(KernelVehicle):
 
         return headway, leader
 
-    def _prev_edge_followers(self, veh_id, edge_dict, lane, num_edges):
+    def _prev_edge_followers(self, veh_id, edge_dict, positions, lane,
+                             num_edges):
         """Search for followers in the previous edge.
 
         Looks to the edges/junctions behind the vehicle's current edge for
@@ -939,9 +1106,9 @@ class TraCIVehicle(KernelVehicle):
 
             try:
                 if len(edge_dict[edge][lane]) > 0:
-                    tailway = pos - edge_dict[edge][lane][-1][1] + add_length \
-                              - self.get_length(veh_id)
-                    follower = edge_dict[edge][lane][-1][0]
+                    follower = edge_dict[edge][lane][-1]
+                    tailway = pos - positions[follower] + add_length \
+                        - self.get_length(veh_id)
             except KeyError:
                 # current edge has no vehicles, so move on
                 # print(traceback.format_exc())
@@ -1019,7 +1186,12 @@ class TraCIVehicle(KernelVehicle):
     def get_x_by_id(self, veh_id):
         """See parent class."""
         if isinstance(veh_id, (list, np.ndarray)):
-            return [self.get_x_by_id(vehID) for vehID in veh_id]
+            edges = self.get_edge(veh_id)
+            x = self.master_kernel.network.get_x_array(
+                edges, self.get_position(veh_id))
+            # vehicles that crashed or were teleported
+            x[[edge == '' for edge in edges]] = 0.
+            return x.tolist()
         if self.get_edge(veh_id) == '':
             # occurs when a vehicle crashes is teleported for some other reason
             return 0.
@@ -0,0 +1,643 @@
+"""Contains metrics computed online while running experiments.
+
+Metrics are updated once per simulation step by the Experiment class, and
+keep streaming statistics in constant memory, so that summaries of every
+rollout are available without storing the trajectories of the vehicles.
+"""
+import numpy as np
+
+
+class RunningStats:
+    """Running count, mean, variance and extrema of a stream of values.
+
+    The mean and variance are updated with Welford's algorithm, generalized to
+    batches of values (Chan et al.), so that the values of all the vehicles in
+    the network can be added at once.
+
+    Attributes
+    ----------
+    count : int
+        number of values seen so far
+    mean : float
+        mean of the values seen so far
+    min : float
+        smallest value seen so far
+    max : float
+        largest value seen so far
+    """
+
+    def __init__(self):
+        """Instantiate the statistics, with no values."""
+        self.count = 0
+        self.mean = 0.
+        self.min = np.inf
+        self.max = -np.inf
+        self._m2 = 0.
+
+    def update(self, values):
+        """Add a value, or an array of values, to the statistics.
+
+        Nan values are ignored.
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        n = len(values)
+        if n == 0:
+            return
+
+        mean = values.mean()
+        delta = mean - self.mean
+        count = self.count + n
+
+        self._m2 += ((values - mean) ** 2).sum() + \
+            delta ** 2 * self.count * n / count
+        self.mean += delta * n / count
+        self.count = count
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    @property
+    def variance(self):
+        """Return the (population) variance of the values, or nan if empty."""
+        return self._m2 / self.count if self.count > 0 else np.nan
+
+    @property
+    def std(self):
+        """Return the (population) standard deviation of the values."""
+        return np.sqrt(self.variance)
+
+
+class RollingWindow:
+    """The last values of a stream, stored in a fixed-size circular buffer.
+
+    Attributes
+    ----------
+    size : int
+        maximum number of values in the window
+    count : int
+        number of values currently in the window
+    """
+
+    def __init__(self, size):
+        """Instantiate an empty window.
+
+        Parameters
+        ----------
+        size : int
+            maximum number of values in the window
+        """
+        self.size = size
+        self.count = 0
+        self._values = np.full(size, np.nan)
+        self._index = 0
+
+    def update(self, value):
+        """Add a value to the window, removing the oldest one if full."""
+        self._values[self._index] = value
+        self._index = (self._index + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    @property
+    def full(self):
+        """Return whether the window contains `size` values."""
+        return self.count == self.size
+
+    @property
+    def values(self):
+        """Return the values in the window, from oldest to newest."""
+        if not self.full:
+            return self._values[:self.count].copy()
+        return np.roll(self._values, -self._index)
+
+    @property
+    def mean(self):
+        """Return the mean of the values in the window, or nan if empty."""
+        return np.nanmean(self._values) if self.count > 0 else np.nan
+
+    @property
+    def std(self):
+        """Return the standard deviation of the values in the window."""
+        return np.nanstd(self._values) if self.count > 0 else np.nan
+
+
+class QuantileSketch:
+    """Approximate quantiles of a stream of values, in bounded memory.
+
+    The sketch stores at most `size` weighted centroids. New values are
+    buffered, and once the buffer holds `size` values the centroids and the
+    buffer are sorted together and merged into `size` centroids of equal
+    weight. Quantiles are interpolated between the centroids.
+
+    Attributes
+    ----------
+    size : int
+        number of centroids kept by the sketch
+    count : int
+        number of values seen so far
+    """
+
+    def __init__(self, size=256):
+        """Instantiate an empty sketch.
+
+        Parameters
+        ----------
+        size : int, optional
+            number of centroids kept by the sketch. Larger sketches are more
+            accurate, and use more memory.
+        """
+        self.size = size
+        self.count = 0
+        self._values = np.empty(0)
+        self._weights = np.empty(0)
+        self._buffer = []
+        self._buffered = 0
+
+    def update(self, values):
+        """Add a value, or an array of values, to the sketch.
+
+        Nan values are ignored.
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+
+        self._buffer.append(values)
+        self._buffered += len(values)
+        self.count += len(values)
+        if self._buffered >= self.size:
+            self._compress()
+
+    def _compress(self):
+        """Merge the buffered values into the centroids."""
+        values = np.concatenate([self._values] + self._buffer)
+        weights = np.concatenate(
+            [self._weights] + [np.ones(len(b)) for b in self._buffer])
+        self._buffer = []
+        self._buffered = 0
+
+        order = np.argsort(values, kind='stable')
+        values, weights = values[order], weights[order]
+        if len(values) > self.size:
+            # assign every centroid to one of `size` bins of equal weight
+            cum_weights = np.cumsum(weights) - weights / 2
+            bins = np.minimum(
+                (cum_weights / cum_weights[-1] * self.size).astype(int),
+                self.size - 1)
+            bin_weights = np.bincount(bins, weights, minlength=self.size)
+            bin_values = np.bincount(
+                bins, weights * values, minlength=self.size)
+            keep = bin_weights > 0
+            values = bin_values[keep] / bin_weights[keep]
+            weights = bin_weights[keep]
+
+        self._values, self._weights = values, weights
+
+    def quantile(self, q):
+        """Return approximate quantiles of the values.
+
+        Parameters
+        ----------
+        q : float or array_like of float
+            quantile(s) to compute, between 0 and 1
+
+        Returns
+        -------
+        float or np.ndarray
+            the quantile(s), or nan if the sketch is empty
+        """
+        if self._buffered > 0:
+            self._compress()
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan)[()]
+
+        # every centroid is located at the middle of its weight
+        cum_weights = np.cumsum(self._weights) - self._weights / 2
+        return np.interp(np.asarray(q) * np.sum(self._weights),
+                         cum_weights, self._values)
+
+
+class Reduction:
+    """Base class of the reductions of the values of a custom callable.
+
+    The values returned by a custom callable during a rollout are folded into
+    the reduction as they are computed, and the result of the reduction is
+    added to the results of the rollout.
+    """
+
+    def reset(self):
+        """Reset the reduction at the start of a rollout."""
+        raise NotImplementedError
+
+    def update(self, value):
+        """Fold a value (or an array of values) into the reduction."""
+        raise NotImplementedError
+
+    def result(self):
+        """Return the result of the reduction over the current rollout.
+
+        Returns
+        -------
+        float or np.ndarray or dict < str, float >
+            the result. Dictionaries are added to the results of the rollout
+            with one entry per key, suffixed to the name of the callable.
+        """
+        raise NotImplementedError
+
+
+class Mean(Reduction):
+    """Mean of the values, ignoring nan values."""
+
+    def __init__(self):
+        """Instantiate the reduction."""
+        self.reset()
+
+    def reset(self):
+        """See parent class."""
+        self.stats = RunningStats()
+
+    def update(self, value):
+        """See parent class."""
+        self.stats.update(value)
+
+    def result(self):
+        """See parent class."""
+        return self.stats.mean if self.stats.count else np.nan
+
+
+class Max(Reduction):
+    """Largest value, ignoring nan values."""
+
+    def __init__(self):
+        """Instantiate the reduction."""
+        self.reset()
+
+    def reset(self):
+        """See parent class."""
+        self.value = np.nan
+
+    def update(self, value):
+        """See parent class."""
+        value = np.asarray(value, dtype=float).ravel()
+        if len(value) > 0:
+            self.value = np.fmax(self.value, np.fmax.reduce(value))
+
+    def result(self):
+        """See parent class."""
+        return float(self.value)
+
+
+class Last(Reduction):
+    """Last value."""
+
+    def __init__(self):
+        """Instantiate the reduction."""
+        self.reset()
+
+    def reset(self):
+        """See parent class."""
+        self.value = np.nan
+
+    def update(self, value):
+        """See parent class."""
+        self.value = value
+
+    def result(self):
+        """See parent class."""
+        return self.value
+
+
+class Quantiles(Reduction):
+    """Approximate quantiles of the values, see QuantileSketch.
+
+    The result has one entry per quantile, keyed by "q<percent>".
+    """
+
+    def __init__(self, quantiles=(0.05, 0.5, 0.95), size=256):
+        """Instantiate the reduction.
+
+        Parameters
+        ----------
+        quantiles : list of float, optional
+            quantiles to compute, between 0 and 1
+        size : int, optional
+            size of the sketch
+        """
+        self.quantiles = list(quantiles)
+        self.size = size
+        self.reset()
+
+    def reset(self):
+        """See parent class."""
+        self.sketch = QuantileSketch(self.size)
+
+    def update(self, value):
+        """See parent class."""
+        self.sketch.update(value)
+
+    def result(self):
+        """See parent class."""
+        values = self.sketch.quantile(self.quantiles)
+        return {'q{:g}'.format(100 * q): value
+                for q, value in zip(self.quantiles, values)}
+
+
+class Histogram(Reduction):
+    """Counts of the values within a set of bins.
+
+    Values outside of the bins are not counted.
+    """
+
+    def __init__(self, bins):
+        """Instantiate the reduction.
+
+        Parameters
+        ----------
+        bins : array_like of float
+            increasing edges of the bins, including the rightmost edge. As in
+            np.histogram, all bins but the last are half-open.
+        """
+        self.bins = np.asarray(bins, dtype=float)
+        self.counts = np.zeros(len(self.bins) - 1, dtype=int)
+
+    def reset(self):
+        """See parent class."""
+        self.counts[:] = 0
+
+    def update(self, value):
+        """See parent class."""
+        value = np.asarray(value, dtype=float).ravel()
+        index = np.searchsorted(self.bins, value, side='right') - 1
+        # the rightmost edge is included in the last bin
+        index[value == self.bins[-1]] = len(self.counts) - 1
+        index = index[(index >= 0) & (index < len(self.counts))]
+        self.counts += np.bincount(index, minlength=len(self.counts))
+
+    def result(self):
+        """See parent class."""
+        return self.counts.copy()
+
+
+# reductions that can be declared by name
+REDUCTIONS = {
+    'mean': Mean,
+    'max': Max,
+    'last': Last,
+    'quantiles': Quantiles,
+}
+
+
+def get_reduction(reduction):
+    """Return the reduction declared by a custom callable.
+
+    Parameters
+    ----------
+    reduction : str or Reduction
+        a Reduction object, or the name of a reduction in REDUCTIONS
+
+    Returns
+    -------
+    Reduction
+        the reduction
+
+    Raises
+    ------
+    ValueError
+        if the reduction is unknown
+    """
+    if isinstance(reduction, Reduction):
+        return reduction
+    if reduction not in REDUCTIONS:
+        raise ValueError(
+            'Unknown reduction {}. Reductions must be Reduction objects (e.g. '
+            'Histogram(bins)), or one of: {}'.format(
+                reduction, ', '.join(REDUCTIONS)))
+    return REDUCTIONS[reduction]()
+
+
+class Metric:
+    """Base class of the metrics computed online by the Experiment class.
+
+    A metric is reset at the start of every rollout, updated after every
+    simulation step, and summarized at the end of the rollout. Its summary is
+    added to the results of the experiment.
+
+    Attributes
+    ----------
+    done : bool
+        whether the metric requests the end of the current rollout. The
+        rollout ends early as soon as any metric is done.
+    """
+
+    done = False
+
+    def reset(self):
+        """Reset the metric at the start of a rollout."""
+        pass
+
+    def update(self, env):
+        """Update the metric after a simulation step.
+
+        Parameters
+        ----------
+        env : flow.envs.Env
+            the environment after the step
+        """
+        raise NotImplementedError
+
+    def summary(self):
+        """Return the summary of the current rollout.
+
+        Returns
+        -------
+        dict < str, float >
+            values of the metric, keyed by their names
+        """
+        raise NotImplementedError
+
+
+class FleetMetrics(Metric):
+    """Streaming statistics of the speeds, headways and accelerations.
+
+    At every step, the speed, headway (for vehicles with a leader) and
+    realized acceleration of every vehicle are added to running statistics
+    and quantile sketches. The fleet mean speed is also added to a rolling
+    window, to measure whether the mean speed has converged by the end of the
+    rollout. Finally, emergency brakes are counted, i.e. the samples at which
+    a vehicle brakes harder than twice the acceleration requested by its
+    controller (or brakes at all when asked to accelerate).
+
+    Samples with invalid speeds (e.g. of vehicles that are not yet inserted in
+    the simulation) are ignored, as well as the accelerations computed from
+    them.
+
+    The summary contains, for each of speed, headway and accel:
+
+    * <name>_mean, <name>_std, <name>_min and <name>_max
+    * <name>_q<percent> for each of the requested quantiles
+
+    as well as:
+
+    * emergency_brakes: the number of emergency brakes
+    * rolling_speed_mean and rolling_speed_std: the mean and standard
+      deviation of the fleet mean speed over the last steps of the rollout
+    """
+
+    def __init__(self, window=100, quantiles=(0.05, 0.5, 0.95), sketch_size=256):
+        """Instantiate the metrics.
+
+        Parameters
+        ----------
+        window : int, optional
+            number of steps in the rolling window of the fleet mean speed
+        quantiles : list of float, optional
+            quantiles of the speed, headway and accel to report
+        sketch_size : int, optional
+            size of the quantile sketches, see QuantileSketch
+        """
+        self.window = window
+        self.quantiles = list(quantiles)
+        self.sketch_size = sketch_size
+        self.reset()
+
+    def reset(self):
+        """See parent class."""
+        self.stats = {name: RunningStats()
+                      for name in ['speed', 'headway', 'accel']}
+        self.sketches = {name: QuantileSketch(self.sketch_size)
+                         for name in ['speed', 'headway', 'accel']}
+        self.mean_speed = RollingWindow(self.window)
+        self.emergency_brakes = 0
+        self._invalid_ids = set()
+
+    def update(self, env):
+        """See parent class."""
+        vehicle = env.k.vehicle
+        veh_ids = vehicle.get_ids()
+        if len(veh_ids) == 0:
+            return
+
+        speed = np.array(vehicle.get_speed(veh_ids), dtype=float)
+        invalid = speed < 0
+        speed[invalid] = np.nan
+        has_leader = np.array(
+            [bool(leader) for leader in vehicle.get_leader(veh_ids)])
+        headway = np.array(vehicle.get_headway(veh_ids), dtype=float)
+        accel = np.array(
+            [np.nan if veh_id in self._invalid_ids
+             else vehicle.get_realized_accel(veh_id) for veh_id in veh_ids],
+            dtype=float)
+        accel[invalid] = np.nan
+        self._invalid_ids = set(np.asarray(veh_ids)[invalid])
+        target_accel = np.array(
+            [vehicle.get_accel(veh_id, noise=False, failsafe=True)
+             for veh_id in veh_ids], dtype=float)
+
+        for name, values in [('speed', speed),
+                             ('headway', headway[has_leader]),
+                             ('accel', accel)]:
+            self.stats[name].update(values)
+            self.sketches[name].update(values)
+
+        if not invalid.all():
+            self.mean_speed.update(np.nanmean(speed))
+        with np.errstate(invalid='ignore'):
+            self.emergency_brakes += int(np.sum(
+                (accel < 0) & (accel < 2 * target_accel)))
+
+    def summary(self):
+        """See parent class."""
+        ret = {}
+        for name, stats in self.stats.items():
+            ret['{}_mean'.format(name)] = stats.mean if stats.count else np.nan
+            ret['{}_std'.format(name)] = stats.std
+            ret['{}_min'.format(name)] = stats.min if stats.count else np.nan
+            ret['{}_max'.format(name)] = stats.max if stats.count else np.nan
+            quantiles = self.sketches[name].quantile(self.quantiles)
+            for q, value in zip(self.quantiles, quantiles):
+                ret['{}_q{:g}'.format(name, 100 * q)] = value
+        ret['emergency_brakes'] = self.emergency_brakes
+        ret['rolling_speed_mean'] = self.mean_speed.mean
+        ret['rolling_speed_std'] = self.mean_speed.std
+        return ret
+
+
+class SteadyState(Metric):
+    """Ends rollouts early once the network has reached a steady state.
+
+    At every step, the fleet mean speed and the standard deviation of the
+    headways are added to rolling windows. The network is in a steady state
+    once the standard deviations of both windows are within their tolerances.
+    This is the case for uniform flows, as well as for stop-and-go waves that
+    travel without growing or decaying, since in both cases these fleet-level
+    quantities are constant.
+
+    The summary contains the convergence_time: the time (in sec) at which the
+    steady period started, i.e. the first of the consecutive steps within
+    tolerance, or nan if the rollout did not converge. The steady state is
+    only detected, and the rollout ended, `patience` steps later.
+    """
+
+    def __init__(self, window=100, speed_tol=0.05, headway_tol=0.1, patience=50, min_steps=0):
+        """Instantiate the detector.
+
+        Parameters
+        ----------
+        window : int, optional
+            number of steps in the rolling windows
+        speed_tol : float, optional
+            tolerance on the standard deviation of the fleet mean speed in the
+            window (in m/s)
+        headway_tol : float, optional
+            tolerance on the standard deviation of the headway spread in the
+            window (in m)
+        patience : int, optional
+            number of consecutive steps within tolerance after which the
+            rollout is ended
+        min_steps : int, optional
+            number of steps before which the rollout is never ended
+        """
+        self.window = window
+        self.speed_tol = speed_tol
+        self.headway_tol = headway_tol
+        self.patience = patience
+        self.min_steps = min_steps
+        self.reset()
+
+    def reset(self):
+        """See parent class."""
+        self.mean_speed = RollingWindow(self.window)
+        self.headway_std = RollingWindow(self.window)
+        self.steps = 0
+        self.steady_steps = 0
+        self.convergence_time = np.nan
+        self.done = False
+
+    def update(self, env):
+        """See parent class."""
+        self.steps += 1
+        veh_ids = env.k.vehicle.get_ids()
+        if len(veh_ids) == 0:
+            return
+
+        speed = np.array(env.k.vehicle.get_speed(veh_ids), dtype=float)
+        headway = np.array(env.k.vehicle.get_headway(veh_ids), dtype=float)
+        self.mean_speed.update(np.mean(speed[speed >= 0]) if any(speed >= 0) else np.nan)
+        self.headway_std.update(np.std(headway[headway >= 0]) if any(headway >= 0) else np.nan)
+
+        if self.mean_speed.full and \
+                self.mean_speed.std <= self.speed_tol and \
+                self.headway_std.std <= self.headway_tol:
+            self.steady_steps += 1
+        else:
+            self.steady_steps = 0
+
+        if self.steady_steps >= self.patience and self.steps >= self.min_steps:
+            # time_counter counts simulation steps, and steady_steps env steps
+            self.convergence_time = \
+                (env.time_counter - self.steady_steps * env.env_params.sims_per_step) * env.sim_step
+            self.done = True
+
+    def summary(self):
+        """See parent class."""
+        return {'convergence_time': self.convergence_time}
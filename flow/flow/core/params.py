@@ -373,6 +373,26 @@ class VehicleParams:
         """
         return self.__vehicles[veh_id]["type"]
 
+    def __copy__(self):
+        """Return a copy of the vehicles that can be added to independently.
+
+        The containers of the vehicles and their types are copied, while the
+        parameters of each type (controllers, car following and lane change
+        params, etc.), which are never modified once added, are shared with
+        the copy. This is much cheaper than a deep copy for networks with many
+        vehicle types.
+        """
+        new = self.__class__.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        new.ids = list(self.ids)
+        new.__vehicles = collections.OrderedDict(
+            (veh_id, dict(veh)) for veh_id, veh in self.__vehicles.items())
+        new.types = list(self.types)
+        new.type_parameters = dict(self.type_parameters)
+        new.minGap = dict(self.minGap)
+        new.initial = list(self.initial)
+        return new
+
 
 class SimParams(object):
     """Simulation-specific parameters.
@@ -411,6 +431,13 @@ class SimParams(object):
         specifies rendering resolution (pixel / meter)
     force_color_update : bool, optional
         whether or not to automatically color vehicles according to their types
+    renderer : str, optional
+        renderer used by the "gray", "dgray", "rgb" and "drgb" render modes
+
+        * "pyglet": pyglet renderer, which requires a display (see
+          flow.renderer.pyglet_renderer.PygletRenderer)
+        * "numpy": headless renderer, which rasterizes the frames with numpy
+          (see flow.renderer.numpy_renderer.NumpyRenderer)
     """
 
     def __init__(self,
@@ -422,7 +449,8 @@ class SimParams(object):
                  sight_radius=25,
                  show_radius=False,
                  pxpm=2,
-                 force_color_update=False):
+                 force_color_update=False,
+                 renderer="pyglet"):
         """Instantiate SimParams."""
         self.sim_step = sim_step
         self.render = render
@@ -433,6 +461,7 @@ class SimParams(object):
         self.pxpm = pxpm
         self.show_radius = show_radius
         self.force_color_update = force_color_update
+        self.renderer = renderer
 
 
 class AimsunParams(SimParams):
@@ -566,6 +595,13 @@ class SumoParams(SimParams):
         specifies rendering resolution (pixel / meter)
     force_color_update : bool, optional
         whether or not to automatically color vehicles according to their types
+    renderer : str, optional
+        renderer used by the "gray", "dgray", "rgb" and "drgb" render modes
+
+        * "pyglet": pyglet renderer, which requires a display (see
+          flow.renderer.pyglet_renderer.PygletRenderer)
+        * "numpy": headless renderer, which rasterizes the frames with numpy
+          (see flow.renderer.numpy_renderer.NumpyRenderer)
     overtake_right : bool, optional
         whether vehicles are allowed to overtake on the right as well as
         the left
@@ -588,6 +624,14 @@ class SumoParams(SimParams):
         current time step
     use_ballistic: bool, optional
         If true, use a ballistic integration step instead of an euler step
+    record_path : str, optional
+        path to a file in which the responses of the sumo instance to every
+        TraCI command are recorded, see
+        flow/core/kernel/simulation/traci_trace.py
+    replay_path : str, optional
+        path to a file recorded with `record_path`. If specified, the
+        responses in this file are replayed in place of a sumo instance, which
+        is then never started
     """
 
     def __init__(self,
@@ -609,11 +653,14 @@ class SumoParams(SimParams):
                  teleport_time=-1,
                  num_clients=1,
                  color_by_speed=False,
-                 use_ballistic=False):
+                 use_ballistic=False,
+                 record_path=None,
+                 replay_path=None,
+                 renderer="pyglet"):
         """Instantiate SumoParams."""
         super(SumoParams, self).__init__(
             sim_step, render, restart_instance, emission_path, save_render,
-            sight_radius, show_radius, pxpm, force_color_update)
+            sight_radius, show_radius, pxpm, force_color_update, renderer)
         self.port = port
         self.lateral_resolution = lateral_resolution
         self.no_step_log = no_step_log
@@ -624,6 +671,8 @@ class SumoParams(SimParams):
         self.num_clients = num_clients
         self.color_by_speed = color_by_speed
         self.use_ballistic = use_ballistic
+        self.record_path = record_path
+        self.replay_path = replay_path
 
 
 class EnvParams:
@@ -436,3 +436,307 @@ def miles_per_gallon(env, veh_ids=None, gain=.001):
     mpg /= 1609.0
 
     return mpg * gain
+
+
+def fleet_speeds(env, veh_ids=None):
+    """Collect the current and previous speeds of a set of vehicles.
+
+    This is meant to be called once per step, with the output passed to the
+    array-based reward functions below so that the kernel is only queried a
+    single time for every vehicle.
+
+    Parameters
+    ----------
+    env : flow.envs.Env
+        the environment variable, which contains information on the current
+        state of the system.
+    veh_ids : list of str, optional
+        list of vehicle ids to collect the speeds of. If no veh_ids are
+        specified, the speeds of all vehicles in the network are collected
+
+    Returns
+    -------
+    np.ndarray
+        current speed of every vehicle
+    np.ndarray
+        speed of every vehicle at the previous time step
+    """
+    if veh_ids is None:
+        veh_ids = env.k.vehicle.get_ids()
+    speed = np.asarray(env.k.vehicle.get_speed(veh_ids), dtype=float)
+    prev_speed = np.asarray(
+        env.k.vehicle.get_previous_speed(veh_ids), dtype=float)
+    return speed, prev_speed
+
+
+def vehicle_power(speed, prev_speed, sim_step):
+    """Calculate the power consumption of every vehicle in a fleet.
+
+    This is the array-based analogue of the power computation performed in
+    ``veh_energy_consumption``, and is subject to the same assumptions.
+
+    Parameters
+    ----------
+    speed : array_like
+        current speed of every vehicle
+    prev_speed : array_like
+        speed of every vehicle at the previous time step
+    sim_step : float
+        simulation time step
+
+    Returns
+    -------
+    np.ndarray
+        power consumed by every vehicle (W)
+    """
+    M = 1200  # mass of average sized vehicle (kg)
+    g = 9.81  # gravitational acceleration (m/s^2)
+    Cr = 0.005  # rolling resistance coefficient
+    Ca = 0.3  # aerodynamic drag coefficient
+    rho = 1.225  # air density (kg/m^3)
+    A = 2.6  # vehicle cross sectional area (m^2)
+
+    speed = np.asarray(speed, dtype=float)
+    prev_speed = np.asarray(prev_speed, dtype=float)
+    accel = np.abs(speed - prev_speed) / sim_step
+
+    return M * speed * accel + M * g * Cr * speed \
+        + 0.5 * rho * A * Ca * speed ** 3
+
+
+def desired_velocity_array(vel, target_vel, fail=False):
+    """Array-based variant of ``desired_velocity``.
+
+    Parameters
+    ----------
+    vel : array_like
+        speed of every vehicle the reward is computed over
+    target_vel : float
+        the desired velocity
+    fail : bool, optional
+        specifies if any crash or other failure occurred in the system
+
+    Returns
+    -------
+    float
+        reward value
+    """
+    vel = np.asarray(vel, dtype=float)
+    num_vehicles = vel.shape[0]
+
+    if fail or num_vehicles == 0 or np.any(vel < -100):
+        return 0.
+
+    max_cost = np.linalg.norm(np.full(num_vehicles, target_vel, dtype=float))
+    cost = np.linalg.norm(vel - target_vel)
+
+    # epsilon term (to deal with ZeroDivisionError exceptions)
+    eps = np.finfo(np.float32).eps
+
+    return max(max_cost - cost, 0) / (max_cost + eps)
+
+
+def average_velocity_array(vel, fail=False):
+    """Array-based variant of ``average_velocity``.
+
+    Parameters
+    ----------
+    vel : array_like
+        speed of every vehicle in the network
+    fail : bool, optional
+        specifies if any crash or other failure occurred in the system
+
+    Returns
+    -------
+    float
+        reward value
+    """
+    vel = np.asarray(vel, dtype=float)
+
+    if fail or vel.shape[0] == 0 or np.any(vel < -100):
+        return 0.
+
+    return np.mean(vel)
+
+
+def min_delay_array(vel, v_top, sim_step):
+    """Array-based variant of ``min_delay``.
+
+    Parameters
+    ----------
+    vel : array_like
+        speed of every vehicle in the network
+    v_top : float
+        maximum speed limit in the network
+    sim_step : float
+        simulation time step
+
+    Returns
+    -------
+    float
+        reward value
+    """
+    vel = np.asarray(vel, dtype=float)
+    vel = vel[vel >= -1e-6]
+
+    max_cost = sim_step * vel.shape[0]
+
+    # epsilon term (to deal with ZeroDivisionError exceptions)
+    eps = np.finfo(np.float32).eps
+
+    cost = sim_step * np.sum((v_top - vel) / v_top)
+    return max((max_cost - cost) / (max_cost + eps), 0)
+
+
+def min_delay_unscaled_array(vel, v_top, sim_step):
+    """Array-based variant of ``min_delay_unscaled``.
+
+    Parameters
+    ----------
+    vel : array_like
+        speed of every vehicle in the network
+    v_top : float
+        maximum speed limit in the network
+    sim_step : float
+        simulation time step
+
+    Returns
+    -------
+    float
+        reward value
+    """
+    vel = np.asarray(vel, dtype=float)
+    num_vehicles = vel.shape[0]
+    vel = vel[vel >= -1e-6]
+
+    # epsilon term (to deal with ZeroDivisionError exceptions)
+    eps = np.finfo(np.float32).eps
+
+    cost = sim_step * np.sum((v_top - vel) / v_top)
+    return cost / (num_vehicles + eps)
+
+
+def penalize_standstill_array(vel, gain=1):
+    """Array-based variant of ``penalize_standstill``.
+
+    Parameters
+    ----------
+    vel : array_like
+        speed of every vehicle in the network
+    gain : float
+        multiplicative factor on the action penalty
+
+    Returns
+    -------
+    float
+        reward value
+    """
+    vel = np.asarray(vel, dtype=float)
+    return -gain * np.count_nonzero(vel == 0)
+
+
+def penalize_near_standstill_array(vel, thresh=0.3, gain=1):
+    """Array-based variant of ``penalize_near_standstill``.
+
+    Parameters
+    ----------
+    vel : array_like
+        speed of every vehicle in the network
+    thresh : float
+        the velocity threshold below which penalties are applied
+    gain : float
+        multiplicative factor on the action penalty
+
+    Returns
+    -------
+    float
+        reward value
+    """
+    vel = np.asarray(vel, dtype=float)
+    return -gain * np.count_nonzero(vel < thresh)
+
+
+def energy_consumption_array(speed, prev_speed, sim_step, gain=.001):
+    """Array-based variant of ``energy_consumption``.
+
+    Parameters
+    ----------
+    speed : array_like
+        current speed of every vehicle
+    prev_speed : array_like
+        speed of every vehicle at the previous time step
+    sim_step : float
+        simulation time step
+    gain : float
+        scaling factor for the reward
+
+    Returns
+    -------
+    float
+        reward value
+    """
+    return -gain * np.sum(vehicle_power(speed, prev_speed, sim_step))
+
+
+def miles_per_megajoule_array(speed, prev_speed, sim_step, gain=.001):
+    """Array-based variant of ``miles_per_megajoule``.
+
+    Parameters
+    ----------
+    speed : array_like
+        current speed of every vehicle
+    prev_speed : array_like
+        speed of every vehicle at the previous time step
+    sim_step : float
+        simulation time step
+    gain : float
+        scaling factor for the reward
+
+    Returns
+    -------
+    float
+        reward value
+    """
+    speed = np.asarray(speed, dtype=float)
+    power = vehicle_power(speed, prev_speed, sim_step)
+
+    valid = (power > 0) & (speed >= 0.0)
+    if np.any(valid):
+        # meters / joule is (v * \delta t) / (power * \delta t)
+        mpj = np.mean(speed[valid] / power[valid])
+    else:
+        mpj = 0
+
+    # convert from meters per joule to miles per megajoule
+    return mpj / 1609.0 * 10**6 * gain
+
+
+def miles_per_gallon_array(speed, gallons_per_s, gain=.001):
+    """Array-based variant of ``miles_per_gallon``.
+
+    Parameters
+    ----------
+    speed : array_like
+        current speed of every vehicle
+    gallons_per_s : array_like
+        fuel consumption of every vehicle, in gallons/s
+    gain : float
+        scaling factor for the reward
+
+    Returns
+    -------
+    float
+        reward value
+    """
+    speed = np.asarray(speed, dtype=float)
+    gallons_per_s = np.asarray(gallons_per_s, dtype=float)
+
+    valid = (gallons_per_s > 0) & (speed >= 0.0)
+    if np.any(valid):
+        # meters / gallon is (v * \delta t) / (gallons_per_s * \delta t)
+        mpg = np.mean(speed[valid] / gallons_per_s[valid])
+    else:
+        mpg = 0
+
+    # convert from meters per gallon to miles per gallon
+    return mpg / 1609.0 * gain
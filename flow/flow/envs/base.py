@@ -1,7 +1,7 @@
 """Base environment class. This is the parent of all other environments."""
 
 from abc import ABCMeta, abstractmethod
-from copy import deepcopy
+from copy import copy, deepcopy
 import os
 import atexit
 import time
@@ -10,7 +10,6 @@ import numpy as np
 import random
 import shutil
 import subprocess
-from flow.renderer.pyglet_renderer import PygletRenderer as Renderer
 from flow.utils.flow_warnings import deprecated_attribute
 
 import gym
@@ -94,7 +93,7 @@ class Env(gym.Env, metaclass=ABCMeta):
         the available_routes variable contains a dictionary of routes vehicles
         can traverse; to be used when routes need to be chosen dynamically.
         Equivalent to `network.rts`.
-    renderer : flow.renderer.pyglet_renderer.PygletRenderer or None
+    renderer : flow.renderer.PygletRenderer or flow.renderer.NumpyRenderer or None
         renderer class, used to collect image-based representations of the
         traffic network. This attribute is set to None if `sim_params.render`
         is set to True or False.
@@ -130,7 +129,7 @@ class Env(gym.Env, metaclass=ABCMeta):
         self.network = scenario if scenario is not None else network
         self.net_params = self.network.net_params
         self.initial_config = self.network.initial_config
-        self.sim_params = deepcopy(sim_params)
+        self.sim_params = copy(sim_params)
         # check whether we should be rendering
         self.should_render = self.sim_params.render
         self.sim_params.render = False
@@ -163,8 +162,9 @@ class Env(gym.Env, metaclass=ABCMeta):
         # network components within the network kernel
         self.k.network.generate_network(self.network)
 
-        # initial the vehicles kernel using the VehicleParams object
-        self.k.vehicle.initialize(deepcopy(self.network.vehicles))
+        # initial the vehicles kernel using the VehicleParams object (which is
+        # only read by the kernel, and therefore not copied)
+        self.k.vehicle.initialize(self.network.vehicles)
 
         # initialize the simulation using the simulation kernel. This will use
         # the network kernel as an input in order to determine what network
@@ -181,7 +181,7 @@ class Env(gym.Env, metaclass=ABCMeta):
         self.available_routes = self.k.network.rts
 
         # store the initial vehicle ids
-        self.initial_ids = deepcopy(self.network.vehicles.ids)
+        self.initial_ids = list(self.network.vehicles.ids)
 
         # store the initial state of the vehicles kernel (needed for restarting
         # the simulation)
@@ -208,7 +208,19 @@ class Env(gym.Env, metaclass=ABCMeta):
                 lane_poly = [i for pt in _lane_poly for i in pt]
                 network.append(lane_poly)
 
-            # instantiate a pyglet renderer
+            # instantiate a pyglet (or headless numpy) renderer, only imported
+            # when rendering, to avoid importing pyglet and opencv in headless
+            # runs
+            renderer = getattr(self.sim_params, 'renderer', 'pyglet')
+            if renderer == 'pyglet':
+                from flow.renderer.pyglet_renderer import PygletRenderer \
+                    as Renderer
+            elif renderer == 'numpy':
+                from flow.renderer.numpy_renderer import NumpyRenderer \
+                    as Renderer
+            else:
+                raise FatalFlowError(
+                    'Renderer %s is not supported!' % renderer)
             self.renderer = Renderer(
                 network,
                 self.sim_params.render,
@@ -248,7 +260,8 @@ class Env(gym.Env, metaclass=ABCMeta):
         self.k.close()
 
         # killed the sumo process if using sumo/TraCI
-        if self.simulator == 'traci':
+        if self.simulator == 'traci' and \
+                self.k.simulation.sumo_proc is not None:
             self.k.simulation.sumo_proc.kill()
 
         if render is not None:
@@ -259,7 +272,7 @@ class Env(gym.Env, metaclass=ABCMeta):
             self.sim_params.emission_path = sim_params.emission_path
 
         self.k.network.generate_network(self.network)
-        self.k.vehicle.initialize(deepcopy(self.network.vehicles))
+        self.k.vehicle.initialize(self.network.vehicles)
         kernel_api = self.k.simulation.start_simulation(
             network=self.k.network, sim_params=self.sim_params)
         self.k.pass_api(kernel_api)
@@ -787,18 +800,7 @@ class Env(gym.Env, metaclass=ABCMeta):
                                           human_logs,
                                           machine_logs)
 
-        # get local observation of RL vehicles
-        self.sights = []
-        for id in human_idlist:
-            # Force tracking human vehicles by adding "track" in vehicle id.
-            # The tracked human vehicles will be treated as machine vehicles.
-            if "track" in id:
-                orientation = self.k.vehicle.get_orientation(id)
-                sight = self.renderer.get_sight(
-                    orientation, id)
-                self.sights.append(sight)
-        for id in machine_idlist:
-            orientation = self.k.vehicle.get_orientation(id)
-            sight = self.renderer.get_sight(
-                orientation, id)
-            self.sights.append(sight)
+        # get local observation of RL vehicles (and tracked human vehicles),
+        # extracted all at once
+        self.sights = list(self.renderer.get_sights(
+            machine_orientations, [log[-1] for log in machine_logs]))
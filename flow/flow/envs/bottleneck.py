@@ -806,6 +806,25 @@ class BottleneckDesiredVelocityEnv(BottleneckEnv):
             self.obs_slices[edge] = np.linspace(0, edge_length,
                                                 num_segments + 1)
 
+        # lay out the (edge, segment, lane) grid of the observation as a flat
+        # array, and stack the segment boundaries of all observed edges so
+        # that the segments of every vehicle are found in a single search.
+        # Each edge is shifted by a constant larger than any edge length.
+        self._obs_num_lanes = np.array(
+            [self.k.network.num_lanes(edge) for edge in EDGE_LIST])
+        self._obs_num_segments = np.array(
+            self.num_obs_segments[:len(EDGE_LIST)])
+        num_cells = self._obs_num_segments * self._obs_num_lanes
+        self._obs_cell_offset = np.cumsum(num_cells) - num_cells
+        self._obs_num_cells = int(np.sum(num_cells))
+        self._obs_edge_shift = 2 * max(
+            self.k.network.edge_length(edge) for edge in EDGE_LIST)
+        bounds = [i * self._obs_edge_shift + self.obs_slices[edge]
+                  for i, edge in enumerate(EDGE_LIST)]
+        self._obs_bounds = np.concatenate(bounds)
+        self._obs_bounds_offset = np.cumsum(
+            [len(b) for b in bounds]) - [len(b) for b in bounds]
+
         # self.symmetric is True if all lanes in a segment
         # have same action, else False
         self.symmetric = additional_params.get("symmetric")
@@ -891,58 +910,51 @@ class BottleneckDesiredVelocityEnv(BottleneckEnv):
         Finally, we also append the total outflow of the bottleneck over the
         last 20 * self.sim_step seconds.
         """
-        num_vehicles_list = []
-        num_rl_vehicles_list = []
-        vehicle_speeds_list = []
-        rl_speeds_list = []
+        ids = []
+        edge_index = []
         for i, edge in enumerate(EDGE_LIST):
-            num_lanes = self.k.network.num_lanes(edge)
-            num_vehicles = np.zeros((self.num_obs_segments[i], num_lanes))
-            num_rl_vehicles = np.zeros((self.num_obs_segments[i], num_lanes))
-            vehicle_speeds = np.zeros((self.num_obs_segments[i], num_lanes))
-            rl_vehicle_speeds = np.zeros((self.num_obs_segments[i], num_lanes))
-            ids = self.k.vehicle.get_ids_by_edge(edge)
-            lane_list = self.k.vehicle.get_lane(ids)
-            pos_list = self.k.vehicle.get_position(ids)
-            for i, id in enumerate(ids):
-                segment = np.searchsorted(self.obs_slices[edge],
-                                          pos_list[i]) - 1
-                if id in self.k.vehicle.get_rl_ids():
-                    rl_vehicle_speeds[segment, lane_list[i]] \
-                        += self.k.vehicle.get_speed(id)
-                    num_rl_vehicles[segment, lane_list[i]] += 1
-                else:
-                    vehicle_speeds[segment, lane_list[i]] \
-                        += self.k.vehicle.get_speed(id)
-                    num_vehicles[segment, lane_list[i]] += 1
-
-            # normalize
-
-            num_vehicles /= NUM_VEHICLE_NORM
-            num_rl_vehicles /= NUM_VEHICLE_NORM
-            num_vehicles_list += num_vehicles.flatten().tolist()
-            num_rl_vehicles_list += num_rl_vehicles.flatten().tolist()
-            vehicle_speeds_list += vehicle_speeds.flatten().tolist()
-            rl_speeds_list += rl_vehicle_speeds.flatten().tolist()
-
-        unnorm_veh_list = np.asarray(num_vehicles_list) * NUM_VEHICLE_NORM
-        unnorm_rl_list = np.asarray(num_rl_vehicles_list) * NUM_VEHICLE_NORM
+            edge_ids = self.k.vehicle.get_ids_by_edge(edge)
+            ids.extend(edge_ids)
+            edge_index.extend([i] * len(edge_ids))
+        edge_index = np.array(edge_index, dtype=int)
+        lanes = np.array(self.k.vehicle.get_lane(ids), dtype=int)
+        pos = np.array(self.k.vehicle.get_position(ids), dtype=float)
+        speeds = np.array(self.k.vehicle.get_speed(ids), dtype=float)
+        rl_ids = set(self.k.vehicle.get_rl_ids())
+        is_rl = np.array([veh_id in rl_ids for veh_id in ids], dtype=bool)
+
+        # segment of every vehicle within its edge. Vehicles located at the
+        # very start of an edge are assigned to the last segment, as with the
+        # negative index returned by a per-edge search.
+        segment = np.searchsorted(
+            self._obs_bounds, pos + edge_index * self._obs_edge_shift) \
+            - self._obs_bounds_offset[edge_index] - 1
+        segment %= self._obs_num_segments[edge_index]
+
+        # index of the (edge, segment, lane) cell of every vehicle
+        cells = self._obs_cell_offset[edge_index] \
+            + segment * self._obs_num_lanes[edge_index] + lanes
+
+        num_cells = self._obs_num_cells
+        num_vehicles = np.bincount(cells[~is_rl], minlength=num_cells)
+        num_rl_vehicles = np.bincount(cells[is_rl], minlength=num_cells)
+        vehicle_speeds = np.bincount(
+            cells[~is_rl], weights=speeds[~is_rl], minlength=num_cells)
+        rl_speeds = np.bincount(
+            cells[is_rl], weights=speeds[is_rl], minlength=num_cells)
 
         # compute the mean speed if the speed isn't zero
-        num_rl = len(num_rl_vehicles_list)
-        num_veh = len(num_vehicles_list)
-        mean_speed = np.nan_to_num([
-            vehicle_speeds_list[i] / unnorm_veh_list[i]
-            if int(unnorm_veh_list[i]) else 0 for i in range(num_veh)
-        ])
+        mean_speed = np.divide(vehicle_speeds, num_vehicles,
+                               out=np.zeros(num_cells),
+                               where=num_vehicles > 0)
         mean_speed_norm = mean_speed / 50
-        mean_rl_speed = np.nan_to_num([
-            rl_speeds_list[i] / unnorm_rl_list[i]
-            if int(unnorm_rl_list[i]) else 0 for i in range(num_rl)
-        ]) / 50
+        mean_rl_speed = np.divide(rl_speeds, num_rl_vehicles,
+                                  out=np.zeros(num_cells),
+                                  where=num_rl_vehicles > 0) / 50
         outflow = np.asarray(
             self.k.vehicle.get_outflow_rate(20 * self.sim_step) / 2000.0)
-        return np.concatenate((num_vehicles_list, num_rl_vehicles_list,
+        return np.concatenate((num_vehicles / NUM_VEHICLE_NORM,
+                               num_rl_vehicles / NUM_VEHICLE_NORM,
                                mean_speed_norm, mean_rl_speed, [outflow]))
 
     def _apply_rl_actions(self, rl_actions):
@@ -3,7 +3,7 @@
 from gym.spaces import Box
 import numpy as np
 
-from flow.core.rewards import average_velocity
+from flow.core.rewards import average_velocity_array
 from flow.envs.multiagent.base import MultiEnv
 
 # largest number of lanes on any given edge in the network
@@ -113,20 +113,23 @@ class I210MultiEnv(MultiEnv):
 
     def get_state(self):
         """See class definition."""
+        rl_ids = self.k.vehicle.get_rl_ids()
+
+        # the observations of all agents are computed as a single array, and
+        # split into one observation per agent at the end
         if self.lead_obs:
-            veh_info = {}
-            for rl_id in self.k.vehicle.get_rl_ids():
-                speed = self.k.vehicle.get_speed(rl_id)
-                headway = self.k.vehicle.get_headway(rl_id)
-                lead_speed = self.k.vehicle.get_speed(self.k.vehicle.get_leader(rl_id))
-                if lead_speed == -1001:
-                    lead_speed = 0
-                veh_info.update({rl_id: np.array([speed / 50.0, headway / 1000.0, lead_speed / 50.0])})
+            speed = np.array(self.k.vehicle.get_speed(rl_ids))
+            headway = np.array(self.k.vehicle.get_headway(rl_ids))
+            lead_speed = np.array(self.k.vehicle.get_speed(
+                self.k.vehicle.get_leader(rl_ids)))
+            lead_speed[lead_speed == -1001] = 0
+            obs = np.stack(
+                (speed / 50.0, headway / 1000.0, lead_speed / 50.0), axis=1)
         else:
-            veh_info = {rl_id: np.concatenate((self.state_util(rl_id),
-                                               self.veh_statistics(rl_id)))
-                        for rl_id in self.k.vehicle.get_rl_ids()}
-        return veh_info
+            obs = np.concatenate((self._lane_states(rl_ids),
+                                  self._veh_statistics(rl_ids)), axis=1)
+
+        return dict(zip(rl_ids, obs))
 
     def compute_reward(self, rl_actions, **kwargs):
         # TODO(@evinitsky) we need something way better than this. Something that adds
@@ -136,37 +139,39 @@ class I210MultiEnv(MultiEnv):
         if rl_actions is None:
             return {}
 
-        rewards = {}
-        for rl_id in self.k.vehicle.get_rl_ids():
-            if self.env_params.evaluate:
-                # reward is speed of vehicle if we are in evaluation mode
-                reward = self.k.vehicle.get_speed(rl_id)
-            elif kwargs['fail']:
-                # reward is 0 if a collision occurred
-                reward = 0
-            else:
-                # reward high system-level velocities
-                cost1 = average_velocity(self, fail=kwargs['fail'])
-
-                # penalize small time headways
-                cost2 = 0
-                t_min = 1  # smallest acceptable time headway
-
-                lead_id = self.k.vehicle.get_leader(rl_id)
-                if lead_id not in ["", None] \
-                        and self.k.vehicle.get_speed(rl_id) > 0:
-                    t_headway = max(
-                        self.k.vehicle.get_headway(rl_id) /
-                        self.k.vehicle.get_speed(rl_id), 0)
-                    cost2 += min((t_headway - t_min) / t_min, 0)
-
-                # weights for cost1, cost2, and cost3, respectively
-                eta1, eta2 = 1.00, 0.10
-
-                reward = max(eta1 * cost1 + eta2 * cost2, 0)
-
-            rewards[rl_id] = reward
-        return rewards
+        rl_ids = self.k.vehicle.get_rl_ids()
+        speed = np.array(self.k.vehicle.get_speed(rl_ids))
+
+        if self.env_params.evaluate:
+            # reward is speed of vehicle if we are in evaluation mode
+            reward = speed
+        elif kwargs['fail']:
+            # reward is 0 if a collision occurred
+            reward = np.zeros(len(rl_ids))
+        else:
+            # reward high system-level velocities (the same for all agents)
+            cost1 = average_velocity_array(
+                self.k.vehicle.get_speed(self.k.vehicle.get_ids()))
+
+            # penalize small time headways
+            t_min = 1  # smallest acceptable time headway
+
+            has_leader = np.array(
+                [lead_id not in ["", None]
+                 for lead_id in self.k.vehicle.get_leader(rl_ids)],
+                dtype=bool) & (speed > 0)
+            headway = np.array(self.k.vehicle.get_headway(rl_ids))
+            t_headway = np.maximum(
+                headway / np.where(has_leader, speed, 1), 0)
+            cost2 = np.where(
+                has_leader, np.minimum((t_headway - t_min) / t_min, 0), 0)
+
+            # weights for cost1, cost2, and cost3, respectively
+            eta1, eta2 = 1.00, 0.10
+
+            reward = np.maximum(eta1 * cost1 + eta2 * cost2, 0)
+
+        return dict(zip(rl_ids, reward.tolist()))
 
     def additional_command(self):
         """See parent class.
@@ -191,35 +196,69 @@ class I210MultiEnv(MultiEnv):
         If there are fewer than MAX_LANES the extra
         entries are filled with -1 to disambiguate from zeros.
         """
-        veh = self.k.vehicle
-        lane_headways = veh.get_lane_headways(rl_id).copy()
-        lane_tailways = veh.get_lane_tailways(rl_id).copy()
-        lane_leader_speed = veh.get_lane_leaders_speed(rl_id).copy()
-        lane_follower_speed = veh.get_lane_followers_speed(rl_id).copy()
-        leader_ids = veh.get_lane_leaders(rl_id).copy()
-        follower_ids = veh.get_lane_followers(rl_id).copy()
-        rl_ids = self.k.vehicle.get_rl_ids()
-        is_leader_rl = [1 if l_id in rl_ids else 0 for l_id in leader_ids]
-        is_follow_rl = [1 if f_id in rl_ids else 0 for f_id in follower_ids]
-        diff = MAX_LANES - len(is_leader_rl)
-        if diff > 0:
-            # the minus 1 disambiguates missing cars from missing lanes
-            lane_headways += diff * [-1]
-            lane_tailways += diff * [-1]
-            lane_leader_speed += diff * [-1]
-            lane_follower_speed += diff * [-1]
-            is_leader_rl += diff * [-1]
-            is_follow_rl += diff * [-1]
-        lane_headways = np.asarray(lane_headways) / 1000
-        lane_tailways = np.asarray(lane_tailways) / 1000
-        lane_leader_speed = np.asarray(lane_leader_speed) / 100
-        lane_follower_speed = np.asarray(lane_follower_speed) / 100
-        return np.concatenate((lane_headways, lane_tailways, lane_leader_speed,
-                               lane_follower_speed, is_leader_rl,
-                               is_follow_rl))
+        return self._lane_states([rl_id])[0]
 
     def veh_statistics(self, rl_id):
         """Return speed, edge information, and x, y about the vehicle itself."""
-        speed = self.k.vehicle.get_speed(rl_id) / 100.0
-        lane = (self.k.vehicle.get_lane(rl_id) + 1) / 10.0
-        return np.array([speed, lane])
+        return self._veh_statistics([rl_id])[0]
+
+    def _lane_states(self, rl_ids):
+        """Return the output of `state_util` for several vehicles at once.
+
+        Parameters
+        ----------
+        rl_ids : list of str
+            ids of the RL vehicles
+
+        Returns
+        -------
+        np.ndarray
+            the lane states of every vehicle, one per row
+        """
+        veh = self.k.vehicle
+        rl_set = set(veh.get_rl_ids())
+
+        # the per-lane data of all vehicles is flattened into single lists,
+        # and scattered into the lanes of each vehicle using a mask. The
+        # minus 1 padding disambiguates missing cars from missing lanes
+        leader_ids = veh.get_lane_leaders(rl_ids)
+        follower_ids = veh.get_lane_followers(rl_ids)
+        num_lanes = np.array([len(ids) for ids in leader_ids], dtype=int)
+        mask = np.arange(MAX_LANES) < num_lanes[:, None]
+
+        leaders = [l_id for ids in leader_ids for l_id in ids]
+        followers = [f_id for ids in follower_ids for f_id in ids]
+
+        states = np.full((6, len(rl_ids), MAX_LANES), -1.)
+        states[0, mask] = [h for hs in veh.get_lane_headways(rl_ids)
+                           for h in hs]
+        states[1, mask] = [t for ts in veh.get_lane_tailways(rl_ids)
+                           for t in ts]
+        states[2, mask] = [0 if l_id == '' else speed for l_id, speed in
+                           zip(leaders, veh.get_speed(leaders))]
+        states[3, mask] = [0 if f_id == '' else speed for f_id, speed in
+                           zip(followers, veh.get_speed(followers))]
+        states[4, mask] = [l_id in rl_set for l_id in leaders]
+        states[5, mask] = [f_id in rl_set for f_id in followers]
+
+        states[0:2] /= 1000
+        states[2:4] /= 100
+
+        return states.transpose(1, 0, 2).reshape(len(rl_ids), 6 * MAX_LANES)
+
+    def _veh_statistics(self, rl_ids):
+        """Return the output of `veh_statistics` for several vehicles at once.
+
+        Parameters
+        ----------
+        rl_ids : list of str
+            ids of the RL vehicles
+
+        Returns
+        -------
+        np.ndarray
+            the statistics of every vehicle, one per row
+        """
+        speed = np.array(self.k.vehicle.get_speed(rl_ids)) / 100.0
+        lane = (np.array(self.k.vehicle.get_lane(rl_ids)) + 1) / 10.0
+        return np.stack((speed, lane), axis=1)
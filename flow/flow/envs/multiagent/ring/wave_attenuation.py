@@ -11,7 +11,6 @@ abs/1710.05465, 2017. [Online]. Available: https://arxiv.org/abs/1710.05465
 import numpy as np
 from gym.spaces.box import Box
 import random
-from scipy.optimize import fsolve
 from copy import deepcopy
 
 from flow.core.params import InitialConfig
@@ -293,7 +292,9 @@ class MultiAgentWaveAttenuationPOEnv(MultiEnv):
         self.k.vehicle.kernel_api = self.k.kernel_api
         self.k.vehicle.master_kernel = self.k
 
-        # solve for the velocity upper bound of the ring
+        # solve for the velocity upper bound of the ring (scipy is imported
+        # here since it is slow to import, and only needed on resets)
+        from scipy.optimize import fsolve
         v_guess = 4
         v_eq_max = fsolve(v_eq_max_function, np.array(v_guess),
                           args=(len(self.initial_ids), length))[0]
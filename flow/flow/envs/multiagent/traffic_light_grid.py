@@ -152,13 +152,12 @@ class MultiTrafficLightGridPOEnv(TrafficLightGridPOEnv, MultiEnv):
         density = []
         velocity_avg = []
         for edge in self.k.network.get_edge_list():
-            ids = self.k.vehicle.get_ids_by_edge(edge)
-            if len(ids) > 0:
+            num_ids = self.k.vehicle.get_num_vehicles_by_edge(edge)
+            if num_ids > 0:
                 # TODO(cathywu) Why is there a 5 here?
-                density += [5 * len(ids) / self.k.network.edge_length(edge)]
-                velocity_avg += [np.mean(
-                    [self.k.vehicle.get_speed(veh_id) for veh_id in
-                     ids]) / max_speed]
+                density += [5 * num_ids / self.k.network.edge_length(edge)]
+                velocity_avg += [
+                    self.k.vehicle.get_mean_speed_by_edge(edge) / max_speed]
             else:
                 density += [0]
                 velocity_avg += [0]
@@ -77,6 +77,11 @@ class AccelEnv(Env):
         self.prev_pos = dict()
         self.absolute_position = dict()
 
+        # vehicle ids sorted by absolute position, and the kernel update at
+        # which they were sorted
+        self._sorted_ids = None
+        self._sorted_ids_update = None
+
         super().__init__(env_params, sim_params, network, simulator)
 
     @property
@@ -100,9 +105,9 @@ class AccelEnv(Env):
 
     def _apply_rl_actions(self, rl_actions):
         """See class definition."""
+        rl_ids = set(self.k.vehicle.get_rl_ids())
         sorted_rl_ids = [
-            veh_id for veh_id in self.sorted_ids
-            if veh_id in self.k.vehicle.get_rl_ids()
+            veh_id for veh_id in self.sorted_ids if veh_id in rl_ids
         ]
         self.k.vehicle.apply_acceleration(sorted_rl_ids, rl_actions)
 
@@ -115,12 +120,13 @@ class AccelEnv(Env):
 
     def get_state(self):
         """See class definition."""
-        speed = [self.k.vehicle.get_speed(veh_id) / self.k.network.max_speed()
-                 for veh_id in self.sorted_ids]
-        pos = [self.k.vehicle.get_x_by_id(veh_id) / self.k.network.length()
-               for veh_id in self.sorted_ids]
+        sorted_ids = self.sorted_ids
+        speed = np.array(self.k.vehicle.get_speed(sorted_ids), dtype=float) \
+            / self.k.network.max_speed()
+        pos = np.array(self.k.vehicle.get_x_by_id(sorted_ids), dtype=float) \
+            / self.k.network.length()
 
-        return np.array(speed + pos)
+        return np.concatenate((speed, pos))
 
     def additional_command(self):
         """See parent class.
@@ -134,18 +140,25 @@ class AccelEnv(Env):
                 self.k.vehicle.set_observed(veh_id)
 
         # update the "absolute_position" variable
-        for veh_id in self.k.vehicle.get_ids():
-            this_pos = self.k.vehicle.get_x_by_id(veh_id)
-
-            if this_pos == -1001:
-                # in case the vehicle isn't in the network
-                self.absolute_position[veh_id] = -1001
-            else:
-                change = this_pos - self.prev_pos.get(veh_id, this_pos)
-                self.absolute_position[veh_id] = \
-                    (self.absolute_position.get(veh_id, this_pos) + change) \
-                    % self.k.network.length()
-                self.prev_pos[veh_id] = this_pos
+        veh_ids = self.k.vehicle.get_ids()
+        this_pos = np.array(self.k.vehicle.get_x_by_id(veh_ids), dtype=float)
+        prev_pos = np.array([self.prev_pos.get(veh_id, x)
+                             for veh_id, x in zip(veh_ids, this_pos)])
+        abs_pos = np.array([self.absolute_position.get(veh_id, x)
+                            for veh_id, x in zip(veh_ids, this_pos)])
+
+        # vehicles with a position of -1001 are not in the network
+        in_network = this_pos != -1001
+        abs_pos = np.where(
+            in_network,
+            (abs_pos + this_pos - prev_pos) % self.k.network.length(),
+            -1001)
+
+        self.absolute_position.update(zip(veh_ids, abs_pos.tolist()))
+        self.prev_pos.update(
+            (veh_id, x) for veh_id, x, valid
+            in zip(veh_ids, this_pos.tolist(), in_network) if valid)
+        self._sorted_ids = None
 
     @property
     def sorted_ids(self):
@@ -159,11 +172,22 @@ class AccelEnv(Env):
         list of str
             a list of all vehicle IDs sorted by position
         """
-        if self.env_params.additional_params['sort_vehicles']:
-            return sorted(self.k.vehicle.get_ids(), key=self._get_abs_position)
-        else:
+        if not self.env_params.additional_params['sort_vehicles']:
             return self.k.vehicle.get_ids()
 
+        # the sorting is only recomputed once per simulation step, or if the
+        # absolute positions have since been modified
+        if self._sorted_ids is None or \
+                self._sorted_ids_update != self.k.update_count:
+            veh_ids = self.k.vehicle.get_ids()
+            abs_pos = np.array([self._get_abs_position(veh_id)
+                                for veh_id in veh_ids], dtype=float)
+            order = np.argsort(abs_pos, kind='stable')
+            self._sorted_ids = [veh_ids[i] for i in order]
+            self._sorted_ids_update = self.k.update_count
+
+        return self._sorted_ids
+
     def _get_abs_position(self, veh_id):
         """Return the absolute position of a vehicle."""
         return self.absolute_position.get(veh_id, -1001)
@@ -176,8 +200,10 @@ class AccelEnv(Env):
         """
         obs = super().reset()
 
-        for veh_id in self.k.vehicle.get_ids():
-            self.absolute_position[veh_id] = self.k.vehicle.get_x_by_id(veh_id)
-            self.prev_pos[veh_id] = self.k.vehicle.get_x_by_id(veh_id)
+        veh_ids = self.k.vehicle.get_ids()
+        this_pos = self.k.vehicle.get_x_by_id(veh_ids)
+        self.absolute_position.update(zip(veh_ids, this_pos))
+        self.prev_pos.update(zip(veh_ids, this_pos))
+        self._sorted_ids = None
 
         return obs
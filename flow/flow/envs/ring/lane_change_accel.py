@@ -120,14 +120,15 @@ class LaneChangeAccelEnv(AccelEnv):
             self.k.network.num_lanes(edge)
             for edge in self.k.network.get_edge_list())
 
-        speed = [self.k.vehicle.get_speed(veh_id) / max_speed
-                 for veh_id in self.sorted_ids]
-        pos = [self.k.vehicle.get_x_by_id(veh_id) / length
-               for veh_id in self.sorted_ids]
-        lane = [self.k.vehicle.get_lane(veh_id) / max_lanes
-                for veh_id in self.sorted_ids]
+        sorted_ids = self.sorted_ids
+        speed = np.array(self.k.vehicle.get_speed(sorted_ids), dtype=float) \
+            / max_speed
+        pos = np.array(self.k.vehicle.get_x_by_id(sorted_ids), dtype=float) \
+            / length
+        lane = np.array(self.k.vehicle.get_lane(sorted_ids), dtype=float) \
+            / max_lanes
 
-        return np.array(speed + pos + lane)
+        return np.concatenate((speed, pos, lane))
 
     def _apply_rl_actions(self, actions):
         """See class definition."""
@@ -135,9 +136,9 @@ class LaneChangeAccelEnv(AccelEnv):
         direction = actions[1::2]
 
         # re-arrange actions according to mapping in observation space
+        rl_ids = set(self.k.vehicle.get_rl_ids())
         sorted_rl_ids = [
-            veh_id for veh_id in self.sorted_ids
-            if veh_id in self.k.vehicle.get_rl_ids()
+            veh_id for veh_id in self.sorted_ids if veh_id in rl_ids
         ]
 
         # represents vehicles that are allowed to change lanes
@@ -17,7 +17,6 @@ from gym.spaces.box import Box
 from copy import deepcopy
 import numpy as np
 import random
-from scipy.optimize import fsolve
 
 ADDITIONAL_ENV_PARAMS = {
     # maximum acceleration of autonomous vehicles
@@ -191,7 +190,9 @@ class WaveAttenuationEnv(Env):
         self.k.vehicle.kernel_api = self.k.kernel_api
         self.k.vehicle.master_kernel = self.k
 
-        # solve for the velocity upper bound of the ring
+        # solve for the velocity upper bound of the ring (scipy is imported
+        # here since it is slow to import, and only needed on resets)
+        from scipy.optimize import fsolve
         v_guess = 4
         v_eq_max = fsolve(v_eq_max_function, np.array(v_guess),
                           args=(len(self.initial_ids), length))[0]
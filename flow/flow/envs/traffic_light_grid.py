@@ -568,15 +568,15 @@ class TrafficLightGridEnv(Env):
             # flatten the list and return it
             return [veh_id for sublist in ids for veh_id in sublist]
 
-        # get the ids of all the vehicles on the edge 'edges' ordered by
-        # increasing distance to end of edge (intersection)
-        veh_ids_ordered = sorted(self.k.vehicle.get_ids_by_edge(edges),
-                                 key=self.get_distance_to_intersection)
+        # get the ids of the num_closest vehicles on the edge 'edges' ordered
+        # by increasing distance to end of edge (intersection)
+        veh_ids_ordered = self.k.vehicle.get_closest_to_edge_end(
+            edges, num_closest)
 
         # return the ids of the num_closest vehicles closest to the
         # intersection, potentially with ""-padding.
         pad_lst = [""] * (num_closest - len(veh_ids_ordered))
-        return veh_ids_ordered[:num_closest] + (pad_lst if padding else [])
+        return veh_ids_ordered + (pad_lst if padding else [])
 
 
 class TrafficLightGridPOEnv(TrafficLightGridEnv):
@@ -697,14 +697,13 @@ class TrafficLightGridPOEnv(TrafficLightGridEnv):
         density = []
         velocity_avg = []
         for edge in self.k.network.get_edge_list():
-            ids = self.k.vehicle.get_ids_by_edge(edge)
-            if len(ids) > 0:
+            num_ids = self.k.vehicle.get_num_vehicles_by_edge(edge)
+            if num_ids > 0:
                 vehicle_length = 5
-                density += [vehicle_length * len(ids) /
+                density += [vehicle_length * num_ids /
                             self.k.network.edge_length(edge)]
-                velocity_avg += [np.mean(
-                    [self.k.vehicle.get_speed(veh_id) for veh_id in
-                     ids]) / max_speed]
+                velocity_avg += [
+                    self.k.vehicle.get_mean_speed_by_edge(edge) / max_speed]
             else:
                 density += [0]
                 velocity_avg += [0]
@@ -1,5 +1,13 @@
-"""Empty init file to ensure documentation for the renderer is created."""
+"""Empty init file to ensure documentation for the renderer is created.
 
-from flow.renderer.pyglet_renderer import PygletRenderer
+The renderer is imported the first time it is accessed (see
+flow/utils/lazy.py), since pyglet and opencv are only needed when rendering.
+"""
+from flow.utils.lazy import lazy_attributes
 
-__all__ = ['PygletRenderer']
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'PygletRenderer': 'flow.renderer.pyglet_renderer',
+    'NumpyRenderer': 'flow.renderer.numpy_renderer',
+})
+
+__all__ = ['PygletRenderer', 'NumpyRenderer']
@@ -0,0 +1,96 @@
+"""Contains the asynchronous image writer of the renderers."""
+
+import queue
+import threading
+
+
+class AsyncImageWriter(object):
+    """Asynchronous image writer.
+
+    Encoding and writing PNG files is slower than rendering a frame. The
+    renderers thus hand the images they save (frames and local observations)
+    to this writer, which writes them to disk from a background thread, so
+    that rendering is not blocked by the disk. OpenCV releases the GIL while
+    encoding images, so the writes run in parallel with the simulation.
+
+    Images are not copied: they must not be modified once they are passed to
+    the writer.
+
+    Attributes
+    ----------
+    max_pending : int
+        Maximum number of images waiting to be written. Once it is reached,
+        calls to write() block until an image is written, which bounds the
+        memory used when the disk cannot keep up.
+    """
+
+    def __init__(self, max_pending=256):
+        """Initialize the writer, and start its background thread.
+
+        Parameters
+        ----------
+        max_pending : int
+            Maximum number of images waiting to be written
+        """
+        # imported here, as for the renderers, opencv is only needed when
+        # saving renders
+        import cv2
+        self._imwrite = cv2.imwrite
+
+        self.max_pending = max_pending
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, path, image):
+        """Schedule the writing of an image.
+
+        Parameters
+        ----------
+        path : str
+            Path of the image file
+        image : numpy.array
+            The image, in BGR order (or grayscale)
+
+        Raises
+        ------
+        IOError
+            If a previous image could not be written
+        """
+        self._raise_error()
+        self._queue.put((path, image))
+
+    def close(self):
+        """Wait for all the images to be written, and stop the writer.
+
+        Raises
+        ------
+        IOError
+            If an image could not be written
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
+    def _run(self):
+        """Write the images of the queue until the writer is closed."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, image = item
+            if self._error is None:
+                try:
+                    if not self._imwrite(path, image):
+                        raise IOError("Could not write image %s" % path)
+                except Exception as e:
+                    self._error = e
+
+    def _raise_error(self):
+        """Raise the first error of the background thread, if any."""
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise IOError(
+                "Could not write rendered images: {}".format(error))
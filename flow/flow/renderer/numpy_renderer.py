@@ -0,0 +1,513 @@
+"""Contains the numpy renderer class."""
+
+import matplotlib.cm as cm
+import matplotlib.colors as colors
+import numpy as np
+import os
+from os.path import expanduser
+import time
+
+from flow.renderer.image_writer import AsyncImageWriter
+HOME = expanduser("~")
+
+# color of the background, and of the lanes, in [r, g, b]
+BACKGROUND_COLOR = [32, 32, 32]
+LANE_COLOR = [224, 224, 224]
+
+# colors of the human and RL vehicles in the static modes, in [r, g, b]
+STATIC_COLORS = {
+    "rgb": ([0, 225, 0], [0, 150, 200]),
+    "gray": ([100, 100, 100], [150, 150, 150]),
+}
+
+# truncated colormaps of the human and RL vehicles in the dynamic modes
+DYNAMIC_COLORMAPS = {
+    "drgb": ((cm.Greens, 0.2, 0.8), (cm.Blues, 0.2, 0.8)),
+    "dgray": ((cm.binary, 0.55, 0.95), (cm.binary, 0.05, 0.45)),
+}
+
+
+class NumpyRenderer(object):
+    """Numpy Renderer class.
+
+    Provide a headless counterpart of the pyglet renderer (see
+    flow.renderer.pyglet_renderer.PygletRenderer), with the same interface,
+    which rasterizes the network and the vehicles directly into a numpy frame.
+    It does not need a display, nor an OpenGL context, and can thus be used by
+    pixel-based environments on display-less workers.
+
+    The lanes are rasterized once, into a static layer that every frame is
+    started from. The vehicles (triangles) are then filled all at once, and
+    the local observations of the vehicles are cropped, masked and rotated
+    with a single gather from the frame (see get_sights). Saved images are
+    written to disk asynchronously.
+
+    Frames follow the conventions of the pyglet renderer: they are arrays of
+    size height x width x 3 in BGR order, with the y axis pointing down.
+
+    Attributes
+    ----------
+    data : list
+        A list of rendering data to be saved when save_render is set to
+        True.
+    mode : str or bool
+
+        * False: no rendering
+        * True: delegate rendering to sumo-gui for back-compatibility
+        * "gray": static grayscale rendering, which is good for training
+        * "dgray": dynamic grayscale rendering
+        * "rgb": static RGB rendering
+        * "drgb": dynamic RGB rendering, which is good for visualization
+
+    save_render : bool
+        Specify whether to save rendering data to disk
+    path : str
+        Specify where to store the rendering data
+    sight_radius : int
+        Set the radius of observation for RL vehicles (meter)
+    show_radius : bool
+        Specify whether to render the radius of RL observation
+    time : int
+        Rendering time that increments by one with every render() call
+    lane_polys : list
+        A list of road network polygons, in pixel coordinates
+    width : int
+        Width of the frame
+    height : int
+        Height of the frame
+    x_shift : float
+        The shift substracted to the input x coordinate
+    x_scale : float
+        The scale multiplied to the input x coordinate
+    y_shift : float
+        The shift substracted to the input y coordinate
+    y_scale : float
+        The scale multiplied to the input y coordinate
+    network : numpy.array
+        The static layer of the frame, containing the road network
+    frame : numpy.array
+        An array of size height x width x 3 containing the last rendered
+        frame
+    pxpm : int
+        Specify rendering resolution (pixel / meter)
+    """
+
+    def __init__(self, network, mode,
+                 save_render=False,
+                 path=HOME+"/flow_rendering",
+                 sight_radius=50,
+                 show_radius=False,
+                 pxpm=2,
+                 alpha=1.0):
+        """Initialize Numpy Renderer.
+
+        Parameters
+        ----------
+        network : list of list
+            A list of road network polygons. Each polygon is expressed as
+            a list of x and y coordinates, e.g., [x1, y1, x2, y2, ...]
+        mode : str or bool
+
+            * False: no rendering
+            * True: delegate rendering to sumo-gui for back-compatibility
+            * "gray": static grayscale rendering, which is good for training
+            * "dgray": dynamic grayscale rendering
+            * "rgb": static RGB rendering
+            * "drgb": dynamic RGB rendering, which is good for visualization
+
+        save_render : bool
+            Specify whether to save rendering data to disk
+        path : str
+            Specify where to store the rendering data
+        sight_radius : int
+            Set the radius of observation for RL vehicles (meter)
+        show_radius : bool
+            Specify whether to render the radius of RL observation
+        pxpm : int
+            Specify rendering resolution (pixel / meter)
+        alpha : int
+            Specify opacity of the alpha channel.
+            1.0 is fully opaque; 0.0 is fully transparent.
+        """
+        self.mode = mode
+        if self.mode not in [True, False, "rgb", "drgb", "gray", "dgray"]:
+            raise ValueError("Mode %s is not supported!" % self.mode)
+        self.save_render = save_render
+        self.path = path + '/' + time.strftime("%Y-%m-%d-%H%M%S")
+        if self.save_render:
+            if not os.path.exists(path):
+                os.mkdir(path)
+            os.mkdir(self.path)
+            self.data = [network]
+            self._writer = AsyncImageWriter()
+        self.sight_radius = sight_radius
+        self.pxpm = pxpm  # Pixel per meter
+        self.show_radius = show_radius
+        self.alpha = alpha
+        self.time = 0
+
+        lane_polys_flat = [pt for poly in network for pt in poly]
+
+        polys_x = np.asarray(lane_polys_flat[::2])
+        width = int(polys_x.max() - polys_x.min())
+        shift = polys_x.min() - 2
+        scale = (width - 4) / width
+        self.width = (width + 2*self.sight_radius) * self.pxpm
+        self.x_shift = shift - self.sight_radius
+        self.x_scale = scale
+
+        polys_y = np.asarray(lane_polys_flat[1::2])
+        height = int(polys_y.max() - polys_y.min())
+        shift = polys_y.min() - 2
+        scale = (height - 4) / height
+        self.height = (height + 2*self.sight_radius) * self.pxpm
+        self.y_shift = shift - self.sight_radius
+        self.y_scale = scale
+
+        self.lane_polys = [
+            self._to_pixels(np.reshape(lane_poly, (-1, 2)))
+            for lane_poly in network]
+
+        # colors of the vehicles: colormaps are only truncated once, and are
+        # then applied to the speeds of all vehicles at once
+        if self.mode in DYNAMIC_COLORMAPS:
+            self._colormaps = [self._truncate_colormap(*args)
+                               for args in DYNAMIC_COLORMAPS[self.mode]]
+        elif self.mode in STATIC_COLORS:
+            self._colors = [np.array(color[::-1])
+                            for color in STATIC_COLORS[self.mode]]
+
+        # static layer of the frame, with the road network
+        self.network = np.empty((self.height, self.width, 3), np.uint8)
+        self.network[:] = BACKGROUND_COLOR[::-1]
+        for lane_poly in self.lane_polys:
+            self._draw_pixels(
+                self.network, self._line_pixels(lane_poly), LANE_COLOR[::-1])
+        self.frame = self.network.copy()
+
+        # pixel offsets of the local observations from their center, and the
+        # circular mask of the observations
+        radius = self.sight_radius * self.pxpm
+        offsets = np.arange(2 * radius) - radius
+        self._sight_dx, self._sight_dy = np.meshgrid(offsets, offsets)
+        self._sight_mask = \
+            self._sight_dx ** 2 + self._sight_dy ** 2 <= radius ** 2
+
+    def render(self,
+               human_orientations,
+               machine_orientations,
+               human_dynamics,
+               machine_dynamics,
+               human_logs,
+               machine_logs):
+        """Update the rendering frame.
+
+        Parameters
+        ----------
+        human_orientations : list
+            A list contains orientations of all human vehicles
+            An orientation is a list contains [x, y, angle].
+        machine_orientations : list
+            A list contains orientations of all RL vehicles
+            An orientation is a list contains [x, y, angle].
+        human_dynamics : list
+            A list contains the speed of all human vehicles normalized by
+            max speed, i.e., speed/max_speed
+            This is used to dynamically color human vehicles based on its
+            velocity.
+        machine_dynamics : list
+            A list contains the speed of all RL vehicles normalized by
+            max speed, i.e., speed/max_speed
+            This is used to dynamically color RL vehicles based on its
+            velocity.
+        human_logs : list
+            A list contains the timestep (ms), timedelta (ms), and id of
+            all human vehicles
+        machine_logs : list
+            A list contains the timestep (ms), timedelta (ms), and id of
+            all RL vehicles
+
+        Returns
+        -------
+        numpy.array
+            the rendered frame, of size height x width x 3 (or height x width
+            in gray modes)
+        """
+        self.time += 1
+
+        if self.mode in DYNAMIC_COLORMAPS:
+            human_cmap, machine_cmap = self._colormaps
+            human_colors = human_cmap(np.asarray(human_dynamics, float))
+            machine_colors = machine_cmap(np.asarray(machine_dynamics, float))
+            # rgba in [0, 1] to bgr in [0, 255]
+            human_colors = (255 * human_colors[:, 2::-1]).astype(np.uint8)
+            machine_colors = (255 * machine_colors[:, 2::-1]).astype(np.uint8)
+        elif self.mode in STATIC_COLORS:
+            human_colors, machine_colors = self._colors
+        else:
+            raise ValueError("Unknown mode: {}".format(self.mode))
+
+        human_orientations = np.reshape(human_orientations, (-1, 3))
+        machine_orientations = np.reshape(machine_orientations, (-1, 3))
+
+        self.frame = self.network.copy()
+        self._draw_vehicles(human_orientations, human_colors)
+        self._draw_vehicles(machine_orientations, machine_colors)
+        if self.show_radius and len(machine_orientations) > 0:
+            self._draw_circles(machine_orientations, machine_colors)
+
+        if self.save_render:
+            self._writer.write(
+                "%s/frame_%06d.png" % (self.path, self.time), self.frame)
+            # the inputs are rebuilt at every step, and are thus not copied
+            self.data.append([human_orientations, machine_orientations,
+                              list(human_dynamics), list(machine_dynamics),
+                              list(human_logs), list(machine_logs)])
+        if "gray" in self.mode:
+            return self.frame[:, :, 0]
+        else:
+            return self.frame
+
+    def close(self):
+        """Terminate the renderer."""
+        save_path = ''
+        if self.save_render:
+            self._writer.close()
+            save_path = '%s/data_%06d.npy' % (self.path, self.time)
+            np.save(save_path, np.array(self.data, dtype=object))
+        return save_path
+
+    def get_sight(self, orientation, veh_id):
+        """Return the local observation of a vehicle.
+
+        Parameters
+        ----------
+        orientation : list
+            An orientation is a list contains [x, y, angle]
+        veh_id : str
+            The vehicle to observe for
+
+        Returns
+        -------
+        numpy.array
+            the pixels within the sight radius of the vehicle, rotated by the
+            angle of the vehicle
+        """
+        return self.get_sights([orientation], [veh_id])[0]
+
+    def get_sights(self, orientations, veh_ids):
+        """Return the local observations of multiple vehicles.
+
+        The observation of a vehicle is the square of the frame around it,
+        masked outside of its sight radius and rotated by its angle about its
+        center (with nearest-neighbor sampling). Every pixel of the
+        observations is read from the frame with a single gather: the source
+        pixel of each output pixel is obtained by the inverse rotation of the
+        output pixel about the center of the square.
+
+        Parameters
+        ----------
+        orientations : list
+            A list of orientations
+            An orientation is a list contains [x, y, angle].
+        veh_ids : list of str
+            The vehicles to observe for
+
+        Returns
+        -------
+        numpy.array
+            observations, of size num_vehicles x 2*radius x 2*radius x 3 (or
+            num_vehicles x 2*radius x 2*radius in gray modes), where radius is
+            the sight radius in pixels
+        """
+        orientations = np.reshape(orientations, (-1, 3))
+        radius = self.sight_radius * self.pxpm
+        pixels = self._to_pixels(orientations[:, :2])
+        # top left corner of the squares
+        x_min = (pixels[:, 0] - radius).astype(int)
+        y_min = (self.height - pixels[:, 1] - radius).astype(int)
+
+        ang = np.radians(orientations[:, 2])[:, None, None]
+        cos, sin = np.cos(ang), np.sin(ang)
+        dx, dy = self._sight_dx, self._sight_dy
+        src_x = np.rint(radius + cos * dx - sin * dy).astype(int)
+        src_y = np.rint(radius + sin * dx + cos * dy).astype(int)
+
+        # pixels rotated from outside the sight radius (or the frame) are empty
+        inside = (src_x >= 0) & (src_x < 2 * radius) & \
+            (src_y >= 0) & (src_y < 2 * radius)
+        inside[inside] = self._sight_mask[src_y[inside], src_x[inside]]
+        rows = y_min[:, None, None] + src_y
+        cols = x_min[:, None, None] + src_x
+        inside &= (rows >= 0) & (rows < self.height) & \
+            (cols >= 0) & (cols < self.width)
+
+        sights = np.zeros(src_x.shape + (3,), np.uint8)
+        sights[inside] = self.frame[rows[inside], cols[inside]]
+
+        if self.save_render:
+            for veh_id, sight in zip(veh_ids, sights):
+                self._writer.write("%s/sight_%s_%06d.png" %
+                                   (self.path, veh_id, self.time), sight)
+        if "gray" in self.mode:
+            return sights[..., 0]
+        else:
+            return sights
+
+    def _to_pixels(self, points):
+        """Convert an array of [x, y] coordinates into pixel coordinates.
+
+        As in the pyglet renderer, the y axis of the pixel coordinates points
+        up, i.e. a pixel coordinate y lies on the row height - y of the frame.
+        """
+        points = np.asarray(points, dtype=float)
+        return np.stack([
+            (points[:, 0] - self.x_shift) * self.x_scale * self.pxpm,
+            (points[:, 1] - self.y_shift) * self.y_scale * self.pxpm,
+        ], axis=1)
+
+    @staticmethod
+    def _line_pixels(points, closed=False):
+        """Return the pixels covered by a polyline.
+
+        Each segment is sampled at intervals of at most a pixel.
+
+        Parameters
+        ----------
+        points : numpy.array
+            vertices of the polyline in pixel coordinates, of size n x 2
+        closed : bool
+            whether the last vertex is connected to the first one
+
+        Returns
+        -------
+        numpy.array
+            pixel coordinates of the samples, of size num_samples x 2
+        """
+        if closed:
+            points = np.concatenate([points, points[:1]])
+        start, end = points[:-1], points[1:]
+        num = np.ceil(np.linalg.norm(end - start, axis=1)).astype(int) + 1
+        segment = np.repeat(np.arange(len(num)), num)
+        # position of each sample within its segment, in [0, 1]
+        frac = np.arange(num.sum()) - np.repeat(np.cumsum(num) - num, num)
+        frac = frac / np.maximum(num[segment] - 1, 1)
+        return start[segment] + frac[:, None] * (end - start)[segment]
+
+    def _draw_pixels(self, frame, pixels, color):
+        """Blend a color into the pixels of a frame, given in pixel coordinates.
+
+        Pixels outside of the frame are ignored. The color is either a single
+        [b, g, r] color, or one color per pixel.
+        """
+        cols = np.floor(pixels[:, 0]).astype(int)
+        rows = self.height - 1 - np.floor(pixels[:, 1]).astype(int)
+        inside = (rows >= 0) & (rows < self.height) & \
+            (cols >= 0) & (cols < self.width)
+        color = np.asarray(color, dtype=float)
+        if color.ndim > 1:
+            color = color[inside]
+        rows, cols = rows[inside], cols[inside]
+        frame[rows, cols] = (self.alpha * color +
+                             (1 - self.alpha) * frame[rows, cols]).astype(np.uint8)
+
+    def _draw_vehicles(self, orientations, colors, size=5):
+        """Fill the triangles of multiple vehicles.
+
+        The triangles are the ones of the pyglet renderer: their tip is at the
+        position of the vehicle, and their base lies `size` meters behind it.
+        The pixels covered by the triangles are found by testing the pixels of
+        a window around every triangle at once.
+
+        Parameters
+        ----------
+        orientations : numpy.array
+            orientations of the vehicles, of size num_vehicles x 3
+        colors : numpy.array
+            the [b, g, r] color of every vehicle, or a single color
+        size : int
+            The size of the rendered triangles (meter)
+        """
+        if len(orientations) == 0:
+            return
+        tip = self._to_pixels(orientations[:, :2])
+        ang = np.radians(orientations[:, 2])
+        s = size * self.pxpm
+        scale = np.array([self.x_scale, self.y_scale])
+        base = tip - s * scale * np.stack([np.sin(ang), np.cos(ang)], axis=1)
+        half = 0.25 * s * scale * np.stack([np.cos(ang), -np.sin(ang)], axis=1)
+        # vertices of the triangles, of size num_vehicles x 3 x 2
+        vertices = np.stack([tip, base + half, base - half], axis=1)
+
+        # window of pixels around every triangle
+        corner = np.floor(vertices.min(axis=1))
+        extent = int(np.ceil((vertices.max(axis=1) - corner).max())) + 1
+        offsets = np.stack(np.meshgrid(np.arange(extent), np.arange(extent)),
+                           axis=-1).reshape(-1, 2)
+        pixels = corner[:, None, :] + offsets[None, :, :]
+        centers = pixels + 0.5
+
+        # a pixel is in a triangle if its center is on the same side of the
+        # three edges
+        sides = []
+        for i in range(3):
+            a, b = vertices[:, None, i], vertices[:, None, (i + 1) % 3]
+            sides.append((b[..., 0] - a[..., 0]) * (centers[..., 1] - a[..., 1])
+                         - (b[..., 1] - a[..., 1]) * (centers[..., 0] - a[..., 0]))
+        sides = np.stack(sides)
+        covered = np.all(sides >= 0, axis=0) | np.all(sides <= 0, axis=0)
+
+        colors = np.broadcast_to(colors, (len(orientations), 3))
+        colors = np.broadcast_to(colors[:, None, :], covered.shape + (3,))
+        self._draw_pixels(self.frame, pixels[covered], colors[covered])
+
+    def _draw_circles(self, orientations, colors, num_vertices=100):
+        """Draw the sight radius of multiple vehicles.
+
+        Parameters
+        ----------
+        orientations : numpy.array
+            orientations of the vehicles, of size num_vehicles x 3
+        colors : numpy.array
+            the [b, g, r] color of every vehicle, or a single color
+        num_vertices : int
+            number of vertices of the polygon approximating the circles
+        """
+        centers = self._to_pixels(orientations[:, :2])
+        radius = self.sight_radius * self.pxpm
+        angle = np.linspace(0, 2 * np.pi, num_vertices, endpoint=False)
+        circle = radius * np.stack([self.x_scale * np.cos(angle),
+                                    self.y_scale * np.sin(angle)], axis=1)
+        pixels = self._line_pixels(circle, closed=True)
+
+        colors = np.broadcast_to(colors, (len(orientations), 3))
+        self._draw_pixels(
+            self.frame,
+            (centers[:, None, :] + pixels[None, :, :]).reshape(-1, 2),
+            np.repeat(colors, len(pixels), axis=0))
+
+    @staticmethod
+    def _truncate_colormap(cmap, minval=0.25, maxval=0.75, n=100):
+        """Truncate a matplotlib colormap.
+
+        Parameters
+        ----------
+        cmap : matplotlib.colors.LinearSegmentedColormap
+            Original colormap
+        minval : float
+            Minimum value of the truncated colormap
+        maxval : float
+            Maximum value of the truncated colormap
+        n : int
+            Number of RGB quantization levels of the truncated colormap
+
+        Returns
+        -------
+        matplotlib.colors.LinearSegmentedColormap
+            truncated colormap
+        """
+        new_cmap = colors.LinearSegmentedColormap.from_list(
+            'trunc({n},{a:.2f},{b:.2f})'
+            .format(n=cmap.name, a=minval, b=maxval),
+            cmap(np.linspace(minval, maxval, n)))
+        return new_cmap
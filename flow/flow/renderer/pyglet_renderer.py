@@ -5,12 +5,13 @@ import matplotlib.cm as cm
 import matplotlib.colors as colors
 import numpy as np
 import cv2
-import imutils
 import os
 from os.path import expanduser
 import time
 import copy
 import warnings
+
+from flow.renderer.image_writer import AsyncImageWriter
 HOME = expanduser("~")
 
 
@@ -117,6 +118,7 @@ class PygletRenderer(object):
                 os.mkdir(path)
             os.mkdir(self.path)
             self.data = [network]
+            self._writer = AsyncImageWriter()
         self.sight_radius = sight_radius
         self.pxpm = pxpm  # Pixel per meter
         self.show_radius = show_radius
@@ -155,6 +157,12 @@ class PygletRenderer(object):
                      for c in [224, 224, 224, int(self.alpha*255)]]
             self.lane_colors.append(color)
 
+        # circular mask of the local observations, shared by all vehicles
+        sight_radius = int(self.sight_radius * self.pxpm)
+        self._sight_mask = np.zeros((2*sight_radius, 2*sight_radius), np.uint8)
+        cv2.circle(self._sight_mask, (sight_radius, sight_radius),
+                   sight_radius, 1, thickness=-1)
+
         try:
             self.window = pyglet.window.Window(width=self.width,
                                                height=self.height)
@@ -293,8 +301,8 @@ class PygletRenderer(object):
         self.window.flip()
 
         if self.save_render:
-            cv2.imwrite("%s/frame_%06d.png" %
-                        (self.path, self.time), self.frame)
+            self._writer.write(
+                "%s/frame_%06d.png" % (self.path, self.time), self.frame)
             self.data.append([_human_orientations, _machine_orientations,
                               _human_dynamics, _machine_dynamics,
                               _human_logs, _machine_logs])
@@ -308,6 +316,7 @@ class PygletRenderer(object):
         print('Closing renderer...')
         save_path = ''
         if self.save_render:
+            self._writer.close()
             save_path = '%s/data_%06d.npy' % (self.path, self.time)
             np.save(save_path, self.data)
         self.window.close()
@@ -324,32 +333,60 @@ class PygletRenderer(object):
         veh_id : str
             The vehicle to observe for
         """
-        x, y, ang = orientation
-        x = (x-self.x_shift)*self.x_scale*self.pxpm
-        y = (y-self.y_shift)*self.y_scale*self.pxpm
-        x_med = x
-        y_med = self.height - y
-        sight_radius = self.sight_radius * self.pxpm
-        x_min = int(x_med - sight_radius)
-        y_min = int(y_med - sight_radius)
-        x_max = int(x_med + sight_radius)
-        y_max = int(y_med + sight_radius)
-        fixed_sight = self.frame[y_min:y_max, x_min:x_max]
-        height, width = fixed_sight.shape[0:2]
-        mask = np.zeros((height, width), np.uint8)
-        cv2.circle(mask, (int(sight_radius), int(sight_radius)),
-                   int(sight_radius), (255, 255, 255), thickness=-1)
-        rotated_sight = cv2.bitwise_and(fixed_sight, fixed_sight, mask=mask)
-        rotated_sight = imutils.rotate(rotated_sight, ang)
+        return self.get_sights([orientation], [veh_id])[0]
+
+    def get_sights(self, orientations, veh_ids):
+        """Return the local observations of multiple vehicles.
+
+        The observation of a vehicle is the square of the frame around it,
+        rotated by the angle of the vehicle about its center, and masked
+        outside of its sight radius. The square is cropped and rotated by a
+        single affine warp of the frame per vehicle, and all observations are
+        masked at once by the same circular mask.
+
+        Parameters
+        ----------
+        orientations : list
+            A list of orientations
+            An orientation is a list contains [x, y, angle].
+        veh_ids : list of str
+            The vehicles to observe for
+
+        Returns
+        -------
+        numpy.array
+            observations, of size num_vehicles x 2*radius x 2*radius x 3 (or
+            num_vehicles x 2*radius x 2*radius in gray modes), where radius is
+            the sight radius in pixels
+        """
+        orientations = np.reshape(orientations, (-1, 3))
+        sight_radius = int(self.sight_radius * self.pxpm)
+        size = 2 * sight_radius
+        frame = np.ascontiguousarray(self.frame)
+
+        sights = np.zeros((len(orientations), size, size, 3), np.uint8)
+        for sight, (x, y, ang) in zip(sights, orientations):
+            x = (x-self.x_shift)*self.x_scale*self.pxpm
+            y = (y-self.y_shift)*self.y_scale*self.pxpm
+            x_min = int(x - sight_radius)
+            y_min = int(self.height - y - sight_radius)
+            # rotation about the center of the square, applied to the frame
+            # translated by the top left corner of the square
+            warp = cv2.getRotationMatrix2D(
+                (sight_radius, sight_radius), ang, 1.0)
+            warp[:, 2] -= warp[:, :2].dot([x_min, y_min])
+            cv2.warpAffine(frame, warp, (size, size), dst=sight,
+                           borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+        sights *= self._sight_mask[None, :, :, None]
 
         if self.save_render:
-            cv2.imwrite("%s/sight_%s_%06d.png" %
-                        (self.path, veh_id, self.time),
-                        rotated_sight)
+            for veh_id, sight in zip(veh_ids, sights):
+                self._writer.write("%s/sight_%s_%06d.png" %
+                                   (self.path, veh_id, self.time), sight)
         if "gray" in self.mode:
-            return rotated_sight[:, :, 0]
+            return sights[..., 0]
         else:
-            return rotated_sight
+            return sights
 
     def _add_lane_polys(self):
         """Render road network polygons."""
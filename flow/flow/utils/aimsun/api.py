@@ -34,6 +34,9 @@ def create_client(port, print_status=False):
         try:
             s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             s.connect(('localhost', port))
+            # commands are small and answered before the next one is sent,
+            # so they must not be delayed by Nagle's algorithm
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
             # check the connection
             data = None
@@ -54,6 +57,56 @@ def create_client(port, print_status=False):
     return s
 
 
+def tracking_format(info_bitmap):
+    """Return the struct format of the tracking info selected by a bitmap.
+
+    Parameters
+    ----------
+    info_bitmap : str
+        bitmap representing the tracking info to be returned
+        (cf function make_bitmap_for_tracking in vehicle/aimsun.py)
+
+    Returns
+    -------
+    str
+        format of the output structure, or an empty string if no tracking
+        info is selected
+    """
+    out_format = ''
+    for i in range(len(info_bitmap)):
+        if info_bitmap[i] == '1':
+            if i <= 12:
+                out_format += 'f '
+            else:
+                out_format += 'i '
+    return out_format[:-1]
+
+
+def make_tracking_info(info, info_bitmap):
+    """Place tracking info values into an InfVeh object.
+
+    Parameters
+    ----------
+    info : tuple of float or int
+        values of the tracking info selected by the bitmap, in order
+    info_bitmap : str
+        bitmap representing the tracking info in `info`
+
+    Returns
+    -------
+    flow.utils.aimsun.struct.InfVeh
+        tracking info object
+    """
+    ret = aimsun_struct.InfVeh()
+    count = 0
+    for map_index in range(len(INFOS_ATTR_BY_INDEX)):
+        if info_bitmap[map_index] == '1':
+            setattr(ret, INFOS_ATTR_BY_INDEX[map_index], info[count])
+            count += 1
+
+    return ret
+
+
 class FlowAimsunAPI(object):
     """An API used to interact with Aimsun via a TCP connection.
 
@@ -73,6 +126,7 @@ class FlowAimsunAPI(object):
         """
         self.port = port
         self.s = create_client(port, print_status=True)
+        self._request_id = 0
 
     def _send_command(self, command_type, in_format, values, out_format):
         """Send an arbitrary command via the connection.
@@ -154,6 +208,69 @@ class FlowAimsunAPI(object):
 
             return unpacked_data
 
+    def send_commands(self, commands):
+        """Send several commands via the connection in a single message.
+
+        Each command is sent as a frame consisting of a header (see
+        ac.FRAME_HEADER) followed by the encoded values of the command. All frames
+        are written at once, and the replies, framed similarly and tagged with
+        the request id of the command they answer, are then collected. This
+        costs a single round trip regardless of the number of commands, unlike
+        `_send_command` which is blocking on each stage of every command.
+
+        Parameters
+        ----------
+        commands : list of (int, str or None, tuple of Any or None, str)
+            the command type, format of the input structure, values, and format
+            of the output structure of each command (see `_send_command`)
+
+        Returns
+        -------
+        list of Any
+            the replies of the Aimsun server, in the order of the commands
+        """
+        if len(commands) == 0:
+            return []
+
+        # encode every command into a frame
+        frames = []
+        request_ids = []
+        for command_type, in_format, values, _ in commands:
+            if in_format is None:
+                payload = b''
+            elif in_format == 'str':
+                payload = str.encode(values[0])
+            else:
+                payload = struct.pack(in_format, *values)
+            self._request_id = (self._request_id + 1) % 2 ** 32
+            request_ids.append(self._request_id)
+            frames.append(ac.FRAME_HEADER.pack(
+                ac.FRAMED_COMMAND, command_type, self._request_id,
+                len(payload)))
+            frames.append(payload)
+
+        self.s.sendall(b''.join(frames))
+
+        # collect the replies, which are identified by their request id
+        replies = {}
+        for _ in range(len(commands)):
+            _, _, request_id, size = ac.FRAME_HEADER.unpack(
+                self._recv_exactly(ac.FRAME_HEADER.size))
+            replies[request_id] = self._recv_exactly(size)
+
+        # decode the replies
+        ret = []
+        for (_, _, _, out_format), request_id in zip(commands, request_ids):
+            data = replies[request_id]
+            if out_format is None:
+                ret.append(None)
+            elif out_format == 'str':
+                ret.append(data.decode('utf-8'))
+            else:
+                ret.append(struct.unpack(out_format, data))
+
+        return ret
+
     def simulation_step(self):
         """Advance the simulation by one step.
 
@@ -305,6 +422,73 @@ class FlowAimsunAPI(object):
         return self._send_command(ac.VEH_SET_ROUTE,
                                   values=(veh_id, route))
 
+    def set_speeds(self, veh_ids, speeds):
+        """Set the speed of several vehicles in a single round trip.
+
+        Parameters
+        ----------
+        veh_ids : list of int
+            names of the vehicles in Aimsun
+        speeds : list of float
+            target speed of each vehicle
+        """
+        self.send_commands([
+            (ac.VEH_SET_SPEED, 'i f', (veh_id, speed), 'i')
+            for veh_id, speed in zip(veh_ids, speeds)])
+
+    def apply_lane_changes(self, veh_ids, directions):
+        """Set the lane change action of several vehicles in a single round trip.
+
+        Parameters
+        ----------
+        veh_ids : list of int
+            names of the vehicles in Aimsun
+        directions : list of int
+            target direction of each vehicle
+
+        Returns
+        -------
+        list of float
+            status of each lane change (should be 0)
+        """
+        return [status for status, in self.send_commands([
+            (ac.VEH_SET_LANE, 'i i', (veh_id, direction), 'i')
+            for veh_id, direction in zip(veh_ids, directions)])]
+
+    def set_routes(self, veh_ids, routes):
+        """Set the route of several vehicles in a single round trip.
+
+        Parameters
+        ----------
+        veh_ids : list of int
+            names of the vehicles in Aimsun
+        routes : list of list of int
+            list of edges each vehicle should traverse
+
+        Returns
+        -------
+        list of float
+            status of each route change (should be 0)
+        """
+        return [status for status, in self.send_commands([
+            (ac.VEH_SET_ROUTE, '%di' % (len(route) + 1), (veh_id, *route),
+             'i')
+            for veh_id, route in zip(veh_ids, routes)])]
+
+    def set_colors(self, veh_ids, colors):
+        """Set the color of several vehicles in a single round trip.
+
+        Parameters
+        ----------
+        veh_ids : list of int
+            names of the vehicles in Aimsun
+        colors : list of (int, int, int)
+            red, green, blue values of each vehicle
+        """
+        self.send_commands([
+            (ac.VEH_SET_COLOR, 'i i i i', (veh_id, *color), 'i')
+            for veh_id, color in zip(veh_ids, colors)])
+
     def set_color(self, veh_id, color):
         """Set the color of a specific vehicle.
 
@@ -469,17 +653,9 @@ class FlowAimsunAPI(object):
             tracking info object
         """
         # build the output format from the bitmap
-        out_format = ''
-        for i in range(len(info_bitmap)):
-            if info_bitmap[i] == '1':
-                if i <= 12:
-                    out_format += 'f '
-                else:
-                    out_format += 'i '
+        out_format = tracking_format(info_bitmap)
         if out_format == '':
             return
-        else:
-            out_format = out_format[:-1]
 
         # append tracked boolean and vehicle id to the bitmap
         # so that the command only has one parameter
@@ -494,15 +670,78 @@ class FlowAimsunAPI(object):
             out_format=out_format)
 
         # place these tracking info into a struct
-        ret = aimsun_struct.InfVeh()
-        count = 0
-        for map_index in range(len(INFOS_ATTR_BY_INDEX)):
-            if info_bitmap[map_index] == '1':
-                setattr(ret, INFOS_ATTR_BY_INDEX[map_index], info[count])
-                count += 1
+        return make_tracking_info(info, info_bitmap)
+
+    def get_vehicles_tracking_info(self, veh_ids, info_bitmap):
+        """Return the tracking info, leader and next section of vehicles.
+
+        All the information is exchanged in a single command. The request
+        consists of the length of the bitmap, the bitmap and the ids of the
+        vehicles, and the reply contains, for each vehicle, the tracking info
+        selected by the bitmap followed by the id of its leader and its next
+        section (-1 if the vehicle is not in a section). Both messages are
+        packed binary structures preceded by their length.
+
+        Parameters
+        ----------
+        veh_ids : list of int
+            names of the tracked vehicles in Aimsun
+        info_bitmap : str
+            bitmap representing the tracking info to be returned
+            (cf function make_bitmap_for_tracking in vehicle/aimsun.py)
+
+        Returns
+        -------
+        list of (flow.utils.aimsun.struct.InfVeh, int, int)
+            tracking info object, leader and next section of each vehicle
+        """
+        if len(veh_ids) == 0:
+            return []
+
+        # send the command type to the server and wait for a response
+        self.s.send(str(ac.VEH_GET_TRACKING_BULK).encode())
+        self._recv_exactly(struct.calcsize('i'))
+
+        # send the bitmap and the vehicle ids
+        payload = struct.pack('<i', len(info_bitmap)) + \
+            info_bitmap.encode() + \
+            struct.pack('<%di' % len(veh_ids), *veh_ids)
+        self.s.sendall(struct.pack('<I', len(payload)) + payload)
+
+        # collect the tracking info of every vehicle
+        size, = struct.unpack('<I', self._recv_exactly(struct.calcsize('<I')))
+        data = self._recv_exactly(size)
+
+        unpacker = struct.Struct(
+            '<' + tracking_format(info_bitmap).replace(' ', '') + 'ii')
+        ret = []
+        for values in unpacker.iter_unpack(data):
+            ret.append((make_tracking_info(values[:-2], info_bitmap),
+                        values[-2], values[-1]))
 
         return ret
 
+    def _recv_exactly(self, size):
+        """Receive exactly `size` bytes from the connection.
+
+        Parameters
+        ----------
+        size : int
+            number of bytes to receive
+
+        Returns
+        -------
+        bytes
+            received message
+        """
+        data = b''
+        while len(data) < size:
+            chunk = self.s.recv(size - len(data))
+            if chunk == b'':
+                raise ConnectionError('Connection closed by the server.')
+            data += chunk
+        return data
+
     def get_vehicle_leader(self, veh_id):
         """Return the leader of a specific vehicle.
 
@@ -1,4 +1,16 @@
 """Constants used by the aimsun API for sending/receiving TCP messages."""
+import struct
+
+###############################################################################
+#                                   Framing                                   #
+###############################################################################
+
+#: first byte of a framed command, see FlowAimsunAPI.send_commands
+FRAMED_COMMAND = 0xFF
+
+#: header of framed commands and replies: a marker byte (FRAMED_COMMAND), the
+#: command type, the request id, and the size of the payload
+FRAME_HEADER = struct.Struct('<BBII')
 
 ###############################################################################
 #                             Simulation Commands                             #
@@ -92,6 +104,9 @@ VEH_SET_TRACKED = 0x18
 #: set vehicle as untracked in Aimsun
 VEH_SET_NO_TRACKED = 0x19
 
+#: get the tracking information, leader and next section of several vehicles
+VEH_GET_TRACKING_BULK = 0x1D
+
 
 ###############################################################################
 #                           Traffic Light Commands                            #
@@ -0,0 +1,574 @@
+"""Pure-Python stand-in for the Aimsun server.
+
+The server in this module speaks the same socket protocol as the
+`threaded_client` method in flow/utils/aimsun/run.py, but replaces Aimsun with
+a simple kinematic model of vehicles driving on a multi-lane ring road. It is
+meant to exercise the Aimsun kernel (and measure the cost of its protocol)
+without a licensed Aimsun install. For example:
+
+    >>> server = FakeAimsunServer(num_vehicles=1000)
+    >>> server.start()
+    >>> kernel_api = FlowAimsunAPI(port=server.port)
+    >>> ...
+    >>> kernel_api.stop_simulation()
+
+The ring road consists of `num_sections` sections of equal length, with ids
+1 to `num_sections`, and vehicles are given the ids 1 to `num_vehicles`. Like
+in Aimsun, speeds are reported in km/h and lanes are numbered from 1.
+"""
+import socket
+import struct
+import threading
+
+import numpy as np
+
+import flow.utils.aimsun.constants as ac
+from flow.utils.aimsun.api import tracking_format
+
+# format of the static information of a vehicle
+STATIC_FORMAT = 'i i i f f f f f f f f f f i i i ? f f f f f i i i i'
+
+# format of the values sent by the client for every command. 'str' denotes a
+# string, 'packed' a binary message preceded by its length, and None a status
+# message with no value
+COMMAND_FORMATS = {
+    ac.SIMULATION_STEP: None,
+    ac.SIMULATION_TERMINATE: None,
+    ac.GET_EDGE_NAME: 'str',
+    ac.ADD_VEHICLE: 'i i i f f i',
+    ac.REMOVE_VEHICLE: 'i',
+    ac.VEH_SET_SPEED: 'i f',
+    ac.VEH_SET_LANE: 'i i',
+    ac.VEH_SET_COLOR: 'i i i i',
+    ac.VEH_GET_ENTERED_IDS: None,
+    ac.VEH_GET_EXITED_IDS: None,
+    ac.VEH_GET_TYPE_ID: 'str',
+    ac.VEH_GET_STATIC: 'i',
+    ac.VEH_GET_TRACKING: 'str',
+    ac.VEH_GET_LEADER: 'i',
+    ac.VEH_GET_FOLLOWER: 'i',
+    ac.VEH_GET_NEXT_SECTION: 'i i',
+    ac.VEH_GET_TYPE_NAME: 'i',
+    ac.VEH_GET_LENGTH: 'i',
+    ac.VEH_SET_TRACKED: 'i',
+    ac.VEH_SET_NO_TRACKED: 'i',
+    ac.VEH_GET_TRACKING_BULK: 'packed',
+    ac.TL_GET_IDS: None,
+    ac.TL_SET_STATE: 'i i i',
+    ac.TL_GET_STATE: 'i',
+}
+
+
+class FakeAimsunServer(object):
+    """A local server mimicking Aimsun and the run.py script.
+
+    Attributes
+    ----------
+    port : int
+        the port number the server listens to
+    round_trips : int
+        number of messages received from the client, each of which the client
+        waits on a reply for
+    num_steps : int
+        number of simulation steps performed so far
+    """
+
+    def __init__(self,
+                 num_vehicles,
+                 port=0,
+                 num_lanes=1,
+                 num_sections=4,
+                 spacing=20.,
+                 sim_step=0.5,
+                 desired_speed=10.,
+                 max_accel=1.,
+                 veh_type='idm',
+                 veh_length=5.):
+        """Instantiate the server and the vehicles of the kinematic model.
+
+        Parameters
+        ----------
+        num_vehicles : int
+            number of vehicles initially in the network
+        port : int, optional
+            the port number of the socket connection. If set to 0, a free port
+            is chosen when the server starts
+        num_lanes : int, optional
+            number of lanes on the ring road
+        num_sections : int, optional
+            number of sections the ring road is divided into
+        spacing : float, optional
+            initial distance between the front of consecutive vehicles in a
+            lane, in meters. This also sets the length of the ring road
+        sim_step : float, optional
+            seconds per simulation step
+        desired_speed : float, optional
+            speed vehicles accelerate to when no speed is set, in m/s
+        max_accel : float, optional
+            maximum acceleration of vehicles, in m/s^2
+        veh_type : str, optional
+            type name of all vehicles
+        veh_length : float, optional
+            length of all vehicles, in meters
+        """
+        self.port = port
+        self.num_lanes = num_lanes
+        self.num_sections = num_sections
+        self.sim_step = sim_step
+        self.desired_speed = desired_speed
+        self.max_accel = max_accel
+        self.veh_type = veh_type
+        self.veh_length = veh_length
+
+        self.round_trips = 0
+        self.num_steps = 0
+
+        # geometry of the ring road
+        per_lane = -(-num_vehicles // num_lanes)
+        self.length = max(per_lane, 1) * spacing
+        self.section_length = self.length / num_sections
+        self._radius = self.length / (2 * np.pi)
+
+        # state of the vehicles, indexed by their id minus one
+        index = np.arange(num_vehicles)
+        self._pos = (index // num_lanes) * spacing
+        self._lane = index % num_lanes
+        self._speed = np.zeros(num_vehicles)
+        self._active = np.ones(num_vehicles, dtype=bool)
+        self._target_speed = np.full(num_vehicles, np.nan)
+        self._target_lane = np.full(num_vehicles, -1)
+        self._leader = np.full(num_vehicles, -1)
+        self._follower = np.full(num_vehicles, -1)
+        self._update_leaders()
+
+        self._entered = list(range(1, num_vehicles + 1))
+        self._exited = []
+
+        self._socket = None
+        self._thread = None
+
+    ###########################################################################
+    #                            Kinematic model                              #
+    ###########################################################################
+
+    def step(self):
+        """Advance the kinematic model by one simulation step.
+
+        Vehicles move towards the speed set by the client during the step (or
+        their desired speed otherwise) while not driving further than the rear
+        of their leader, and move to the lane requested by the client.
+        """
+        ids = np.flatnonzero(self._active)
+        leader = self._leader[ids] - 1
+        gap = np.where(
+            leader >= 0,
+            (self._pos[leader] - self._pos[ids] - self.veh_length) %
+            self.length,
+            np.inf)
+
+        target = self._target_speed[ids]
+        target = np.where(np.isnan(target), self.desired_speed, target)
+        speed = np.minimum(target,
+                           self._speed[ids] + self.max_accel * self.sim_step)
+        speed = np.clip(speed, 0, np.maximum(gap, 0) / self.sim_step)
+
+        self._speed[ids] = speed
+        self._pos[ids] = (self._pos[ids] + speed * self.sim_step) % self.length
+
+        change = self._target_lane[ids] >= 0
+        self._lane[ids[change]] = np.clip(
+            self._target_lane[ids[change]], 0, self.num_lanes - 1)
+
+        self._target_speed[:] = np.nan
+        self._target_lane[:] = -1
+        self._update_leaders()
+        self.num_steps += 1
+
+    def _update_leaders(self):
+        """Compute the leader and follower of every vehicle in its lane."""
+        self._leader[:] = -1
+        self._follower[:] = -1
+        ids = np.flatnonzero(self._active)
+        if len(ids) == 0:
+            return
+
+        # sort the vehicles by lane, and then by position
+        ids = ids[np.lexsort((self._pos[ids], self._lane[ids]))]
+        lane = self._lane[ids]
+        bounds = np.flatnonzero(np.diff(lane)) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [len(ids)]))
+
+        # the leader of a vehicle is the next vehicle in its lane, with the
+        # last vehicle in each lane following the first one
+        nxt = np.arange(1, len(ids) + 1)
+        nxt[ends - 1] = starts
+        alone = (ends - starts) == 1
+        self._leader[ids] = ids[nxt] + 1
+        self._follower[ids[nxt]] = ids + 1
+        self._leader[ids[starts[alone]]] = -1
+        self._follower[ids[starts[alone]]] = -1
+
+    def tracking_values(self, veh_id):
+        """Return the tracking info of a vehicle in the order of the bitmaps.
+
+        Parameters
+        ----------
+        veh_id : int
+            name of the vehicle in Aimsun
+
+        Returns
+        -------
+        tuple of float or int
+            tracking info values (see flow.utils.aimsun.struct.InfVeh)
+        """
+        i = veh_id - 1
+        pos = self._pos[i]
+        speed = self._speed[i]
+        section = int(pos // self.section_length)
+        current_pos = pos - section * self.section_length
+        angle = pos / self._radius
+        back_angle = (pos - self.veh_length) / self._radius
+        return (
+            current_pos,
+            self.section_length - current_pos,
+            self._radius * np.cos(angle),
+            self._radius * np.sin(angle),
+            0.,
+            self._radius * np.cos(back_angle),
+            self._radius * np.sin(back_angle),
+            0.,
+            speed * 3.6,
+            pos,
+            0.,
+            0.,
+            float(speed == 0),
+            section + 1,
+            0,
+            self._lane[i] + 1,
+            -1,
+            -1,
+            -1,
+            -1,
+            -1,
+        )
+
+    def static_values(self, veh_id):
+        """Return the static info of a vehicle.
+
+        Parameters
+        ----------
+        veh_id : int
+            name of the vehicle in Aimsun
+
+        Returns
+        -------
+        tuple of float or int
+            static info values (see flow.utils.aimsun.struct.StaticInfVeh)
+        """
+        return (0, veh_id, 1, self.veh_length, 2., self.desired_speed * 3.6,
+                self.max_accel, self.max_accel, 2 * self.max_accel, 1., 1.,
+                10., 1., 0, 0, 1, False, 0., 1., 1., 1., 1., -1, -1, -1, -1)
+
+    def next_section(self, veh_id):
+        """Return the section following the one a vehicle is on."""
+        section = int(self._pos[veh_id - 1] // self.section_length)
+        return (section + 1) % self.num_sections + 1
+
+    ###########################################################################
+    #                                Commands                                 #
+    ###########################################################################
+
+    def execute(self, command, values):
+        """Execute a command from the client.
+
+        Parameters
+        ----------
+        command : int
+            the command type (one of flow.utils.aimsun.constants.*)
+        values : tuple of Any or bytes
+            values of the command, decoded according to COMMAND_FORMATS
+
+        Returns
+        -------
+        str or None
+            format of the reply
+        tuple of Any
+            values of the reply
+        """
+        if command == ac.GET_EDGE_NAME:
+            return 'i', (int(values[0]) if values[0].isdigit() else 1,)
+
+        elif command == ac.ADD_VEHICLE:
+            edge, lane, _, pos, speed, _ = values
+            self._pos = np.append(
+                self._pos, ((edge - 1) * self.section_length + pos) %
+                self.length)
+            self._lane = np.append(self._lane, lane)
+            self._speed = np.append(self._speed, speed)
+            self._active = np.append(self._active, True)
+            self._target_speed = np.append(self._target_speed, np.nan)
+            self._target_lane = np.append(self._target_lane, -1)
+            self._leader = np.append(self._leader, -1)
+            self._follower = np.append(self._follower, -1)
+            self._update_leaders()
+            return 'i', (len(self._pos),)
+
+        elif command == ac.REMOVE_VEHICLE:
+            veh_id, = values
+            self._active[veh_id - 1] = False
+            self._exited.append(veh_id)
+            self._update_leaders()
+            return 'i', (0,)
+
+        elif command == ac.VEH_SET_SPEED:
+            veh_id, speed = values
+            self._target_speed[veh_id - 1] = speed
+            return 'i', (0,)
+
+        elif command == ac.VEH_SET_LANE:
+            veh_id, target_lane = values
+            self._target_lane[veh_id - 1] = target_lane
+            return 'i', (0,)
+
+        elif command in (ac.VEH_SET_ROUTE, ac.VEH_SET_COLOR):
+            return 'i', (0,)
+
+        elif command in (ac.VEH_SET_TRACKED, ac.VEH_SET_NO_TRACKED,
+                         ac.TL_SET_STATE):
+            return None, ()
+
+        elif command == ac.VEH_GET_ENTERED_IDS:
+            output = ':'.join(str(v) for v in self._entered) or '-1'
+            self._entered = []
+            return 'str', (output,)
+
+        elif command == ac.VEH_GET_EXITED_IDS:
+            output = ':'.join(str(v) for v in self._exited) or '-1'
+            self._exited = []
+            return 'str', (output,)
+
+        elif command == ac.VEH_GET_TYPE_ID:
+            return 'i', (1,)
+
+        elif command == ac.VEH_GET_TYPE_NAME:
+            return 'str', (self.veh_type,)
+
+        elif command == ac.VEH_GET_LENGTH:
+            return 'f', (self.veh_length,)
+
+        elif command == ac.VEH_GET_STATIC:
+            return STATIC_FORMAT, self.static_values(values[0])
+
+        elif command == ac.VEH_GET_TRACKING:
+            # the message is the vehicle id, a ':' character, the bitmap, and
+            # a bit representing whether or not the vehicle is tracked
+            veh_id, info_bitmap = values[0].split(':')
+            info_bitmap = info_bitmap[:-1]
+            data = self.tracking_values(int(veh_id))
+            return tracking_format(info_bitmap), tuple(
+                data[i] for i in range(len(info_bitmap))
+                if info_bitmap[i] == '1')
+
+        elif command == ac.VEH_GET_TRACKING_BULK:
+            bitmap_len, = struct.unpack('<i', values[:4])
+            info_bitmap = values[4:4 + bitmap_len].decode()
+            veh_ids = np.frombuffer(values[4 + bitmap_len:], dtype='<i4')
+            packer = struct.Struct(
+                '<' + tracking_format(info_bitmap) + 'ii')
+            selected = [i for i in range(len(info_bitmap))
+                        if info_bitmap[i] == '1']
+            output = []
+            for veh_id in veh_ids.tolist():
+                data = self.tracking_values(veh_id)
+                output.append(packer.pack(
+                    *([data[i] for i in selected] +
+                      [self._leader[veh_id - 1], self.next_section(veh_id)])))
+            return 'packed', b''.join(output)
+
+        elif command == ac.VEH_GET_LEADER:
+            return 'i', (self._leader[values[0] - 1],)
+
+        elif command == ac.VEH_GET_FOLLOWER:
+            return 'i', (self._follower[values[0] - 1],)
+
+        elif command == ac.VEH_GET_NEXT_SECTION:
+            return 'i', (self.next_section(values[0]),)
+
+        elif command == ac.TL_GET_IDS:
+            return 'str', ('-1',)
+
+        elif command == ac.TL_GET_STATE:
+            return 'i', (0,)
+
+        # in case the message is unknown, return -1001
+        return 'i', (-1001,)
+
+    ###########################################################################
+    #                               Connection                                #
+    ###########################################################################
+
+    def start(self):
+        """Start listening for connections in a background thread."""
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(('localhost', self.port))
+        self._socket.listen(10)
+        self.port = self._socket.getsockname()[1]
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop listening for connections."""
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def _run(self):
+        """Serve one connection per simulation step until terminated.
+
+        Like in Aimsun, the connection is closed by the server once the client
+        requests a simulation step, and the client reconnects after the step.
+        """
+        while self._socket is not None:
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                break
+
+            with conn:
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                command = self._serve(conn)
+
+            if command == ac.SIMULATION_STEP:
+                self.step()
+            else:
+                self.stop()
+
+    def _serve(self, conn):
+        """Serve commands from the client until the end of the step.
+
+        Returns
+        -------
+        int or None
+            the command that ended the connection, or None if the client
+            closed the connection
+        """
+        # send feedback that the connection is active
+        conn.sendall(b'Ready.')
+
+        while True:
+            data = self._recv(conn, 2048)
+            if len(data) == 0:
+                return None
+
+            if data[:1] == struct.pack('B', ac.FRAMED_COMMAND):
+                self._serve_frames(conn, data)
+                continue
+
+            command = int(data)
+            in_format = COMMAND_FORMATS.get(command, -1)
+            if in_format == -1:
+                conn.sendall(struct.pack('i', -1001))
+                continue
+
+            # acknowledge the command, and collect its values
+            conn.sendall(struct.pack('i', 0))
+            if in_format is None:
+                self._recv_exactly(conn, 1)
+                values = ()
+            elif in_format == 'str':
+                values = (self._recv(conn, 2048).decode(),)
+            elif in_format == 'packed':
+                size, = struct.unpack('<I', self._recv_exactly(conn, 4))
+                values = self._recv_exactly(conn, size, count=False)
+            else:
+                values = struct.unpack(in_format, self._recv_exactly(
+                    conn, struct.calcsize(in_format)))
+
+            if command in (ac.SIMULATION_STEP, ac.SIMULATION_TERMINATE):
+                return command
+
+            out_format, output = self.execute(command, values)
+            self._send(conn, out_format, output)
+
+    def _serve_frames(self, conn, data):
+        """Execute framed commands and reply to them in a single message."""
+        replies = []
+        while len(data) > 0:
+            if len(data) < ac.FRAME_HEADER.size:
+                data += self._recv_exactly(
+                    conn, ac.FRAME_HEADER.size - len(data), count=False)
+            _, command, request_id, size = ac.FRAME_HEADER.unpack(
+                data[:ac.FRAME_HEADER.size])
+            if len(data) < ac.FRAME_HEADER.size + size:
+                data += self._recv_exactly(
+                    conn, ac.FRAME_HEADER.size + size - len(data),
+                    count=False)
+            payload = data[ac.FRAME_HEADER.size:ac.FRAME_HEADER.size + size]
+            data = data[ac.FRAME_HEADER.size + size:]
+
+            in_format = COMMAND_FORMATS.get(command)
+            if command == ac.VEH_SET_ROUTE:
+                values = struct.unpack('%di' % (size // 4), payload)
+            elif in_format == 'str':
+                values = (payload.decode(),)
+            elif in_format in (None, 'packed'):
+                values = payload
+            else:
+                values = struct.unpack(in_format, payload)
+
+            out_format, output = self.execute(command, values)
+            if out_format is None:
+                reply = struct.pack('i', 0)
+            elif out_format == 'str':
+                reply = output[0].encode()
+            elif out_format == 'packed':
+                reply = output
+            else:
+                reply = struct.pack(out_format, *output)
+
+            replies.append(ac.FRAME_HEADER.pack(
+                ac.FRAMED_COMMAND, command, request_id, len(reply)))
+            replies.append(reply)
+
+        conn.sendall(b''.join(replies))
+
+    def _send(self, conn, out_format, values):
+        """Send a reply to the client, following the framing of run.py."""
+        if out_format is None:
+            return
+        elif out_format == 'packed':
+            conn.sendall(struct.pack('<I', len(values)) + values)
+        elif out_format == 'str':
+            values = values[0].encode()
+
+            # send the value in segments of 256 bytes, waiting for a status
+            # request from the client after each
+            while True:
+                conn.sendall(values[:256])
+                values = values[256:]
+                self._recv(conn, 2048)
+                conn.sendall(struct.pack('i', int(len(values) > 0)))
+                if len(values) == 0:
+                    break
+        else:
+            conn.sendall(struct.pack(out_format, *values))
+
+    def _recv(self, conn, size, count=True):
+        """Receive a message from the client."""
+        data = conn.recv(size)
+        if count and len(data) > 0:
+            self.round_trips += 1
+        return data
+
+    def _recv_exactly(self, conn, size, count=True):
+        """Receive exactly `size` bytes from the client."""
+        data = self._recv(conn, size, count)
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if len(chunk) == 0:
+                raise ConnectionError('Connection closed by the client.')
+            data += chunk
+        return data
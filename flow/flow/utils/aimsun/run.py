@@ -100,6 +100,280 @@ def retrieve_message(conn, out_format):
     return unpacked_data
 
 
+def recv_exactly(conn, size):
+    """Receive exactly `size` bytes from the client.
+
+    Parameters
+    ----------
+    conn : socket.socket
+        socket for server connection
+    size : int
+        number of bytes to receive
+
+    Returns
+    -------
+    bytes
+        received message
+
+    Raises
+    ------
+    socket.error
+        if the connection is closed before the message is complete
+    """
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise socket.error('Connection closed by the client.')
+        data += chunk
+    return data
+
+
+def retrieve_packed_message(conn):
+    """Retrieve a binary message preceded by its length from the client.
+
+    Parameters
+    ----------
+    conn : socket.socket
+        socket for server connection
+
+    Returns
+    -------
+    bytes
+        received message
+    """
+    size, = struct.unpack('<I', recv_exactly(conn, struct.calcsize('<I')))
+    return recv_exactly(conn, size)
+
+
+def send_packed_message(conn, data):
+    """Send a binary message preceded by its length to the client.
+
+    Parameters
+    ----------
+    conn : socket.socket
+        socket for server connection
+    data : bytes
+        message to be sent
+    """
+    conn.sendall(struct.pack('<I', len(data)) + data)
+
+
+def add_vehicle(edge, lane, type_id, pos, speed, next_section):
+    """Add a tracked vehicle to the network and return its id."""
+    veh_id = aimsun_api.AKIPutVehTrafficFlow(
+        edge, lane+1, type_id, pos, speed, next_section, 1)
+    return veh_id,
+
+
+def remove_vehicle(veh_id):
+    """Remove a vehicle from the network."""
+    aimsun_api.AKIVehTrackedRemove(veh_id)
+    return 0,
+
+
+def set_speed(veh_id, speed):
+    """Set the speed of a vehicle, in m/s."""
+    # aimsun_api.AKIVehTrackedForceSpeed(veh_id, speed * 3.6)
+    aimsun_api.AKIVehTrackedModifySpeed(veh_id, speed * 3.6)
+    return 0,
+
+
+def set_lane(veh_id, target_lane):
+    """Apply a lane change to a vehicle."""
+    aimsun_api.AKIVehTrackedModifyLane(veh_id, target_lane)
+    return 0,
+
+
+def set_route():
+    """Set the route of a vehicle."""
+    # TODO
+
+
+def set_color(veh_id, r, g, b):
+    """Set the color of a vehicle."""
+    # TODO
+    return 0,
+
+
+def set_tracked(veh_id):
+    """Set a vehicle as tracked."""
+    aimsun_api.AKIVehSetAsTracked(veh_id)
+
+
+def set_no_tracked(veh_id):
+    """Set a tracked vehicle as untracked."""
+    aimsun_api.AKIVehSetAsNoTracked(veh_id)
+
+
+def get_length(veh_id):
+    """Return the length of a vehicle."""
+    static_info = aimsun_api.AKIVehGetStaticInf(veh_id)
+    return static_info.length,
+
+
+def get_leader(veh_id):
+    """Return the leader of a vehicle."""
+    return aimsun_api.AKIVehGetLeaderId(veh_id),
+
+
+def get_follower(veh_id):
+    """Return the follower of a vehicle."""
+    return aimsun_api.AKIVehGetFollowerId(veh_id),
+
+
+def get_next_section(veh_id, section):
+    """Return the section following `section` on the path of a vehicle."""
+    return AKIVehInfPathGetNextSection(veh_id, section),
+
+
+def set_metering_state(meter_aimsun_id, state):
+    """Set the state of a metering."""
+    time = AKIGetCurrentSimulationTime()  # simulation time
+    sim_step = AKIGetSimulationStepTime()
+    identity = 0
+    ECIChangeStateMeteringById(
+        meter_aimsun_id, state, time, sim_step, identity)
+    return 0,
+
+
+def get_metering_state(meter_aimsun_id):
+    """Return the state of a metering."""
+    lane_id = 1  # TODO double check
+    return ECIGetCurrentStateofMeteringById(meter_aimsun_id, lane_id),
+
+
+# commands whose values and replies are fixed-size structures. Each command is
+# mapped to the format of its values (None if it has none), the format of its
+# reply (None if it has none), and the function executing it. These commands
+# are served identically in framed messages and in the handshake of
+# threaded_client, except that framed commands without a reply are answered
+# with a status of 0
+COMMANDS = {
+    ac.ADD_VEHICLE: ('i i i f f i', 'i', add_vehicle),
+    ac.REMOVE_VEHICLE: ('i', 'i', remove_vehicle),
+    ac.VEH_SET_SPEED: ('i f', 'i', set_speed),
+    ac.VEH_SET_LANE: ('i i', 'i', set_lane),
+    ac.VEH_SET_ROUTE: (None, None, set_route),
+    ac.VEH_SET_COLOR: ('i i i i', 'i', set_color),
+    ac.VEH_SET_TRACKED: ('i', None, set_tracked),
+    ac.VEH_SET_NO_TRACKED: ('i', None, set_no_tracked),
+    ac.VEH_GET_LENGTH: ('i', 'f', get_length),
+    ac.VEH_GET_LEADER: ('i', 'i', get_leader),
+    ac.VEH_GET_FOLLOWER: ('i', 'i', get_follower),
+    ac.VEH_GET_NEXT_SECTION: ('i i', 'i', get_next_section),
+    ac.TL_SET_STATE: ('i i', 'i', set_metering_state),
+    ac.TL_GET_STATE: ('i', 'i', get_metering_state),
+}
+
+
+def execute_framed_command(command, payload):
+    """Execute a framed command and return the payload of its reply.
+
+    Parameters
+    ----------
+    command : int
+        the command type (one of flow.utils.aimsun.constants.*)
+    payload : bytes
+        encoded values of the command
+
+    Returns
+    -------
+    bytes
+        encoded reply of the command
+    """
+    # in case the command is unknown, return -1001
+    if command not in COMMANDS:
+        return struct.pack('i', -1001)
+
+    in_format, out_format, execute = COMMANDS[command]
+    values = () if in_format is None else struct.unpack(in_format, payload)
+    output = execute(*values)
+
+    if out_format is None:
+        return struct.pack('i', 0)
+    return struct.pack(out_format, *output)
+
+
+def serve_frames(conn, data):
+    """Execute framed commands and reply to them in a single message.
+
+    Frames are parsed from the received data, additional data being received
+    until the last frame is complete. The replies are framed similarly to the
+    commands, and tagged with the request id of the command they answer.
+
+    Parameters
+    ----------
+    conn : socket.socket
+        socket for server connection
+    data : bytes
+        data received from the client, starting with a frame header
+    """
+    replies = []
+    while len(data) > 0:
+        # receive the remainder of the frame
+        if len(data) < ac.FRAME_HEADER.size:
+            data += recv_exactly(conn, ac.FRAME_HEADER.size - len(data))
+        _, command, request_id, size = ac.FRAME_HEADER.unpack(
+            data[:ac.FRAME_HEADER.size])
+        if len(data) < ac.FRAME_HEADER.size + size:
+            data += recv_exactly(
+                conn, ac.FRAME_HEADER.size + size - len(data))
+
+        payload = data[ac.FRAME_HEADER.size:ac.FRAME_HEADER.size + size]
+        data = data[ac.FRAME_HEADER.size + size:]
+
+        reply = execute_framed_command(command, payload)
+        replies.append(ac.FRAME_HEADER.pack(
+            ac.FRAMED_COMMAND, command, request_id, len(reply)))
+        replies.append(reply)
+
+    conn.sendall(b''.join(replies))
+
+
+def get_tracking_values(tracking_info):
+    """Return the tracking info of a vehicle in the order of the bitmaps.
+
+    Parameters
+    ----------
+    tracking_info : InfVeh
+        tracking info object returned by Aimsun
+
+    Returns
+    -------
+    tuple of float or int
+        tracking info values
+    """
+    return (
+        # tracking_info.report,
+        # tracking_info.idVeh,
+        # tracking_info.type,
+        tracking_info.CurrentPos,
+        tracking_info.distance2End,
+        tracking_info.xCurrentPos,
+        tracking_info.yCurrentPos,
+        tracking_info.zCurrentPos,
+        tracking_info.xCurrentPosBack,
+        tracking_info.yCurrentPosBack,
+        tracking_info.zCurrentPosBack,
+        tracking_info.CurrentSpeed,
+        # tracking_info.PreviousSpeed,
+        tracking_info.TotalDistance,
+        # tracking_info.SystemGenerationT,
+        # tracking_info.SystemEntranceT,
+        tracking_info.SectionEntranceT,
+        tracking_info.CurrentStopTime,
+        tracking_info.stopped,
+        tracking_info.idSection,
+        tracking_info.segment,
+        tracking_info.numberLane,
+        tracking_info.idJunction,
+        tracking_info.idSectionFrom,
+        tracking_info.idLaneFrom,
+        tracking_info.idSectionTo,
+        tracking_info.idLaneTo)
+
+
 def threaded_client(conn):
     """Create a threaded process.
 
@@ -124,6 +398,12 @@ def threaded_client(conn):
             if data == '':
                 continue
 
+            # framed commands are executed and replied to at once, and all
+            # other commands follow the handshake below
+            if data[:1] == struct.pack('B', ac.FRAMED_COMMAND):
+                serve_frames(conn, data)
+                continue
+
             # convert to integer
             data = int(data)
 
@@ -139,61 +419,18 @@ def threaded_client(conn):
                 send_message(conn, in_format='i', values=(0,))
                 done = True
 
-            elif data == ac.ADD_VEHICLE:
-                send_message(conn, in_format='i', values=(0,))
-
-                edge, lane, type_id, pos, speed, next_section = \
-                    retrieve_message(conn, 'i i i f f i')
-
-                # 1 if tracked, 0 otherwise
-                tracking = 1
-
-                veh_id = aimsun_api.AKIPutVehTrafficFlow(
-                    edge, lane+1, type_id, pos, speed, next_section,
-                    tracking
-                )
-
-                send_message(conn, in_format='i', values=(veh_id,))
-
-            elif data == ac.REMOVE_VEHICLE:
-                send_message(conn, in_format='i', values=(0,))
-                veh_id, = retrieve_message(conn, 'i')
-                aimsun_api.AKIVehTrackedRemove(veh_id)
+            elif data in COMMANDS:
                 send_message(conn, in_format='i', values=(0,))
 
-            elif data == ac.VEH_SET_SPEED:
-                send_message(conn, in_format='i', values=(0,))
-                veh_id, speed = retrieve_message(conn, 'i f')
-                new_speed = speed * 3.6
-                # aimsun_api.AKIVehTrackedForceSpeed(veh_id, new_speed)
-                aimsun_api.AKIVehTrackedModifySpeed(veh_id, new_speed)
-                send_message(conn, in_format='i', values=(0,))
-
-            elif data == ac.VEH_SET_LANE:
-                conn.send(b'Set vehicle lane.')
-                veh_id, target_lane = retrieve_message(conn, 'i i')
-                aimsun_api.AKIVehTrackedModifyLane(veh_id, target_lane)
-                send_message(conn, in_format='i', values=(0,))
-
-            elif data == ac.VEH_SET_ROUTE:
-                send_message(conn, in_format='i', values=(0,))
-                # TODO
-
-            elif data == ac.VEH_SET_COLOR:
-                send_message(conn, in_format='i', values=(0,))
-                veh_id, r, g, b = retrieve_message(conn, 'i i i i')
-                # TODO
-                send_message(conn, in_format='i', values=(0,))
+                in_format, out_format, execute = COMMANDS[data]
+                if in_format is None:
+                    values = ()
+                else:
+                    values = retrieve_message(conn, in_format)
+                output = execute(*values)
 
-            elif data == ac.VEH_SET_TRACKED:
-                send_message(conn, in_format='i', values=(0,))
-                veh_id, = retrieve_message(conn, 'i')
-                aimsun_api.AKIVehSetAsTracked(veh_id)
-
-            elif data == ac.VEH_SET_NO_TRACKED:
-                send_message(conn, in_format='i', values=(0,))
-                veh_id, = retrieve_message(conn, 'i')
-                aimsun_api.AKIVehSetAsNoTracked(veh_id)
+                if out_format is not None:
+                    send_message(conn, in_format=out_format, values=output)
 
             elif data == ac.VEH_GET_ENTERED_IDS:
                 send_message(conn, in_format='i', values=(0,))
@@ -257,15 +494,6 @@ def threaded_client(conn):
 
                 send_message(conn, in_format='str', values=(output,))
 
-            elif data == ac.VEH_GET_LENGTH:
-                send_message(conn, in_format='i', values=(0,))
-                veh_id, = retrieve_message(conn, 'i')
-
-                static_info = aimsun_api.AKIVehGetStaticInf(veh_id)
-                output = static_info.length
-
-                send_message(conn, in_format='f', values=(output,))
-
             elif data == ac.VEH_GET_STATIC:
                 send_message(conn, in_format='i', values=(0,))
                 veh_id, = retrieve_message(conn, 'i')
@@ -335,35 +563,8 @@ def threaded_client(conn):
                 else:
                     tracking_info = aimsun_api.AKIVehGetInf(veh_id)
 
-                data = (
-                          # tracking_info.report,
-                          # tracking_info.idVeh,
-                          # tracking_info.type,
-                          tracking_info.CurrentPos,
-                          tracking_info.distance2End,
-                          tracking_info.xCurrentPos,
-                          tracking_info.yCurrentPos,
-                          tracking_info.zCurrentPos,
-                          tracking_info.xCurrentPosBack,
-                          tracking_info.yCurrentPosBack,
-                          tracking_info.zCurrentPosBack,
-                          tracking_info.CurrentSpeed,
-                          # tracking_info.PreviousSpeed,
-                          tracking_info.TotalDistance,
-                          # tracking_info.SystemGenerationT,
-                          # tracking_info.SystemEntranceT,
-                          tracking_info.SectionEntranceT,
-                          tracking_info.CurrentStopTime,
-                          tracking_info.stopped,
-                          tracking_info.idSection,
-                          tracking_info.segment,
-                          tracking_info.numberLane,
-                          tracking_info.idJunction,
-                          tracking_info.idSectionFrom,
-                          tracking_info.idLaneFrom,
-                          tracking_info.idSectionTo,
-                          tracking_info.idLaneTo)
-                
+                data = get_tracking_values(tracking_info)
+
                 # form the output and output format according to the bitmap
                 output = []
                 in_format = ''
@@ -384,23 +585,44 @@ def threaded_client(conn):
                              in_format=in_format,
                              values=output)
 
-            elif data == ac.VEH_GET_LEADER:
+            elif data == ac.VEH_GET_TRACKING_BULK:
                 send_message(conn, in_format='i', values=(0,))
-                veh_id, = retrieve_message(conn, 'i')
-                leader = aimsun_api.AKIVehGetLeaderId(veh_id)
-                send_message(conn, in_format='i', values=(leader,))
 
-            elif data == ac.VEH_GET_FOLLOWER:
-                send_message(conn, in_format='i', values=(0,))
-                veh_id, = retrieve_message(conn, 'i')
-                follower = aimsun_api.AKIVehGetFollowerId(veh_id)
-                send_message(conn, in_format='i', values=(follower,))
+                # the message is built as follows:
+                #   the length of the bitmap
+                #   the bitmap representing what information is to be returned
+                #   the ids of the (tracked) vehicles
+                payload = retrieve_packed_message(conn)
+                bitmap_len, = struct.unpack('<i', payload[:4])
+                info_bitmap = payload[4:4 + bitmap_len].decode()
+                num_veh = (len(payload) - 4 - bitmap_len) // 4
+                veh_ids = struct.unpack(
+                    '<%di' % num_veh, payload[4 + bitmap_len:])
+
+                # format of the information returned for each vehicle: the
+                # tracking info selected by the bitmap, the leader, and the
+                # next section
+                in_format = '<'
+                for i in range(len(info_bitmap)):
+                    if info_bitmap[i] == '1':
+                        in_format += 'f' if i <= 12 else 'i'
+                packer = struct.Struct(in_format + 'ii')
 
-            elif data == ac.VEH_GET_NEXT_SECTION:
-                send_message(conn, in_format='i', values=(0,))
-                veh_id, section = retrieve_message(conn, 'i i')
-                next_section = AKIVehInfPathGetNextSection(veh_id, section)
-                send_message(conn, in_format='i', values=(next_section,))
+                output = []
+                for veh_id in veh_ids:
+                    tracking_info = aimsun_api.AKIVehTrackedGetInf(veh_id)
+                    values = get_tracking_values(tracking_info)
+                    leader = aimsun_api.AKIVehGetLeaderId(veh_id)
+                    if tracking_info.idSection != -1:
+                        next_section = AKIVehInfPathGetNextSection(
+                            veh_id, tracking_info.idSection)
+                    else:
+                        next_section = -1
+                    output.append(packer.pack(*(
+                        [values[i] for i in range(len(info_bitmap))
+                         if info_bitmap[i] == '1'] + [leader, next_section])))
+
+                send_packed_message(conn, b''.join(output))
 
             elif data == ac.VEH_GET_ROUTE:
                 send_message(conn, in_format='i', values=(0,))
@@ -426,24 +648,6 @@ def threaded_client(conn):
                     output = ':'.join([str(e) for e in meter_ids])
                 send_message(conn, in_format='str', values=(output,))
 
-            elif data == ac.TL_SET_STATE:
-                send_message(conn, in_format='i', values=(0,))
-                meter_aimsun_id, state = retrieve_message(conn, 'i i')
-                time = AKIGetCurrentSimulationTime()  # simulation time
-                sim_step = AKIGetSimulationStepTime()
-                identity = 0
-                ECIChangeStateMeteringById(
-                    meter_aimsun_id, state, time, sim_step, identity)
-                send_message(conn, in_format='i', values=(0,))
-
-            elif data == ac.TL_GET_STATE:
-                send_message(conn, in_format='i', values=(0,))
-                meter_aimsun_id = retrieve_message(conn, 'i')
-                lane_id = 1  # TODO double check
-                state = ECIGetCurrentStateofMeteringById(
-                    meter_aimsun_id, lane_id)
-                send_message(conn, in_format='i', values=(state,))
-
             elif data == ac.GET_EDGE_NAME:
                 send_message(conn, in_format='i', values=(0,))
 
@@ -493,6 +697,7 @@ def AAPIManage(time, timeSta, timeTrans, acycle):
     # connect to the Flow instance
     server_socket.listen(10)
     c, address = server_socket.accept()
+    c.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
     # start the threaded process
     start_new_thread(threaded_client, (c,))
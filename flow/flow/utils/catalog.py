@@ -0,0 +1,276 @@
+"""Catalog of the emission files generated by sweeps of experiments.
+
+The catalog is a manifest (a json-lines file, usually stored next to the
+emission files) with one entry per run, containing:
+
+* run_id: the name of the emission file, without the "_emission.csv" suffix
+* flow_params_hash: a hash of the flow_params used to generate the run
+* params: the sweep parameters of the run (e.g. the number of vehicles)
+* path: the path to the emission file, relative to the catalog
+
+Runs are loaded with `load_runs`, which filters the manifest on the sweep
+parameters before reading any data, reads the selected runs in parallel, and
+caches each run as a typed columnar file so that later loads skip parsing the
+csv altogether.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from flow.utils.rllib import FlowParamsEncoder
+
+# suffix of the emission files written by the simulation kernel
+EMISSION_SUFFIX = '_emission.csv'
+
+# key of the cached files listing the columns of the run, in order
+_COLUMNS_KEY = '__columns__'
+
+
+def params_hash(flow_params):
+    """Return a hash identifying a set of flow_params.
+
+    Parameters
+    ----------
+    flow_params : dict
+        flow-specific parameters, as used by the experiment
+
+    Returns
+    -------
+    str
+        the sha1 hash of the json serialization of the parameters
+    """
+    serialized = json.dumps(
+        flow_params, cls=FlowParamsEncoder, sort_keys=True)
+    return hashlib.sha1(serialized.encode()).hexdigest()
+
+
+def write_catalog(catalog_path, emission_files, flow_params, params=None):
+    """Append the runs of an experiment to a catalog.
+
+    Parameters
+    ----------
+    catalog_path : str
+        path to the catalog file. It is created if it does not exist.
+    emission_files : list of str
+        paths to the emission files of the experiment, one per run (see
+        `Experiment.emission_files`)
+    flow_params : dict
+        flow-specific parameters used to generate the runs
+    params : dict, optional
+        sweep parameters of the experiment. The index of each run within the
+        experiment is added to them under the "run" key.
+
+    Returns
+    -------
+    list of dict
+        the entries added to the catalog
+    """
+    catalog_dir = os.path.dirname(os.path.abspath(catalog_path))
+    flow_params_hash = params_hash(flow_params)
+
+    entries = []
+    for i, emission_file in enumerate(emission_files):
+        run_id = os.path.basename(emission_file)
+        if run_id.endswith(EMISSION_SUFFIX):
+            run_id = run_id[:-len(EMISSION_SUFFIX)]
+        entries.append({
+            'run_id': run_id,
+            'flow_params_hash': flow_params_hash,
+            'params': dict(params or {}, run=i),
+            'path': os.path.relpath(
+                os.path.abspath(emission_file), catalog_dir),
+        })
+
+    with open(catalog_path, 'a') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, sort_keys=True) + '\n')
+
+    return entries
+
+
+def read_catalog(catalog_path):
+    """Read the manifest of a catalog.
+
+    Parameters
+    ----------
+    catalog_path : str
+        path to the catalog file
+
+    Returns
+    -------
+    pandas.DataFrame
+        one row per run, with the run_id, flow_params_hash and path (made
+        absolute) of the run, and one column per sweep parameter
+    """
+    catalog_dir = os.path.dirname(os.path.abspath(catalog_path))
+
+    rows = []
+    with open(catalog_path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            row = dict(entry.pop('params', {}))
+            row.update(entry)
+            row['path'] = os.path.join(catalog_dir, entry['path'])
+            rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+def _select(manifest, filters):
+    """Return the rows of the manifest matching every filter.
+
+    A filter maps a column of the manifest to either a value, a list of
+    accepted values, or a function returning whether a value is accepted.
+    """
+    mask = np.ones(len(manifest), dtype=bool)
+    for key, accepted in filters.items():
+        if key not in manifest:
+            raise KeyError('Unknown catalog parameter: {}'.format(key))
+        column = manifest[key]
+        if callable(accepted):
+            mask &= column.map(accepted).to_numpy(dtype=bool)
+        elif isinstance(accepted, (list, tuple, set)):
+            mask &= column.isin(accepted).to_numpy()
+        else:
+            mask &= (column == accepted).to_numpy()
+    return manifest[mask]
+
+
+def _save_columns(df, cache_path):
+    """Store a run as one typed array per column.
+
+    String columns are stored as integer codes and the array of their
+    categories. The file is written atomically, so that concurrent loaders
+    never read a partial cache.
+    """
+    arrays = {_COLUMNS_KEY: np.array(df.columns, dtype=str)}
+    for col in df.columns:
+        if pd.api.types.is_numeric_dtype(df[col]):
+            arrays[col] = df[col].to_numpy()
+        else:
+            # missing values are given the code -1
+            values = pd.Categorical(df[col])
+            arrays[col + '.codes'] = values.codes
+            arrays[col + '.categories'] = np.array(
+                values.categories.astype(str), dtype=str)
+
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(cache_path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _load_columns(cache_path, columns=None):
+    """Read the (selected) columns of a run stored by `_save_columns`."""
+    with np.load(cache_path, allow_pickle=False) as data:
+        stored = list(data[_COLUMNS_KEY])
+        data_ = {}
+        for col in columns or stored:
+            if col not in stored:
+                raise KeyError('Unknown emission column: {}'.format(col))
+            if col in data:
+                data_[col] = data[col]
+            else:
+                data_[col] = pd.Categorical.from_codes(
+                    data[col + '.codes'], data[col + '.categories'])
+    return pd.DataFrame(data_)
+
+
+def _load_run(path, cache_path=None, columns=None):
+    """Load a run, through its cache if one is specified.
+
+    The cache is (re)built from the emission file if it is missing or older
+    than the emission file.
+    """
+    if cache_path is None:
+        return pd.read_csv(path, usecols=columns)
+
+    if not os.path.exists(cache_path) or \
+            os.path.getmtime(cache_path) < os.path.getmtime(path):
+        _save_columns(pd.read_csv(path), cache_path)
+
+    return _load_columns(cache_path, columns)
+
+
+def load_runs(catalog_path,
+              filters=None,
+              columns=None,
+              num_workers=None,
+              cache_dir=None,
+              use_cache=True):
+    """Load the runs of a catalog matching a set of filters.
+
+    Parameters
+    ----------
+    catalog_path : str
+        path to the catalog file
+    filters : dict, optional
+        filters on the sweep parameters (or the run_id and flow_params_hash)
+        of the runs. Each filter maps a parameter to either a value, a list of
+        accepted values, or a function returning whether a value is accepted.
+        Runs are filtered before any emission data is read.
+    columns : list of str, optional
+        emission columns to load. Defaults to all columns.
+    num_workers : int, optional
+        number of processes reading runs in parallel. Defaults to the number
+        of processors; runs are read in the current process if set to 1.
+    cache_dir : str, optional
+        directory of the cached runs. Defaults to a ".cache" directory next to
+        the catalog.
+    use_cache : bool, optional
+        whether to read runs from (and store them into) the cache
+
+    Returns
+    -------
+    pandas.DataFrame
+        the emission data of the selected runs, with one column per sweep
+        parameter and a run_id column identifying the run of each row
+
+    Raises
+    ------
+    KeyError
+        if a filter or column is not in the catalog or the emission data
+    """
+    manifest = _select(read_catalog(catalog_path), filters or {})
+
+    paths = list(manifest['path']) if len(manifest) > 0 else []
+    if use_cache:
+        if cache_dir is None:
+            cache_dir = os.path.join(
+                os.path.dirname(os.path.abspath(catalog_path)), '.cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_paths = [os.path.join(cache_dir, '{}.npz'.format(run_id))
+                       for run_id in manifest['run_id']] if paths else []
+    else:
+        cache_paths = [None] * len(paths)
+
+    if num_workers == 1 or len(paths) <= 1:
+        runs = list(map(_load_run, paths, cache_paths,
+                        [columns] * len(paths)))
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            runs = list(executor.map(_load_run, paths, cache_paths,
+                                     [columns] * len(paths)))
+
+    # attach the parameters of each run to its data
+    params = [key for key in manifest.columns
+              if key not in ('path', 'flow_params_hash')]
+    for run, (_, entry) in zip(runs, manifest.iterrows()):
+        for key in params:
+            run[key] = entry[key]
+
+    if not runs:
+        return pd.DataFrame(columns=(columns or []) + params)
+    return pd.concat(runs, ignore_index=True)
@@ -0,0 +1,51 @@
+"""Utility method for lazily importing the attributes of a module.
+
+Packages such as flow.envs export many classes whose modules pull in heavy
+dependencies (pyglet, matplotlib, scipy, the Aimsun API, ...). Importing all
+of them eagerly makes every process importing flow pay for these, including
+short-lived, headless processes that only need one environment. Instead, the
+attributes are listed in a mapping from their name to the module defining
+them, and are only imported the first time they are accessed, e.g.
+
+>>> __getattr__, __dir__ = lazy_attributes(__name__, {
+>>>     'AccelEnv': 'flow.envs.ring.accel',
+>>> })
+"""
+import importlib
+import sys
+
+
+def lazy_attributes(module_name, attributes):
+    """Return the module-level `__getattr__` and `__dir__` of a lazy module.
+
+    Parameters
+    ----------
+    module_name : str
+        name of the module the attributes are exported from, i.e. its
+        `__name__`
+    attributes : dict < str, str >
+        dictionary mapping the name of each lazily imported attribute to the
+        name of the module it is defined in
+
+    Returns
+    -------
+    function
+        module-level `__getattr__`. It imports and returns the requested
+        attribute, and stores it in the module so that it is only imported
+        once. Unknown attributes raise an AttributeError.
+    function
+        module-level `__dir__`, which lists the lazy attributes along with
+        the ones that have already been imported
+    """
+    def __getattr__(name):
+        if name not in attributes:
+            raise AttributeError('module {!r} has no attribute {!r}'.format(
+                module_name, name))
+        value = getattr(importlib.import_module(attributes[name]), name)
+        setattr(sys.modules[module_name], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[module_name])) | set(attributes))
+
+    return __getattr__, __dir__
@@ -10,6 +10,7 @@ from flow.core.experiment import Experiment
 from flow.core.params import InitialConfig
 from flow.core.params import TrafficLightParams
 from flow.utils.rllib import get_flow_params, get_rllib_config
+from flow.utils.rllib import compute_actions
 from flow.utils.registry import make_create_env
 from flow.utils.exceptions import FatalFlowError
 
@@ -26,8 +27,6 @@ from flow.benchmarks.merge1 import flow_params as merge1
 from flow.benchmarks.merge2 import flow_params as merge2
 
 import ray
-from ray.rllib.agent import get_agent_class
-from ray.tune.registry import get_registry, register_env
 import numpy as np
 
 # number of simulations to execute when computing performance scores
@@ -49,7 +48,12 @@ AVAILABLE_BENCHMARKS = {
 }
 
 
-def evaluate_policy(benchmark, _get_actions, _get_states=None):
+def evaluate_policy(benchmark,
+                    _get_actions,
+                    _get_states=None,
+                    num_workers=1,
+                    return_info=False,
+                    num_runs=NUM_RUNS):
     """Evaluate the performance of a controller on a predefined benchmark.
 
     Parameters
@@ -63,15 +67,27 @@ def evaluate_policy(benchmark, _get_actions, _get_states=None):
         a mapping from the environment object in Flow to some state, which
         overrides the _get_states method of the environment. Note that the
         same cannot be done for the actions.
+    num_workers : int, optional
+        number of ray worker processes the simulations are split among. If
+        larger than 1, _get_actions and _get_states must be serializable (see
+        get_compute_action_rllib for RLlib agents), and ray is initialized
+        with as many cpus if it is not initialized yet.
+    return_info : bool, optional
+        whether to also return the statistics of every simulation
+    num_runs : int, optional
+        number of simulations, defaults to NUM_RUNS
 
     Returns
     -------
     float
-        mean of the evaluation return of the benchmark from NUM_RUNS number
+        mean of the evaluation return of the benchmark from num_runs number
         of simulations
     float
         standard deviation of the evaluation return of the benchmark from
-        NUM_RUNS number of simulations
+        num_runs number of simulations
+    dict
+        the returns, velocities (mean speed), outflows and inflows of every
+        simulation, only returned if return_info is set to True
 
     Raises
     ------
@@ -82,6 +98,35 @@ def evaluate_policy(benchmark, _get_actions, _get_states=None):
         raise FatalFlowError(
             "benchmark {} is not available. Check spelling?".format(benchmark))
 
+    if num_workers > 1:
+        if not ray.is_initialized():
+            ray.init(num_cpus=num_workers)
+
+        worker_runs = [len(runs) for runs in np.array_split(
+            np.arange(num_runs), num_workers) if len(runs)]
+        run_benchmark = ray.remote(_run_benchmark)
+        results = ray.get([
+            run_benchmark.remote(benchmark, _get_actions, _get_states, n)
+            for n in worker_runs])
+
+        # aggregate the statistics of the workers
+        info_dict = {key: sum((res[key] for res in results), [])
+                     for key in results[0].keys()}
+    else:
+        info_dict = _run_benchmark(
+            benchmark, _get_actions, _get_states, num_runs)
+
+    mean, std = np.mean(info_dict["returns"]), np.std(info_dict["returns"])
+    if return_info:
+        return mean, std, info_dict
+    return mean, std
+
+
+def _run_benchmark(benchmark, _get_actions, _get_states, num_runs):
+    """Run simulations of a benchmark, and return their statistics.
+
+    See evaluate_policy for a description of the parameters.
+    """
     # get the flow params from the benchmark
     flow_params = AVAILABLE_BENCHMARKS[benchmark]
 
@@ -94,11 +139,15 @@ def evaluate_policy(benchmark, _get_actions, _get_states=None):
     initial_config = flow_params.get("initial", InitialConfig())
     traffic_lights = flow_params.get("tls", TrafficLightParams())
 
-    # import the environment and network classes
-    module = __import__("flow.envs", fromlist=[flow_params["env_name"]])
-    env_class = getattr(module, flow_params["env_name"])
-    module = __import__("flow.networks", fromlist=[flow_params["network"]])
-    network_class = getattr(module, flow_params["network"])
+    # import the environment and network classes, if specified by name
+    env_class = flow_params["env_name"]
+    if isinstance(env_class, str):
+        module = __import__("flow.envs", fromlist=[env_class])
+        env_class = getattr(module, env_class)
+    network_class = flow_params["network"]
+    if isinstance(network_class, str):
+        module = __import__("flow.networks", fromlist=[network_class])
+        network_class = getattr(module, network_class)
 
     # recreate the network and environment
     network = network_class(
@@ -162,23 +211,30 @@ def evaluate_policy(benchmark, _get_actions, _get_states=None):
 
     # create a Experiment object. Note that the state may not be that which is
     # specified by the environment.
-    exp = Experiment(flow_params)
-    exp.env = env
-
-    exp = Experiment(flow_params)
+    custom_callables = {
+        # inflow rate at the end of each run
+        "inflows": (lambda env: env.k.vehicle.get_inflow_rate(500), "last"),
+    }
+    exp = Experiment(flow_params, custom_callables)
     exp.env = env
 
-    # run the experiment and return the reward
+    # run the experiment and return the statistics of every run
     res = exp.run(
-        num_runs=NUM_RUNS,
+        num_runs=num_runs,
         rl_actions=_get_actions)
 
-    return np.mean(res["returns"]), np.std(res["returns"])
+    return {key: list(res[key]) for key in
+            ["returns", "velocities", "outflows", "inflows"]}
 
 
 def get_compute_action_rllib(path_to_dir, checkpoint_num, alg):
     """Collect the compute_action method from RLlib's serialized files.
 
+    The agent is only restored the first time an action is computed, in the
+    process computing it, and the returned method is serializable: it can be
+    passed to evaluate_policy with num_workers > 1, in which case every
+    worker restores its own agent.
+
     Parameters
     ----------
     path_to_dir : str
@@ -191,17 +247,110 @@ def get_compute_action_rllib(path_to_dir, checkpoint_num, alg):
 
     Returns
     -------
-    method
+    RLlibActions
         the compute_action method from the algorithm along with the trained
         parameters
     """
+    return RLlibActions(path_to_dir, checkpoint_num, alg)
+
+
+def get_compute_actions_rllib(path_to_dir, checkpoint_num, alg):
+    """Collect a batched compute_actions method for multiagent policies.
+
+    The returned method maps the observations of every agent to their actions,
+    with one forward pass of each policy per call (see
+    flow.utils.rllib.compute_actions). As in get_compute_action_rllib, the
+    agent is restored the first time actions are computed.
+
+    Parameters
+    ----------
+    path_to_dir : str
+        RLlib directory containing training results
+    checkpoint_num : int
+        checkpoint number / training iteration of the learned policy
+    alg : str
+        name of the RLlib algorithm that was used during the training
+        procedure
+
+    Returns
+    -------
+    RLlibActions
+        the mapping from the observations of the agents to their actions
+    """
+    return RLlibActions(path_to_dir, checkpoint_num, alg, multiagent=True)
+
+
+class RLlibActions(object):
+    """Mapping from states to the actions of an agent trained with RLlib.
+
+    Only the location of the checkpoint is serialized along with instances of
+    this class, and the agent is restored from it the first time actions are
+    computed in a process.
+
+    Attributes
+    ----------
+    path_to_dir : str
+        RLlib directory containing training results
+    checkpoint_num : int
+        checkpoint number / training iteration of the learned policy
+    alg : str
+        name of the RLlib algorithm that was used during the training
+        procedure
+    multiagent : bool
+        whether the agent has multiple policies, in which case the actions of
+        all the agents are computed in one pass per policy
+    """
+
+    def __init__(self, path_to_dir, checkpoint_num, alg, multiagent=False):
+        """Instantiate the mapping, without restoring the agent."""
+        self.path_to_dir = path_to_dir
+        self.checkpoint_num = checkpoint_num
+        self.alg = alg
+        self.multiagent = multiagent
+        self._compute = None
+
+    def __call__(self, state):
+        """Return the actions of the agent(s) in a state."""
+        if self._compute is None:
+            # run on only one cpu for rendering purposes, unless already
+            # running within ray (e.g. in the workers of evaluate_policy)
+            if not ray.is_initialized():
+                ray.init(num_cpus=1)
+
+            agent, config = _restore_agent_rllib(
+                self.path_to_dir, self.checkpoint_num, self.alg)
+            if self.multiagent:
+                policy_mapping_fn = config["multiagent"]["policy_mapping_fn"]
+                self._compute = lambda observations: compute_actions(
+                    agent, observations, policy_mapping_fn)
+            else:
+                self._compute = agent.compute_action
+
+        return self._compute(state)
+
+    def __getstate__(self):
+        """Serialize the location of the checkpoint, not the agent."""
+        state = self.__dict__.copy()
+        state["_compute"] = None
+        return state
+
+
+def _restore_agent_rllib(path_to_dir, checkpoint_num, alg):
+    """Restore a trained agent, and return it along with its configuration.
+
+    Ray must be initialized. See get_compute_action_rllib for a description
+    of the parameters.
+    """
+    from ray.rllib.agent import get_agent_class
+    from ray.tune.registry import get_registry, register_env
+
     # collect the configuration information from the RLlib checkpoint
     result_dir = path_to_dir if path_to_dir[-1] != '/' else path_to_dir[:-1]
     config = get_rllib_config(result_dir)
 
-    # run on only one cpu for rendering purposes
-    ray.init(num_cpus=1)
-    config["num_workers"] = 1
+    # actions are only computed by the local worker, so that the agent does
+    # not need any cpu besides the one of the current process
+    config["num_workers"] = 0
 
     # create and register a gym+rllib env
     flow_params = get_flow_params(config)
@@ -217,4 +366,4 @@ def get_compute_action_rllib(path_to_dir, checkpoint_num, alg):
     checkpoint = result_dir + '/checkpoint-{}'.format(checkpoint_num)
     agent._restore(checkpoint)
 
-    return agent.compute_action
+    return agent, config
@@ -3,7 +3,7 @@
 import gym
 from gym.envs.registration import register
 
-from copy import deepcopy
+from copy import copy
 
 import flow.envs
 from flow.core.params import InitialConfig
@@ -68,8 +68,7 @@ def make_create_env(params, version=0, render=None):
         base_env_name = params["env_name"].__name__
 
     # deal with multiple environments being created under the same name
-    all_envs = gym.envs.registry.all()
-    env_ids = [env_spec.id for env_spec in all_envs]
+    env_ids = _registered_env_ids()
     while "{}-v{}".format(base_env_name, version) in env_ids:
         version += 1
     env_name = "{}-v{}".format(base_env_name, version)
@@ -82,14 +81,28 @@ def make_create_env(params, version=0, render=None):
     else:
         network_class = params["network"]
 
+    # check if the environment is a single or multiagent environment, and get
+    # the right address accordingly
+    if isinstance(params["env_name"], str):
+        if hasattr(flow.envs, params["env_name"]):
+            env_loc = 'flow.envs'
+        else:
+            env_loc = 'flow.envs.multiagent'
+        entry_point = env_loc + ':{}'.format(params["env_name"])
+    else:
+        entry_point = params["env_name"].__module__ + ':' + params["env_name"].__name__
+
     env_params = params['env']
     net_params = params['net']
     initial_config = params.get('initial', InitialConfig())
     traffic_lights = params.get("tls", TrafficLightParams())
 
     def create_env(*_):
-        sim_params = deepcopy(params['sim'])
-        vehicles = deepcopy(params['veh'])
+        # the parameters are only read by the environments, so each of them
+        # shares the original parameters rather than a deep copy of them. The
+        # vehicles are copied since some networks add vehicle types to them.
+        sim_params = params['sim']
+        vehicles = copy(params['veh'])
 
         network = network_class(
             name=exp_tag,
@@ -100,34 +113,24 @@ def make_create_env(params, version=0, render=None):
         )
 
         # accept new render type if not set to None
-        sim_params.render = render or sim_params.render
-
-        # check if the environment is a single or multiagent environment, and
-        # get the right address accordingly
-        single_agent_envs = [env for env in dir(flow.envs)
-                             if not env.startswith('__')]
-
-        if isinstance(params["env_name"], str):
-            if params['env_name'] in single_agent_envs:
-                env_loc = 'flow.envs'
-            else:
-                env_loc = 'flow.envs.multiagent'
-            entry_point = env_loc + ':{}'.format(params["env_name"])
-        else:
-            entry_point = params["env_name"].__module__ + ':' + params["env_name"].__name__
+        if render and render != sim_params.render:
+            sim_params = copy(sim_params)
+            sim_params.render = render
+
+        kwargs = {
+            "env_params": env_params,
+            "sim_params": sim_params,
+            "network": network,
+            "simulator": params['simulator']
+        }
 
-        # register the environment with OpenAI gym
-        register(
-            id=env_name,
-            entry_point=entry_point,
-            kwargs={
-                "env_params": env_params,
-                "sim_params": sim_params,
-                "network": network,
-                "simulator": params['simulator']
-            })
+        # register the environment with OpenAI gym the first time it is
+        # created. The registered arguments are used by later calls to
+        # gym.make(env_name), and are overridden by the current ones here.
+        if env_name not in _registered_env_ids():
+            register(id=env_name, entry_point=entry_point, kwargs=kwargs)
 
-        return gym.envs.make(env_name)
+        return gym.envs.make(env_name, **kwargs)
 
     return create_env, env_name
 
@@ -136,3 +139,12 @@ def env_constructor(params, version=0, render=None):
     """Return a constructor from make_create_env."""
     create_env, env_name = make_create_env(params, version, render)
     return create_env
+
+
+def _registered_env_ids():
+    """Return the ids of all environments registered with OpenAI gym."""
+    registry = gym.envs.registry
+    if isinstance(registry, dict):
+        # newer versions of gym store the environment specs in a dict
+        return set(registry.keys())
+    return set(registry.env_specs.keys())
@@ -8,6 +8,8 @@ from copy import deepcopy
 import os
 import sys
 
+import numpy as np
+
 import flow.envs
 from flow.core.params import SumoLaneChangeParams, SumoCarFollowingParams, \
     SumoParams, InitialConfig, EnvParams, NetParams, InFlows
@@ -15,7 +17,6 @@ from flow.core.params import TrafficLightParams
 from flow.core.params import VehicleParams
 from flow.envs import Env
 from flow.networks import Network
-from ray.cloudpickle import cloudpickle
 import inspect
 
 
@@ -218,6 +219,90 @@ def get_rllib_pkl(path):
         raise ValueError(
             "Could not find params.pkl in either the checkpoint dir or "
             "its parent directory.")
+    # ray is only imported when loading rllib results
+    from ray.cloudpickle import cloudpickle
     with open(config_path, 'rb') as f:
         config = cloudpickle.load(f)
     return config
+
+
+def get_local_worker(agent):
+    """Return the local rollout worker (or evaluator) of an RLlib agent."""
+    if hasattr(agent, "workers"):
+        return agent.workers.local_worker()
+    return agent.local_evaluator
+
+
+def compute_actions(agent, observations, policy_mapping_fn, states=None):
+    """Compute the actions of multiple agents, with one pass per policy.
+
+    This is a batched version of calling ``agent.compute_action`` for every
+    agent id. The observations of the agents are grouped by policy id,
+    preprocessed and filtered as in ``agent.compute_action``, and the actions
+    of every group are computed by a single call to the policy. As in
+    ``agent.compute_action``, the actions are clipped to the action space of
+    their policy if the "clip_actions" option of the agent is set.
+
+    Parameters
+    ----------
+    agent : ray.rllib.agents.Trainer
+        the RLlib agent
+    observations : dict
+        observation of every agent id
+    policy_mapping_fn : function
+        maps an agent id to the id of its policy
+    states : dict, optional
+        recurrent state of every agent id, for policies with recurrent models
+        (e.g. LSTMs). Agents without a state are given the initial state of
+        their policy. The states are updated in place.
+
+    Returns
+    -------
+    dict
+        action of every agent id
+    """
+    worker = get_local_worker(agent)
+    clip_actions = agent.config.get("clip_actions")
+    if clip_actions:
+        try:
+            from ray.rllib.evaluation.sampler import clip_action
+        except ImportError:
+            from ray.rllib.utils.spaces.space_utils import clip_action
+
+    # group the agents by policy
+    agents_by_policy = {}
+    for agent_id in observations.keys():
+        agents_by_policy.setdefault(
+            policy_mapping_fn(agent_id), []).append(agent_id)
+
+    actions = {}
+    for policy_id, agent_ids in agents_by_policy.items():
+        policy = agent.get_policy(policy_id)
+        preprocessor = worker.preprocessors[policy_id]
+        obs_filter = worker.filters[policy_id]
+        obs_batch = np.stack([
+            obs_filter(preprocessor.transform(observations[agent_id]),
+                       update=False)
+            for agent_id in agent_ids])
+
+        state_batches = None
+        if states is not None:
+            for agent_id in agent_ids:
+                if agent_id not in states:
+                    states[agent_id] = policy.get_initial_state()
+            state_batches = [
+                np.stack([states[agent_id][i] for agent_id in agent_ids])
+                for i in range(len(states[agent_ids[0]]))]
+
+        action_batch, state_out, _ = policy.compute_actions(
+            obs_batch, state_batches=state_batches)
+        if clip_actions:
+            action_batch = [clip_action(action, policy.action_space)
+                            for action in action_batch]
+
+        for i, agent_id in enumerate(agent_ids):
+            actions[agent_id] = action_batch[i]
+            if states is not None:
+                states[agent_id] = [state[i] for state in state_out]
+
+    return actions
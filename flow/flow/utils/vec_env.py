@@ -0,0 +1,491 @@
+"""Vectorized environment running several flow environments in subprocesses.
+
+Each environment runs in its own worker process. Observations, rewards, done
+flags and actions are exchanged through preallocated shared-memory NumPy
+buffers, so that only small control messages (and the info dicts) go through
+the pipes connecting the workers to the main process. The buffers are
+allocated once the first worker has reported the spaces of its environment,
+so that no environment is created in the main process.
+
+The environments can be stepped in lock-step (`step`), or asynchronously by
+stepping subsets of the environments and collecting the ones that are ready
+(`step_async`, `ready_ids` and `step_wait`). When `auto_reset` is set, an
+environment that is done is reset right away by its worker; its last
+observation is then stored under "terminal_observation" in its info dict.
+
+Only single-agent environments with Box or Discrete observation and action
+spaces are supported, and Python 3.8 or later is required.
+"""
+import multiprocessing as mp
+from multiprocessing.connection import wait
+import traceback
+
+import numpy as np
+from gym.spaces import Box, Discrete
+
+from flow.utils.registry import env_constructor
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+
+def _space_buffer(space, num_envs):
+    """Return a shared buffer for one element of a space per environment."""
+    if isinstance(space, Box):
+        shape, dtype = space.shape, space.dtype
+    elif isinstance(space, Discrete):
+        shape, dtype = (), np.int64
+    else:
+        raise ValueError(
+            'Only Box and Discrete spaces are supported, not {}.'.format(
+                type(space).__name__))
+    return _SharedArray((num_envs,) + tuple(shape), dtype)
+
+
+class _SharedArray(object):
+    """NumPy array stored in shared memory, which can be sent to workers.
+
+    Unlike arrays allocated with multiprocessing.RawArray, the memory is
+    identified by its name, so it can be sent to running processes.
+    """
+
+    def __init__(self, shape, dtype):
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        self.shm = shared_memory.SharedMemory(
+            create=True,
+            size=max(1, int(np.prod(shape)) * self.dtype.itemsize))
+
+    def array(self):
+        """Return a NumPy view of the shared memory."""
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    def unlink(self):
+        """Release the shared memory.
+
+        All the views returned by `array` must have been deleted.
+        """
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _worker(index, env_fn, conn, auto_reset):
+    """Run an environment, and step it whenever requested.
+
+    The worker first reports the spaces of its environment, and then waits
+    for the shared buffers before it can be stepped or reset.
+
+    Parameters
+    ----------
+    index : int
+        index of the environment, i.e. of its row in the shared buffers
+    env_fn : callable
+        function creating the environment
+    conn : multiprocessing.connection.Connection
+        pipe to the main process
+    auto_reset : bool
+        whether to reset the environment as soon as it is done
+    """
+    env = None
+    try:
+        env = env_fn()
+        conn.send(('ok', (env.observation_space, env.action_space)))
+        while True:
+            cmd, data = conn.recv()
+            if cmd == 'buffers':
+                # views of the rows of this environment in the shared
+                # observations, actions, rewards and done flags. The buffers
+                # are kept, as their memory is unmapped once they are deleted
+                buffers = data
+                obs, actions, rewards, dones = (
+                    buffers[key].array()[index:index + 1]
+                    for key in ['obs', 'actions', 'rewards', 'dones'])
+            elif cmd == 'step':
+                action = actions[0].item() if actions.ndim == 1 \
+                    else actions[0].copy()
+                ob, reward, done, info = env.step(action)
+                if done and auto_reset:
+                    info = dict(info, terminal_observation=ob)
+                    ob = env.reset()
+                obs[0] = ob
+                rewards[0] = reward
+                dones[0] = done
+                conn.send(('ok', info))
+            elif cmd == 'reset':
+                obs[0] = env.reset()
+                conn.send(('ok', None))
+            elif cmd == 'call':
+                name, args, kwargs = data
+                attr = getattr(env, name)
+                conn.send(('ok', attr(*args, **kwargs) if callable(attr)
+                           else attr))
+            elif cmd == 'set':
+                setattr(env, data[0], data[1])
+                conn.send(('ok', None))
+            elif cmd == 'close':
+                break
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        conn.send(('error', traceback.format_exc()))
+    finally:
+        if env is not None:
+            env.terminate()
+        conn.close()
+
+
+class SharedMemoryVecEnv(object):
+    """Vectorized flow environment running in subprocesses.
+
+    Usage
+    -----
+    >>> from flow.utils.vec_env import SharedMemoryVecEnv
+    >>>
+    >>> env = SharedMemoryVecEnv.from_flow_params(flow_params, num_envs=4)
+    >>> obs = env.reset()
+    >>> obs, rewards, dones, infos = env.step(actions)
+    >>> env.close()
+
+    Attributes
+    ----------
+    num_envs : int
+        number of environments
+    observation_space : gym.spaces.Space
+        observation space of a single environment
+    action_space : gym.spaces.Space
+        action space of a single environment
+    auto_reset : bool
+        whether environments are reset by their workers as soon as they are
+        done
+    """
+
+    def __init__(self, env_fns, auto_reset=True, start_method='fork'):
+        """Start the worker processes.
+
+        Parameters
+        ----------
+        env_fns : list of callable
+            functions creating each environment
+        auto_reset : bool, optional
+            whether environments are reset by their workers as soon as they
+            are done. Otherwise, they must be reset with `reset_at`
+        start_method : str, optional
+            method used to start the worker processes (see the
+            multiprocessing module). Unless the processes are forked, the
+            functions creating the environments must be picklable
+
+        Raises
+        ------
+        ImportError
+            if Python is older than 3.8, which lacks the shared memory used
+            to exchange data with the workers
+        """
+        if shared_memory is None:
+            raise ImportError(
+                'SharedMemoryVecEnv requires Python 3.8 or later '
+                '(multiprocessing.shared_memory).')
+
+        self.num_envs = len(env_fns)
+        self.auto_reset = auto_reset
+        self.closed = False
+        self._buffers = {}
+
+        ctx = mp.get_context(start_method)
+        self._conns = []
+        self._processes = []
+        for i, env_fn in enumerate(env_fns):
+            conn, worker_conn = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker,
+                args=(i, env_fn, worker_conn, auto_reset),
+                daemon=True)
+            process.start()
+            worker_conn.close()
+            self._conns.append(conn)
+            self._processes.append(process)
+
+        # environments that were sent a command that was not collected yet.
+        # The workers start by reporting the spaces of their environment
+        self._waiting = set(range(self.num_envs))
+        try:
+            spaces = self._recv(range(self.num_envs))
+        except Exception:
+            self.close()
+            raise
+        self.observation_space, self.action_space = spaces[0]
+
+        self._buffers = {
+            'obs': _space_buffer(self.observation_space, self.num_envs),
+            'actions': _space_buffer(self.action_space, self.num_envs),
+            'rewards': _SharedArray((self.num_envs,), np.float64),
+            'dones': _SharedArray((self.num_envs,), np.bool_),
+        }
+        self._obs = self._buffers['obs'].array()
+        self._actions = self._buffers['actions'].array()
+        self._rewards = self._buffers['rewards'].array()
+        self._dones = self._buffers['dones'].array()
+        for conn in self._conns:
+            conn.send(('buffers', self._buffers))
+
+    @classmethod
+    def from_flow_params(cls, flow_params, num_envs, **kwargs):
+        """Create a vectorized environment from flow-specific parameters.
+
+        Parameters
+        ----------
+        flow_params : dict
+            flow-specific parameters (see flow/utils/registry.py)
+        num_envs : int
+            number of environments
+        kwargs : dict
+            additional arguments passed to the constructor
+
+        Returns
+        -------
+        SharedMemoryVecEnv
+            the vectorized environment
+        """
+        return cls([env_constructor(params=flow_params, version=i)
+                    for i in range(num_envs)], **kwargs)
+
+    def _send(self, env_ids, cmd, data=None):
+        for i in env_ids:
+            if i in self._waiting:
+                raise ValueError(
+                    'Environment {} is still busy with a previous '
+                    'command.'.format(i))
+            self._conns[i].send((cmd, data))
+            self._waiting.add(i)
+
+    def _recv(self, env_ids):
+        results = []
+        for i in env_ids:
+            status, data = self._conns[i].recv()
+            self._waiting.discard(i)
+            if status == 'error':
+                raise RuntimeError(
+                    'Environment {} failed:\n{}'.format(i, data))
+            results.append(data)
+        return results
+
+    def _env_ids(self, env_ids):
+        return list(range(self.num_envs)) if env_ids is None else env_ids
+
+    def reset(self):
+        """Reset all environments.
+
+        Returns
+        -------
+        np.ndarray
+            the initial observations, one per row
+        """
+        env_ids = self._env_ids(None)
+        self._send(env_ids, 'reset')
+        self._recv(env_ids)
+        return self._obs.copy()
+
+    def reset_at(self, index):
+        """Reset a single environment.
+
+        Parameters
+        ----------
+        index : int
+            index of the environment
+
+        Returns
+        -------
+        np.ndarray
+            the initial observation of the environment
+        """
+        self._send([index], 'reset')
+        self._recv([index])
+        return self._obs[index].copy()
+
+    def step_async(self, actions, env_ids=None):
+        """Write the actions of some environments, and start stepping them.
+
+        Parameters
+        ----------
+        actions : array_like
+            actions of the environments, one per row
+        env_ids : list of int, optional
+            indices of the environments to step. Defaults to all of them
+        """
+        env_ids = self._env_ids(env_ids)
+        self._actions[env_ids] = np.asarray(actions).reshape(
+            (len(env_ids),) + self._actions.shape[1:])
+        self._send(env_ids, 'step')
+
+    def ready_ids(self, timeout=None):
+        """Return the environments whose last step has completed.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            maximum time to wait for at least one environment, in seconds.
+            Waits indefinitely by default
+
+        Returns
+        -------
+        list of int
+            indices of the environments ready to be collected with
+            `step_wait`
+        """
+        ready = wait([self._conns[i] for i in self._waiting], timeout)
+        return sorted(self._conns.index(conn) for conn in ready)
+
+    def step_wait(self, env_ids=None):
+        """Wait for some environments to complete their step.
+
+        Parameters
+        ----------
+        env_ids : list of int, optional
+            indices of the environments to wait for. Defaults to all of them
+
+        Returns
+        -------
+        np.ndarray
+            observations of the environments, one per row
+        np.ndarray
+            rewards of the environments
+        np.ndarray
+            done flags of the environments
+        list of dict
+            additional information on the environments
+        """
+        env_ids = self._env_ids(env_ids)
+        infos = self._recv(env_ids)
+        return (self._obs[env_ids], self._rewards[env_ids],
+                self._dones[env_ids], infos)
+
+    def step(self, actions):
+        """Step all environments in lock-step.
+
+        Parameters
+        ----------
+        actions : array_like
+            actions of the environments, one per row
+
+        Returns
+        -------
+        np.ndarray
+            observations of the environments, one per row
+        np.ndarray
+            rewards of the environments
+        np.ndarray
+            done flags of the environments
+        list of dict
+            additional information on the environments
+        """
+        self.step_async(actions)
+        return self.step_wait()
+
+    def get_attr(self, attr_name, indices=None):
+        """Return an attribute of some environments."""
+        env_ids = self._env_ids(indices)
+        self._send(env_ids, 'call', (attr_name, (), {}))
+        return self._recv(env_ids)
+
+    def set_attr(self, attr_name, value, indices=None):
+        """Set an attribute of some environments."""
+        env_ids = self._env_ids(indices)
+        self._send(env_ids, 'set', (attr_name, value))
+        self._recv(env_ids)
+
+    def env_method(self, method_name, *method_args, indices=None,
+                   **method_kwargs):
+        """Call a method of some environments, and return its outputs."""
+        env_ids = self._env_ids(indices)
+        self._send(env_ids, 'call', (method_name, method_args, method_kwargs))
+        return self._recv(env_ids)
+
+    def close(self):
+        """Terminate the environments and their worker processes."""
+        if self.closed:
+            return
+        self.closed = True
+
+        # collect any pending step before closing the environments
+        for i in list(self._waiting):
+            try:
+                self._recv([i])
+            except (RuntimeError, EOFError):
+                pass
+        for conn in self._conns:
+            try:
+                conn.send(('close', None))
+            except (BrokenPipeError, EOFError):
+                pass
+        for process in self._processes:
+            process.join()
+
+        # the views of the buffers are released before their memory
+        self._obs = self._actions = self._rewards = self._dones = None
+        for buffer in self._buffers.values():
+            buffer.unlink()
+
+
+def make_rllib_vec_env(flow_params, num_envs, **kwargs):
+    """Return a vectorized environment usable as an RLlib VectorEnv.
+
+    RLlib resets the environments itself when they are done, so `auto_reset`
+    is disabled.
+
+    Parameters
+    ----------
+    flow_params : dict
+        flow-specific parameters (see flow/utils/registry.py)
+    num_envs : int
+        number of environments
+    kwargs : dict
+        additional arguments passed to the SharedMemoryVecEnv constructor
+
+    Returns
+    -------
+    ray.rllib.env.vector_env.VectorEnv
+        the vectorized environment
+    """
+    from ray.rllib.env.vector_env import VectorEnv
+
+    class RLlibVecEnv(SharedMemoryVecEnv, VectorEnv):
+        def vector_reset(self):
+            return list(self.reset())
+
+        def vector_step(self, actions):
+            obs, rewards, dones, infos = self.step(actions)
+            return list(obs), rewards.tolist(), dones.tolist(), infos
+
+        def get_unwrapped(self):
+            # the environments live in the worker processes
+            return []
+
+    return RLlibVecEnv.from_flow_params(
+        flow_params, num_envs, auto_reset=False, **kwargs)
+
+
+def make_stable_baselines_vec_env(flow_params, num_envs, **kwargs):
+    """Return a vectorized environment usable as a stable-baselines VecEnv.
+
+    Parameters
+    ----------
+    flow_params : dict
+        flow-specific parameters (see flow/utils/registry.py)
+    num_envs : int
+        number of environments
+    kwargs : dict
+        additional arguments passed to the SharedMemoryVecEnv constructor
+
+    Returns
+    -------
+    stable_baselines.common.vec_env.VecEnv
+        the vectorized environment
+    """
+    from stable_baselines.common.vec_env import VecEnv
+
+    class StableBaselinesVecEnv(SharedMemoryVecEnv, VecEnv):
+        pass
+
+    return StableBaselinesVecEnv.from_flow_params(
+        flow_params, num_envs, **kwargs)
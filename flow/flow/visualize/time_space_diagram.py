@@ -8,6 +8,16 @@ color representing the speed of te vehicles.
 If the number of simulation steps is too dense, you can plot every nth step in
 the plot by setting the input `--steps=n`.
 
+Large emission files can be restricted to a time slice with
+`--time_range START END`, and read in chunks of rows by setting the input
+`--chunksize=n`. Reading in chunks only bounds the memory used when combined
+with a time range, as all the data is kept otherwise.
+
+If there are too many segments to draw, you can instead plot the mean speed
+of the vehicles within a (time x space) grid by setting the input
+`--mode=raster`. The size of the grid cells is set by `--time_bin` and
+`--space_bin`.
+
 Note: This script assumes that the provided network has only one lane on the
 each edge, or one lane on the main highway in the case of MergeNetwork.
 
@@ -20,7 +30,6 @@ from flow.utils.rllib import get_flow_params
 from flow.networks import RingNetwork, FigureEightNetwork, MergeNetwork, I210SubNetwork, HighwayNetwork
 
 import argparse
-from collections import defaultdict
 try:
     from matplotlib import pyplot as plt
 except ImportError:
@@ -34,6 +43,10 @@ import numpy as np
 import pandas as pd
 
 
+# columns of the trajectory data used for plotting
+PLOT_COLUMNS = ['time_step', 'id', 'distance', 'speed', 'edge_id', 'lane_id',
+                'next_pos', 'next_time']
+
 # networks that can be plotted by this method
 ACCEPTABLE_NETWORKS = [
     RingNetwork,
@@ -44,7 +57,7 @@ ACCEPTABLE_NETWORKS = [
 ]
 
 
-def import_data_from_trajectory(fp, params=dict()):
+def import_data_from_trajectory(fp, params=dict(), chunksize=None, time_range=None):
     r"""Import and preprocess data from the Flow trajectory (.csv) file.
 
     Parameters
@@ -60,14 +73,100 @@ def import_data_from_trajectory(fp, params=dict()):
         * "net_params" (flow.core.params.NetParams): network-specific
           parameters. This is used to collect the lengths of various network
           links.
+    chunksize : int, optional
+        if specified, the file is read in chunks of this many rows, and only
+        the columns needed for plotting are kept (see
+        `iter_data_from_trajectory`). Note that the returned data still
+        contains every row of the file, so chunksize alone does not bound the
+        memory used: to process a file that does not fit in memory, combine
+        it with time_range, or iterate over the chunks with
+        `iter_data_from_trajectory`.
+    time_range : (float, float), optional
+        if specified, only the segments starting within this time range (in
+        sec) are kept. Combined with chunksize, this imports a time slice of
+        an emission file that does not fit in memory.
 
     Returns
     -------
     pd.DataFrame
     """
+    if chunksize is not None:
+        chunks = list(iter_data_from_trajectory(fp, params, chunksize, time_range))
+        return pd.concat(chunks) if chunks else pd.DataFrame(columns=PLOT_COLUMNS)
+
     # Read trajectory csv into pandas dataframe
-    df = pd.read_csv(fp)
+    df = _preprocess(pd.read_csv(fp), params)
+
+    # Compute line segment ends from the next sample of every vehicle
+    next_idx = _next_in_group(df['id'])
+    df = _add_segment_ends(df[next_idx >= 0], df, next_idx[next_idx >= 0])
+
+    return _in_time_range(df, time_range)
 
+
+def iter_data_from_trajectory(fp, params=dict(), chunksize=1000000, time_range=None):
+    """Import and preprocess data from a trajectory file, by chunks of rows.
+
+    Only the columns needed for plotting are kept. The last sample of every
+    vehicle within a chunk is carried over to the next chunk, where it is
+    completed with the next sample of the vehicle, so that the concatenation of
+    the chunks is the same as the output of `import_data_from_trajectory`.
+
+    The rows of the file must be ordered by time, as in emission files. The
+    sample of a vehicle that is carried over is dropped once a chunk contains
+    two time steps after it without the vehicle: the vehicle has then left the
+    network, and the sample has no next sample. The samples carried over are
+    thus those of the vehicles in the network at the end of the last chunks,
+    and the memory used is bounded by the size of a chunk and the number of
+    vehicles in the network.
+
+    Parameters
+    ----------
+    fp : str
+        file path (for the .csv formatted file)
+    params : dict
+        flow-specific parameters, see `import_data_from_trajectory`
+    chunksize : int
+        number of rows read at a time
+    time_range : (float, float), optional
+        if specified, only the segments starting within this time range (in
+        sec) are yielded
+
+    Yields
+    ------
+    pd.DataFrame
+        preprocessed trajectory data of a chunk of the file
+    """
+    # columns needed to compute positions and to plot segments
+    usecols = set(PLOT_COLUMNS) | {'time', 'lane_number', 'relative_position', 'x'}
+
+    pending = None
+    for chunk in pd.read_csv(fp, chunksize=chunksize, usecols=lambda col: col in usecols):
+        chunk = _preprocess(chunk, params)
+        chunk = chunk[[col for col in PLOT_COLUMNS if col in chunk.columns]]
+        if pending is not None:
+            # drop the samples of the vehicles that left the network, i.e.
+            # that are absent from a chunk covering the next time step of the
+            # sample. Since rows are ordered by time, this is the case if the
+            # chunk contains two time steps after the sample
+            times = np.unique(chunk['time_step'].to_numpy())
+            later_times = len(times) - np.searchsorted(
+                times, pending['time_step'].to_numpy(), side='right')
+            left = ~pending['id'].isin(chunk['id']).to_numpy() & (later_times >= 2)
+            chunk = pd.concat([pending[~left], chunk])
+
+        # samples without a next sample in this chunk wait for the next chunk
+        next_idx = _next_in_group(chunk['id'])
+        pending = chunk[next_idx < 0]
+
+        df = _add_segment_ends(chunk[next_idx >= 0], chunk, next_idx[next_idx >= 0])
+        df = _in_time_range(df, time_range)
+        if len(df) > 0:
+            yield df
+
+
+def _preprocess(df, params):
+    """Rename the columns of the emission data and add absolute positions."""
     # Convert column names for backwards compatibility using emissions csv
     column_conversions = {
         'time': 'time_step',
@@ -76,16 +175,39 @@ def import_data_from_trajectory(fp, params=dict()):
     df = df.rename(columns=column_conversions)
     if 'distance' not in df.columns:
         df['distance'] = _get_abs_pos(df, params)
+    return df
+
+
+def _next_in_group(ids):
+    """Return the index of the next row of the same vehicle, for every row.
+
+    This is equivalent to a groupby shift, but computed with a single stable
+    sort of the vehicle codes. Rows without a next row have an index of -1.
+    """
+    codes, _ = pd.factorize(ids)
+    order = np.argsort(codes, kind='stable')
+    has_next = codes[order[1:]] == codes[order[:-1]]
 
-    # Compute line segment ends by shifting dataframe by 1 row
-    df[['next_pos', 'next_time']] = df.groupby('id')[['distance', 'time_step']].shift(-1)
+    next_idx = np.full(len(codes), -1)
+    next_idx[order[:-1][has_next]] = order[1:][has_next]
+    return next_idx
 
-    # Remove nans from data
-    df = df[df['next_time'].notna()]
 
+def _add_segment_ends(df, data, next_idx):
+    """Add the next position and time of every row of df, read from data."""
+    df = df.copy()
+    df['next_pos'] = data['distance'].to_numpy()[next_idx]
+    df['next_time'] = data['time_step'].to_numpy()[next_idx]
     return df
 
 
+def _in_time_range(df, time_range):
+    """Return the rows of df starting within a time range."""
+    if time_range is None:
+        return df
+    return df[(df['time_step'] >= time_range[0]) & (df['time_step'] < time_range[1])]
+
+
 def get_time_space_data(data, params):
     r"""Compute the unique inflows and subsequent outflow statistics.
 
@@ -369,20 +491,69 @@ def _get_abs_pos(df, params):
             '119257908#3': 1784.7899999996537,
         }
     else:
-        edgestarts = defaultdict(float)
+        edgestarts = {}
 
-    ret = df.apply(lambda x: x['relative_position'] + edgestarts[x['edge_id']], axis=1)
+    # map every edge to its start with a lookup array indexed by edge codes.
+    # Unknown edges (code -1) read the last element, which starts at 0.
+    codes = pd.Categorical(df['edge_id'], categories=list(edgestarts)).codes
+    starts = np.append(np.fromiter(edgestarts.values(), dtype=float, count=len(edgestarts)), 0.)
+    ret = df['relative_position'].to_numpy(dtype=float) + starts[codes]
 
     if params['network'] == FigureEightNetwork:
         # reorganize data for space-time plot
         figure_eight_len = 6 * ring_edgelen + 2 * intersection + 2 * junction + 10 * inner
         intersection_loc = [edgestarts[':center_1'] + intersection / 2,
                             edgestarts[':center_0'] + intersection / 2]
-        ret.loc[ret < intersection_loc[0]] += figure_eight_len
-        ret.loc[(ret > intersection_loc[0]) & (ret < intersection_loc[1])] += -intersection_loc[1]
-        ret.loc[ret > intersection_loc[1]] = \
-            - ret.loc[ret > intersection_loc[1]] + figure_eight_len + intersection_loc[0]
-    return ret
+        ret[ret < intersection_loc[0]] += figure_eight_len
+        ret[(ret > intersection_loc[0]) & (ret < intersection_loc[1])] += -intersection_loc[1]
+        ret[ret > intersection_loc[1]] = \
+            - ret[ret > intersection_loc[1]] + figure_eight_len + intersection_loc[0]
+    return pd.Series(ret, index=df.index)
+
+
+def rasterize_time_space(df, time_bin=1., space_bin=5.):
+    """Compute the mean speed of the vehicles within a (time x space) grid.
+
+    Every segment is binned by its start, and the speeds of the segments
+    within each cell are averaged with a single accumulation over all cells,
+    so that the cost is linear in the number of segments.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        trajectory data, as returned by `get_time_space_data`
+    time_bin : float
+        duration of a cell (in sec)
+    space_bin : float
+        length of a cell (in m)
+
+    Returns
+    -------
+    np.ndarray
+        2d array (n_space_bins x n_time_bins) of the mean speed within every
+        cell, or nan if no vehicle was in the cell
+    (float, float, float, float)
+        the time and space bounds of the grid, as (tmin, tmax, ymin, ymax)
+    """
+    time = df['time_step'].to_numpy(dtype=float)
+    pos = df['distance'].to_numpy(dtype=float)
+    if len(df) == 0:
+        return np.full((1, 1), np.nan), (0., time_bin, 0., space_bin)
+
+    tmin, ymin = time.min(), pos.min()
+    time_idx = ((time - tmin) // time_bin).astype(int)
+    pos_idx = ((pos - ymin) // space_bin).astype(int)
+    n_time, n_space = time_idx.max() + 1, pos_idx.max() + 1
+
+    # sum and count the speeds within every cell
+    cells = pos_idx * n_time + time_idx
+    counts = np.bincount(cells, minlength=n_space * n_time)
+    speeds = np.bincount(cells, weights=df['speed'].to_numpy(dtype=float), minlength=n_space * n_time)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grid = (speeds / counts).reshape((n_space, n_time))
+
+    return grid, (tmin, tmin + n_time * time_bin, ymin, ymin + n_space * space_bin)
 
 
 def plot_tsd(ax, df, segs, args, lane=None, ghost_edges=None, ghost_bounds=None):
@@ -399,7 +570,9 @@ def plot_tsd(ax, df, segs, args, lane=None, ghost_edges=None, ghost_bounds=None)
     segs : list of list of lists
         line segments to be plotted, where each segment is a list of two [x,y] pairs
     args : dict
-        parsed arguments
+        parsed arguments. If args.mode is "raster", the mean speeds within a
+        grid of args.time_bin by args.space_bin cells are drawn as an image
+        instead of the segments.
     lane : int, optional
         lane number to be shown in plot title
     ghost_edges : list or set of str
@@ -421,10 +594,15 @@ def plot_tsd(ax, df, segs, args, lane=None, ghost_edges=None, ghost_bounds=None)
     ax.set_xlim(xmin - xbuffer, xmax + xbuffer)
     ax.set_ylim(ymin - ybuffer, ymax + ybuffer)
 
-    lc = LineCollection(segs, cmap=my_cmap, norm=norm)
-    lc.set_array(df['speed'].values)
-    lc.set_linewidth(1)
-    ax.add_collection(lc)
+    if getattr(args, 'mode', 'lines') == 'raster':
+        grid, extent = rasterize_time_space(df, args.time_bin, args.space_bin)
+        lc = ax.imshow(grid, extent=extent, origin='lower', aspect='auto',
+                       interpolation='nearest', cmap=my_cmap, norm=norm)
+    else:
+        lc = LineCollection(segs, cmap=my_cmap, norm=norm)
+        lc.set_array(df['speed'].values)
+        lc.set_linewidth(1)
+        ax.add_collection(lc)
     ax.autoscale()
 
     rects = []
@@ -485,6 +663,21 @@ if __name__ == '__main__':
                         help='The minimum speed in the color range.')
     parser.add_argument('--start', type=float, default=0,
                         help='initial time (in sec) in the plot.')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='number of rows of the trajectory file read at a '
+                             'time. Reads the whole file at once by default.')
+    parser.add_argument('--time_range', type=float, nargs=2, default=None,
+                        metavar=('START', 'END'),
+                        help='time slice (in sec) of the trajectory to plot.')
+    parser.add_argument('--mode', type=str, default='lines',
+                        choices=['lines', 'raster'],
+                        help='whether to draw the trajectory of every vehicle '
+                             '(lines), or the mean speed within a grid of '
+                             'cells (raster).')
+    parser.add_argument('--time_bin', type=float, default=1.,
+                        help='duration (in sec) of a cell in raster mode.')
+    parser.add_argument('--space_bin', type=float, default=5.,
+                        help='length (in m) of a cell in raster mode.')
 
     args = parser.parse_args()
 
@@ -504,29 +697,38 @@ if __name__ == '__main__':
     my_cmap = colors.LinearSegmentedColormap('my_colormap', cdict, 1024)
 
     # Read trajectory csv into pandas dataframe
-    traj_df = import_data_from_trajectory(args.trajectory_path, flow_params)
+    traj_df = import_data_from_trajectory(
+        args.trajectory_path, flow_params, args.chunksize, args.time_range)
 
     # Convert df data into segments for plotting
     segs, traj_df = get_time_space_data(traj_df, flow_params)
 
-    if flow_params['network'] == I210SubNetwork:
-        nlanes = traj_df['lane_id'].nunique()
+    if flow_params['network'] in (I210SubNetwork, HighwayNetwork):
+        if flow_params['network'] == I210SubNetwork:
+            ghosts = dict(ghost_edges={'ghost0', '119257908#3'})
+        else:
+            ghosts = dict(ghost_bounds=(500, 2300))
+
+        # plot every lane in its own panel
+        lanes = traj_df.groupby('lane_id')
+        nlanes = lanes.ngroups
         fig = plt.figure(figsize=(16, 9*nlanes))
 
-        for lane, df in traj_df.groupby('lane_id'):
-            ax = plt.subplot(nlanes, 1, lane+1)
+        for i, (lane, df) in enumerate(lanes):
+            ax = plt.subplot(nlanes, 1, i+1)
 
-            plot_tsd(ax, df, segs[lane], args, int(lane+1), ghost_edges={'ghost0', '119257908#3'})
+            if isinstance(segs, dict):
+                lane_segs = segs[lane]
+            else:
+                lane_segs = df[['time_step', 'distance', 'next_time', 'next_pos']].values.reshape((len(df), 2, 2))
+            plot_tsd(ax, df, lane_segs, args, int(lane+1), **ghosts)
         plt.tight_layout()
     else:
         # perform plotting operation
         fig = plt.figure(figsize=(16, 9))
         ax = plt.axes()
 
-        if flow_params['network'] == HighwayNetwork:
-            plot_tsd(ax, traj_df, segs, args, ghost_bounds=(500, 2300))
-        else:
-            plot_tsd(ax, traj_df, segs, args)
+        plot_tsd(ax, traj_df, segs, args)
 
     ###########################################################################
     #                       Note: For MergeNetwork only                       #
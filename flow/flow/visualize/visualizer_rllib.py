@@ -13,6 +13,7 @@ parser : ArgumentParser
 """
 
 import argparse
+from copy import copy
 import gym
 import numpy as np
 import os
@@ -28,6 +29,7 @@ from ray.tune.registry import register_env
 
 from flow.core.util import emission_to_csv
 from flow.utils.registry import make_create_env
+from flow.utils.rllib import compute_actions
 from flow.utils.rllib import get_flow_params
 from flow.utils.rllib import get_rllib_config
 from flow.utils.rllib import get_rllib_pkl
@@ -43,12 +45,26 @@ Here the arguments are:
 """
 
 
-def visualizer_rllib(args):
-    """Visualizer for RLlib experiments.
-
-    This function takes args (see function create_parser below for
-    more detailed information on what information can be fed to this
-    visualizer), and renders the experiment associated with it.
+def create_agent_and_env(args):
+    """Restore a trained RLlib agent, and create the environment it acts in.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        parsed arguments, see create_parser
+
+    Returns
+    -------
+    ray.rllib.agents.Trainer
+        the restored agent
+    gym.Env
+        the environment
+    dict
+        the RLlib configuration of the agent
+    flow.core.params.EnvParams
+        the environment parameters
+    bool
+        whether the environment is a multiagent environment
     """
     result_dir = args.result_dir if args.result_dir[-1] != '/' \
         else args.result_dir[:-1]
@@ -163,6 +179,46 @@ def visualizer_rllib(args):
     if args.render_mode == 'sumo_gui':
         env.sim_params.render = True  # set to True after initializing agent and env
 
+    # if restart_instance, don't restart here because env.reset will restart later
+    if not sim_params.restart_instance:
+        env.restart_simulation(sim_params=sim_params, render=sim_params.render)
+
+    return agent, env, config, env_params, multiagent
+
+
+def run_rollouts(agent, env, config, env_params, multiagent, num_rollouts):
+    """Run rollouts of a trained agent, and collect their statistics.
+
+    In multiagent environments, the actions of all the agents sharing a policy
+    are computed in a single forward pass of the policy at every step.
+
+    Parameters
+    ----------
+    agent : ray.rllib.agents.Trainer
+        the trained agent
+    env : gym.Env
+        the environment
+    config : dict
+        the RLlib configuration of the agent
+    env_params : flow.core.params.EnvParams
+        the environment parameters
+    multiagent : bool
+        whether the environment is a multiagent environment
+    num_rollouts : int
+        number of rollouts to run
+
+    Returns
+    -------
+    dict
+        statistics of every rollout, consisting of the following keys:
+
+        * returns: return of every rollout (or, in multiagent environments, a
+          dict of the returns of every policy)
+        * mean_speed: mean of the average speed of the vehicles in each step
+        * std_speed: std of the average speed of the vehicles in each step
+        * outflows: outflow rate over the last 500 sec (veh/hr)
+        * inflows: inflow rate over the last 500 sec (veh/hr)
+    """
     if multiagent:
         rets = {}
         # map the agent id to its policy
@@ -172,38 +228,20 @@ def visualizer_rllib(args):
     else:
         rets = []
 
-    if config['model']['use_lstm']:
-        use_lstm = True
-        if multiagent:
-            state_init = {}
-            # map the agent id to its policy
-            policy_map_fn = config['multiagent']['policy_mapping_fn']
-            size = config['model']['lstm_cell_size']
-            for key in config['multiagent']['policies'].keys():
-                state_init[key] = [np.zeros(size, np.float32),
-                                   np.zeros(size, np.float32)]
-        else:
-            state_init = [
-                np.zeros(config['model']['lstm_cell_size'], np.float32),
-                np.zeros(config['model']['lstm_cell_size'], np.float32)
-            ]
-    else:
-        use_lstm = False
-
-    # if restart_instance, don't restart here because env.reset will restart later
-    if not sim_params.restart_instance:
-        env.restart_simulation(sim_params=sim_params, render=sim_params.render)
+    use_lstm = config['model']['use_lstm']
 
     # Simulate and collect metrics
     final_outflows = []
     final_inflows = []
     mean_speed = []
     std_speed = []
-    for i in range(args.num_rollouts):
+    for i in range(num_rollouts):
         vel = []
         state = env.reset()
         if multiagent:
             ret = {key: [0] for key in rets.keys()}
+            # recurrent states of the agents, initialized by their policies
+            lstm_states = {} if use_lstm else None
         else:
             ret = 0
         for _ in range(env_params.horizon):
@@ -215,16 +253,8 @@ def visualizer_rllib(args):
                 vel.append(np.mean(speeds))
 
             if multiagent:
-                action = {}
-                for agent_id in state.keys():
-                    if use_lstm:
-                        action[agent_id], state_init[agent_id], logits = \
-                            agent.compute_action(
-                            state[agent_id], state=state_init[agent_id],
-                            policy_id=policy_map_fn(agent_id))
-                    else:
-                        action[agent_id] = agent.compute_action(
-                            state[agent_id], policy_id=policy_map_fn(agent_id))
+                action = compute_actions(
+                    agent, state, policy_map_fn, lstm_states)
             else:
                 action = agent.compute_action(state)
             state, reward, done, _ = env.step(action)
@@ -247,11 +277,6 @@ def visualizer_rllib(args):
         final_outflows.append(outflow)
         inflow = vehicles.get_inflow_rate(500)
         final_inflows.append(inflow)
-        if np.all(np.array(final_inflows) > 1e-5):
-            throughput_efficiency = [x / y for x, y in
-                                     zip(final_outflows, final_inflows)]
-        else:
-            throughput_efficiency = [0] * len(final_inflows)
         mean_speed.append(np.mean(vel))
         std_speed.append(np.std(vel))
         if multiagent:
@@ -261,10 +286,83 @@ def visualizer_rllib(args):
         else:
             print('Round {}, Return: {}'.format(i, ret))
 
+    return {
+        'returns': rets,
+        'mean_speed': mean_speed,
+        'std_speed': std_speed,
+        'outflows': final_outflows,
+        'inflows': final_inflows,
+    }
+
+
+def _remote_rollouts(args, num_rollouts):
+    """Run rollouts in a worker process, and return their statistics."""
+    agent, env, config, env_params, multiagent = create_agent_and_env(args)
+    results = run_rollouts(
+        agent, env, config, env_params, multiagent, num_rollouts)
+    env.unwrapped.terminate()
+    return results
+
+
+def _merge_results(results):
+    """Concatenate the statistics of rollouts run by different workers."""
+    merged = {}
+    for key in results[0].keys():
+        if isinstance(results[0][key], dict):
+            merged[key] = {policy_id: sum((res[key][policy_id] for res in results), [])
+                           for policy_id in results[0][key].keys()}
+        else:
+            merged[key] = sum((res[key] for res in results), [])
+    return merged
+
+
+def visualizer_rllib(args):
+    """Visualizer for RLlib experiments.
+
+    This function takes args (see function create_parser below for
+    more detailed information on what information can be fed to this
+    visualizer), and renders the experiment associated with it.
+
+    If args.num_workers is larger than 1, the rollouts are split among as many
+    ray worker processes, each with its own agent and environment, and their
+    statistics are aggregated.
+    """
+    if args.num_workers > 1:
+        if args.gen_emission or args.save_render:
+            print('visualizer_rllib.py: error: --gen_emission and '
+                  '--save_render are not supported with --num_workers > 1')
+            sys.exit(1)
+
+        # the workers do not render the simulations
+        worker_args = copy(args)
+        worker_args.render_mode = 'no_render'
+        num_rollouts = [len(rollouts) for rollouts in np.array_split(
+            np.arange(args.num_rollouts), args.num_workers) if len(rollouts)]
+
+        remote_rollouts = ray.remote(_remote_rollouts)
+        results = _merge_results(ray.get([
+            remote_rollouts.remote(worker_args, n) for n in num_rollouts]))
+        env = None
+    else:
+        agent, env, config, env_params, multiagent = create_agent_and_env(args)
+        results = run_rollouts(
+            agent, env, config, env_params, multiagent, args.num_rollouts)
+
+    rets = results['returns']
+    mean_speed = results['mean_speed']
+    std_speed = results['std_speed']
+    final_outflows = results['outflows']
+    final_inflows = results['inflows']
+    if np.all(np.array(final_inflows) > 1e-5):
+        throughput_efficiency = [x / y for x, y in
+                                 zip(final_outflows, final_inflows)]
+    else:
+        throughput_efficiency = [0] * len(final_inflows)
+
     print('==== Summary of results ====')
     print("Return:")
     print(mean_speed)
-    if multiagent:
+    if isinstance(rets, dict):
         for agent_id, rew in rets.items():
             print('For agent', agent_id)
             print(rew)
@@ -300,6 +398,10 @@ def visualizer_rllib(args):
     print('Average, std: {}, {}'.format(np.mean(throughput_efficiency),
                                         np.std(throughput_efficiency)))
 
+    # the environments of the workers are terminated by the workers
+    if env is None:
+        return
+
     # terminate the environment
     env.unwrapped.terminate()
 
@@ -376,11 +478,17 @@ def create_parser():
         '--horizon',
         type=int,
         help='Specifies the horizon.')
+    parser.add_argument(
+        '--num_workers',
+        type=int,
+        default=1,
+        help='The number of worker processes the rollouts are split among. '
+             'Workers do not render the simulations.')
     return parser
 
 
 if __name__ == '__main__':
     parser = create_parser()
     args = parser.parse_args()
-    ray.init(num_cpus=1)
+    ray.init(num_cpus=args.num_workers)
     visualizer_rllib(args)
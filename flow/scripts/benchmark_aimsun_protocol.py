@@ -0,0 +1,132 @@
+"""Benchmark the cost of the Aimsun protocol on the vehicle kernel update.
+
+The Aimsun vehicle kernel is connected to a local stand-in for Aimsun (see
+flow/utils/aimsun/fake_server.py), and `AimsunKernelVehicle.update` is timed
+over a number of simulation steps for networks of increasing sizes. For each
+size, the number of round trips to the server and the latency of the update
+are reported per step.
+
+Usage
+    python benchmark_aimsun_protocol.py --num_vehicles 100 1000 5000
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from flow.core.kernel.vehicle.aimsun import AimsunKernelVehicle
+from flow.core.params import AimsunParams
+from flow.core.params import VehicleParams
+from flow.utils.aimsun.api import FlowAimsunAPI
+from flow.utils.aimsun.fake_server import FakeAimsunServer
+
+
+def benchmark(num_vehicles, num_steps, num_lanes=1):
+    """Time the vehicle kernel update on a fake server.
+
+    Parameters
+    ----------
+    num_vehicles : int
+        number of tracked vehicles in the network
+    num_steps : int
+        number of simulation steps to time the update over
+    num_lanes : int, optional
+        number of lanes in the network
+
+    Returns
+    -------
+    dict
+        number of round trips and latency (in ms) of the update per step, as
+        well as the time needed to register the vehicles during the first
+        update (in s)
+    """
+    sim_params = AimsunParams(sim_step=0.5)
+    server = FakeAimsunServer(num_vehicles, num_lanes=num_lanes,
+                              sim_step=sim_params.sim_step)
+    server.start()
+
+    kernel_api = FlowAimsunAPI(port=server.port)
+    vehicle = AimsunKernelVehicle(None, sim_params)
+    vehicle.initialize(VehicleParams())
+    vehicle.pass_api(kernel_api)
+
+    # the first update registers all the vehicles in the network
+    t0 = time.time()
+    vehicle.update(reset=True)
+    setup_time = time.time() - t0
+
+    round_trips = []
+    latency = []
+    for _ in range(num_steps):
+        kernel_api.simulation_step()
+
+        start_round_trips = server.round_trips
+        t0 = time.time()
+        vehicle.update(reset=False)
+        latency.append(1000 * (time.time() - t0))
+        round_trips.append(server.round_trips - start_round_trips)
+
+    kernel_api.stop_simulation()
+    server.stop()
+
+    return {
+        'round_trips': np.mean(round_trips),
+        'latency': np.mean(latency),
+        'latency_std': np.std(latency),
+        'setup_time': setup_time,
+    }
+
+
+def parse_args(args):
+    """Parse benchmarking arguments from the command line.
+
+    Parameters
+    ----------
+    args : list of str
+        command-line arguments
+
+    Returns
+    -------
+    argparse.Namespace
+        the output parser object
+    """
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description='Benchmark the cost of the Aimsun protocol on the '
+                    'vehicle kernel update, using a local stand-in for '
+                    'Aimsun.')
+
+    parser.add_argument(
+        '--num_vehicles', type=int, nargs='+', default=[100, 1000, 5000],
+        help='Numbers of tracked vehicles to benchmark.')
+    parser.add_argument(
+        '--num_steps', type=int, default=20,
+        help='Number of simulation steps to average over.')
+    parser.add_argument(
+        '--num_lanes', type=int, default=1,
+        help='Number of lanes in the network.')
+
+    return parser.parse_known_args(args)[0]
+
+
+def main(args):
+    """Run the benchmark and print a summary for every network size."""
+    flags = parse_args(args)
+
+    results = {}
+    for num_vehicles in flags.num_vehicles:
+        results[num_vehicles] = benchmark(
+            num_vehicles, flags.num_steps, flags.num_lanes)
+
+    print('')
+    print('{:>10} {:>12} {:>20} {:>12}'.format(
+        'vehicles', 'round trips', 'latency (ms)', 'setup (s)'))
+    for num_vehicles, res in results.items():
+        print('{:>10} {:>12.1f} {:>12.2f} +- {:<5.2f} {:>12.2f}'.format(
+            num_vehicles, res['round_trips'], res['latency'],
+            res['latency_std'], res['setup_time']))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
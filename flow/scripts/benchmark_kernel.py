@@ -0,0 +1,506 @@
+"""Benchmark the cost of the environment step and of hot kernel functions.
+
+For every network, the non-RL example of examples/exp_configs/non_rl is run at
+increasing scales: the number of initial vehicles and the inflow rates are
+multiplied by the scale, and so is the size of closed networks (in order to
+keep their density constant). For each network and scale, the following is
+measured once the network has been warmed up:
+
+* the number of calls to `Env.step` per second, and the average time spent
+  in each phase of the step (in ms)
+* the average time (in us) of a few kernel functions timed in isolation: the
+  multi-lane headway computation, `get_x_by_id` over all vehicles, the capture
+  of emission data, and some of the reward functions in flow/core/rewards.py
+
+The results are written to a JSON file along with metadata on the machine and
+versions they were collected with. A previously stored file can be passed
+with --compare, in which case every metric that is slower than in this
+baseline by more than the tolerance is reported as a regression, as is every
+network and scale that fails while it succeeded in the baseline, and the
+script exits with a non-zero status.
+
+Usage
+    python benchmark_kernel.py --networks ring highway --scales 1 2 4 \
+        --output results.json
+    python benchmark_kernel.py --compare results.json
+"""
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from copy import deepcopy
+
+import numpy as np
+
+import flow.config as config
+from flow.core import rewards
+from flow.core.params import InitialConfig
+from flow.core.params import TrafficLightParams
+from flow.core.params import VehicleParams
+
+#: name of the example in examples/exp_configs/non_rl for each network, and
+#: network parameters scaled along with the number of vehicles. Nested
+#: parameters are specified as tuples of keys.
+NETWORKS = {
+    'ring': ('ring', ['length']),
+    'figure_eight': ('figure_eight', ['radius_ring']),
+    'merge': ('merge', []),
+    'bottleneck': ('bottleneck', []),
+    'traffic_light_grid': ('traffic_light_grid', [
+        ('grid_array', 'inner_length'),
+        ('grid_array', 'long_length'),
+        ('grid_array', 'short_length'),
+        ('grid_array', 'cars_top'),
+        ('grid_array', 'cars_bot'),
+        ('grid_array', 'cars_left'),
+        ('grid_array', 'cars_right'),
+    ]),
+    'highway': ('highway', ['length']),
+    'I210': ('i210_subnetwork', []),
+}
+
+#: networks that are only benchmarked when requested with --networks, since
+#: their network templates are not part of the repository
+OPTIONAL_NETWORKS = ['I210']
+
+#: phases of `Env.step`, and the methods of the environment timed for each
+STEP_PHASES = {
+    'actions': ['k.vehicle.apply_acceleration', 'k.vehicle.apply_lane_change',
+                'k.vehicle.choose_routes', 'apply_rl_actions'],
+    'simulation_step': ['k.simulation.simulation_step'],
+    'kernel_update': ['k.update'],
+    'colors': ['k.vehicle.update_vehicle_colors'],
+    'state': ['get_state'],
+    'reward': ['compute_reward'],
+}
+
+
+def load_flow_params(exp_config):
+    """Return the flow_params of an example in examples/exp_configs/non_rl."""
+    path = os.path.join(config.PROJECT_PATH, 'examples', 'exp_configs',
+                        'non_rl', '{}.py'.format(exp_config))
+    spec = importlib.util.spec_from_file_location(exp_config, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.flow_params
+
+
+def scale_flow_params(flow_params, scale, net_params=()):
+    """Scale the number of vehicles in a network.
+
+    Parameters
+    ----------
+    flow_params : dict
+        flow-specific parameters of the network
+    scale : float
+        factor the number of initial vehicles and the inflow rates are
+        multiplied by
+    net_params : list of str or tuple of str, optional
+        additional network parameters multiplied by the scale as well
+
+    Returns
+    -------
+    dict
+        the scaled flow-specific parameters
+    """
+    flow_params = deepcopy(flow_params)
+
+    vehicles = VehicleParams()
+    for veh in flow_params['veh'].initial:
+        veh = dict(veh, num_vehicles=int(round(veh['num_vehicles'] * scale)))
+        veh['color'] = flow_params['veh'].type_parameters[veh['veh_id']].get(
+            'color')
+        vehicles.add(**veh)
+    flow_params['veh'] = vehicles
+
+    for inflow in flow_params['net'].inflows.get():
+        if 'vehsPerHour' in inflow:
+            inflow['vehsPerHour'] *= scale
+        if 'probability' in inflow:
+            inflow['probability'] = min(1, inflow['probability'] * scale)
+        if 'period' in inflow:
+            inflow['period'] /= scale
+
+    for key in net_params:
+        keys = key if isinstance(key, tuple) else (key,)
+        params = flow_params['net'].additional_params
+        for k in keys[:-1]:
+            params = params[k]
+        params[keys[-1]] = type(params[keys[-1]])(params[keys[-1]] * scale)
+
+    return flow_params
+
+
+def time_phases(env):
+    """Time the phases of the steps of an environment.
+
+    The methods called in every phase are replaced by timed versions on the
+    instances they belong to.
+
+    Parameters
+    ----------
+    env : flow.envs.Env
+        the environment
+
+    Returns
+    -------
+    dict
+        time spent in every phase (in s), updated as the environment is
+        stepped through
+    """
+    timings = {phase: 0. for phase in STEP_PHASES}
+
+    def timed(phase, method):
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                timings[phase] += time.perf_counter() - t0
+        return wrapper
+
+    for phase, methods in STEP_PHASES.items():
+        for name in methods:
+            obj = env
+            *path, attr = name.split('.')
+            for p in path:
+                obj = getattr(obj, p)
+            setattr(obj, attr, timed(phase, getattr(obj, attr)))
+
+    return timings
+
+
+def time_function(func, num_runs):
+    """Return the average time of a function (in us)."""
+    t0 = time.perf_counter()
+    for _ in range(num_runs):
+        func()
+    return 1e6 * (time.perf_counter() - t0) / num_runs
+
+
+def time_kernel_functions(env, num_runs):
+    """Time hot kernel functions in the current state of an environment.
+
+    Parameters
+    ----------
+    env : flow.envs.Env
+        the environment
+    num_runs : int
+        number of calls to average every function over
+
+    Returns
+    -------
+    dict
+        average time of every function (in us)
+    """
+    kv = env.k.vehicle
+    ks = env.k.simulation
+    veh_ids = kv.get_ids()
+
+    results = {
+        'multi_lane_headways': time_function(
+            kv._multi_lane_headways, num_runs),
+        'get_x_by_id': time_function(
+            lambda: kv.get_x_by_id(veh_ids), num_runs),
+    }
+
+    # capture emission data into a temporary directory, restoring the state
+    # of the simulation kernel afterwards
+    emission_path, sim_time = ks.emission_path, ks.time
+    with tempfile.TemporaryDirectory() as tmp:
+        ks.emission_path = tmp
+        results['emission_capture'] = time_function(
+            lambda: ks.update(reset=False), num_runs)
+    ks.emission_path, ks.time = emission_path, sim_time
+    ks.stored_data = dict()
+
+    for reward in [rewards.desired_velocity, rewards.average_velocity,
+                   rewards.min_delay, rewards.energy_consumption]:
+        results['rewards.{}'.format(reward.__name__)] = time_function(
+            lambda: reward(env), num_runs)
+
+    return results
+
+
+def benchmark(network, scale, num_steps, warmup_steps, num_runs):
+    """Benchmark a network at a given scale.
+
+    Parameters
+    ----------
+    network : str
+        name of the network, see NETWORKS
+    scale : float
+        factor the number of vehicles is multiplied by
+    num_steps : int
+        number of steps to time the environment over
+    warmup_steps : int
+        number of steps performed before timing, so that networks with
+        inflows are populated
+    num_runs : int
+        number of calls to average the kernel functions over
+
+    Returns
+    -------
+    dict
+        steps per second, time per step and per phase (in ms), average number
+        of vehicles, and time of the kernel functions (in us)
+    """
+    exp_config, net_params = NETWORKS[network]
+    flow_params = scale_flow_params(
+        load_flow_params(exp_config), scale, net_params)
+
+    sim_params = flow_params['sim']
+    sim_params.render = False
+    sim_params.restart_instance = False
+    sim_params.emission_path = None
+    sim_params.print_warnings = False
+    flow_params['env'].horizon = warmup_steps + num_steps + 1
+    flow_params['env'].warmup_steps = 0
+
+    # the examples do not always specify every parameter their environment
+    # requires, so the missing ones are given their default values
+    env_module = sys.modules[flow_params['env_name'].__module__]
+    for key, value in getattr(env_module, 'ADDITIONAL_ENV_PARAMS', {}).items():
+        flow_params['env'].additional_params.setdefault(key, value)
+
+    template = flow_params['net'].template
+    if isinstance(template, str) and not os.path.isfile(template):
+        raise FileNotFoundError(
+            'Network template of {} not found: {}'.format(network, template))
+
+    # the environment is created directly rather than through gym, so that
+    # its methods can be timed without going through wrappers
+    network = flow_params['network'](
+        name=flow_params['exp_tag'],
+        vehicles=flow_params['veh'],
+        net_params=flow_params['net'],
+        initial_config=flow_params.get('initial', InitialConfig()),
+        traffic_lights=flow_params.get('tls', TrafficLightParams()))
+    env = flow_params['env_name'](
+        env_params=flow_params['env'],
+        sim_params=sim_params,
+        network=network,
+        simulator=flow_params['simulator'])
+
+    try:
+        env.reset()
+        for _ in range(warmup_steps):
+            env.step(None)
+
+        timings = time_phases(env)
+        num_vehicles = []
+        t0 = time.perf_counter()
+        for _ in range(num_steps):
+            env.step(None)
+            num_vehicles.append(env.k.vehicle.num_vehicles)
+        total = time.perf_counter() - t0
+
+        phases = {phase: 1000 * t / num_steps for phase, t in timings.items()}
+        phases['other'] = 1000 * total / num_steps - sum(phases.values())
+
+        return {
+            'num_vehicles': float(np.mean(num_vehicles)),
+            'steps_per_second': num_steps / total,
+            'step_ms': 1000 * total / num_steps,
+            'phases_ms': phases,
+            'functions_us': time_kernel_functions(env, num_runs),
+        }
+    finally:
+        env.terminate()
+
+
+def metadata():
+    """Return information on the machine and versions used to benchmark."""
+    def command_output(cmd):
+        try:
+            return subprocess.check_output(
+                cmd, cwd=config.PROJECT_PATH, stderr=subprocess.DEVNULL,
+            ).decode().splitlines()[0].strip()
+        except (OSError, subprocess.CalledProcessError, IndexError):
+            return None
+
+    return {
+        'date': datetime.datetime.now().isoformat(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sumo': command_output(['sumo', '--version']),
+        'commit': command_output(['git', 'rev-parse', 'HEAD']),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Compare benchmarking results to a baseline.
+
+    Parameters
+    ----------
+    results : dict
+        results of the benchmark, as returned by `run`
+    baseline : dict
+        results of a previous benchmark
+    tolerance : float
+        relative slowdown above which a metric is considered to have regressed
+
+    Returns
+    -------
+    list of (str, float, float or str)
+        the name, baseline value and new value of every regressed metric. A
+        network and scale that failed, while it succeeded in the baseline, is
+        a regression named "<network>/<scale>/error", whose new value is the
+        error.
+    """
+    regressions = []
+    for network, scales in results['networks'].items():
+        for scale, res in scales.items():
+            base = baseline['networks'].get(network, {}).get(scale)
+            if base is None or 'error' in base:
+                continue
+            prefix = '{}/{}/'.format(network, scale)
+
+            # failing is the worst of regressions
+            if 'error' in res:
+                regressions.append((prefix + 'error',
+                                    base['steps_per_second'], res['error']))
+                continue
+
+            # fewer steps per second is slower
+            if res['steps_per_second'] * (1 + tolerance) < \
+                    base['steps_per_second']:
+                regressions.append((prefix + 'steps_per_second',
+                                    base['steps_per_second'],
+                                    res['steps_per_second']))
+
+            for group in ['phases_ms', 'functions_us']:
+                for key, value in res[group].items():
+                    base_value = base[group].get(key)
+                    if base_value is not None and \
+                            value > base_value * (1 + tolerance):
+                        regressions.append(
+                            (prefix + group + '/' + key, base_value, value))
+
+    return regressions
+
+
+def run(flags):
+    """Run the benchmark of every requested network and scale."""
+    results = {'metadata': metadata(), 'networks': {}}
+    for network in flags.networks:
+        results['networks'][network] = {}
+        for scale in flags.scales:
+            try:
+                res = benchmark(network, scale, flags.num_steps,
+                                flags.warmup_steps, flags.num_runs)
+            except Exception as e:
+                # e.g. missing network templates; the other networks are
+                # still benchmarked
+                res = {'error': repr(e)}
+            # keys are strings so that the results survive a JSON round trip
+            results['networks'][network][str(scale)] = res
+
+    return results
+
+
+def parse_args(args):
+    """Parse benchmarking arguments from the command line.
+
+    Parameters
+    ----------
+    args : list of str
+        command-line arguments
+
+    Returns
+    -------
+    argparse.Namespace
+        the output parser object
+    """
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description='Benchmark the environment step and hot kernel '
+                    'functions on every network, at increasing numbers of '
+                    'vehicles.')
+
+    parser.add_argument(
+        '--networks', type=str, nargs='+',
+        default=[n for n in NETWORKS if n not in OPTIONAL_NETWORKS],
+        choices=list(NETWORKS.keys()),
+        help='Networks to benchmark. The networks whose templates are not '
+             'part of the repository ({}) are only benchmarked when '
+             'requested.'.format(', '.join(OPTIONAL_NETWORKS)))
+    parser.add_argument(
+        '--scales', type=float, nargs='+', default=[1, 2, 4],
+        help='Factors the number of vehicles of every network is multiplied '
+             'by.')
+    parser.add_argument(
+        '--num_steps', type=int, default=200,
+        help='Number of steps to time the environment over.')
+    parser.add_argument(
+        '--warmup_steps', type=int, default=100,
+        help='Number of steps performed before timing the environment.')
+    parser.add_argument(
+        '--num_runs', type=int, default=100,
+        help='Number of calls to average every kernel function over.')
+    parser.add_argument(
+        '--output', type=str, default=None,
+        help='Path to the JSON file the results are written to.')
+    parser.add_argument(
+        '--compare', type=str, default=None,
+        help='Path to the JSON results of a previous benchmark to check for '
+             'regressions against.')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.1,
+        help='Relative slowdown above which a metric is reported as a '
+             'regression.')
+
+    return parser.parse_known_args(args)[0]
+
+
+def main(args):
+    """Run the benchmark, print a summary and check for regressions."""
+    flags = parse_args(args)
+    results = run(flags)
+
+    if flags.output is not None:
+        with open(flags.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    print('')
+    print('{:>20} {:>8} {:>10} {:>12} {:>10}'.format(
+        'network', 'scale', 'vehicles', 'steps/s', 'step (ms)'))
+    for network, scales in results['networks'].items():
+        for scale, res in scales.items():
+            if 'error' in res:
+                print('{:>20} {:>8} {}'.format(network, scale, res['error']))
+                continue
+            print('{:>20} {:>8} {:>10.1f} {:>12.1f} {:>10.2f}'.format(
+                network, scale, res['num_vehicles'],
+                res['steps_per_second'], res['step_ms']))
+
+    if flags.compare is not None:
+        with open(flags.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, flags.tolerance)
+
+        print('')
+        print('{} regression(s) against {}'.format(
+            len(regressions), flags.compare))
+        for name, base_value, value in regressions:
+            if isinstance(value, str):
+                print('  {}: {}'.format(name, value))
+            else:
+                print('  {}: {:.3f} -> {:.3f}'.format(
+                    name, base_value, value))
+
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
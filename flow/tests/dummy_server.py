@@ -96,6 +96,100 @@ def retrieve_message(conn, out_format):
     return unpacked_data
 
 
+def recv_exactly(conn, size):
+    """Receive exactly `size` bytes from the client.
+
+    Parameters
+    ----------
+    conn : socket.socket
+        socket for server connection
+    size : int
+        number of bytes to receive
+
+    Returns
+    -------
+    bytes
+        received message
+    """
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise socket.error('Connection closed by the client.')
+        data += chunk
+    return data
+
+
+def retrieve_packed_message(conn):
+    """Retrieve a binary message preceded by its length from the client.
+
+    Parameters
+    ----------
+    conn : socket.socket
+        socket for server connection
+
+    Returns
+    -------
+    bytes
+        received message
+    """
+    size, = struct.unpack('<I', recv_exactly(conn, struct.calcsize('<I')))
+    return recv_exactly(conn, size)
+
+
+def send_packed_message(conn, data):
+    """Send a binary message preceded by its length to the client.
+
+    Parameters
+    ----------
+    conn : socket.socket
+        socket for server connection
+    data : bytes
+        message to be sent
+    """
+    conn.sendall(struct.pack('<I', len(data)) + data)
+
+
+def serve_frames(conn, data):
+    """Reply to framed commands in a single message.
+
+    Set commands are answered with a status of 0, VEH_GET_LEADER with the
+    next vehicle id, and any other command with -1001.
+
+    Parameters
+    ----------
+    conn : socket.socket
+        socket for server connection
+    data : bytes
+        data received from the client, starting with a frame header
+    """
+    replies = []
+    while len(data) > 0:
+        if len(data) < ac.FRAME_HEADER.size:
+            data += recv_exactly(conn, ac.FRAME_HEADER.size - len(data))
+        _, command, request_id, size = ac.FRAME_HEADER.unpack(
+            data[:ac.FRAME_HEADER.size])
+        if len(data) < ac.FRAME_HEADER.size + size:
+            data += recv_exactly(conn, ac.FRAME_HEADER.size + size - len(data))
+        payload = data[ac.FRAME_HEADER.size:ac.FRAME_HEADER.size + size]
+        data = data[ac.FRAME_HEADER.size + size:]
+
+        if command in (ac.VEH_SET_SPEED, ac.VEH_SET_LANE, ac.VEH_SET_ROUTE,
+                       ac.VEH_SET_COLOR):
+            reply = struct.pack('i', 0)
+        elif command == ac.VEH_GET_LEADER:
+            veh_id, = struct.unpack('i', payload)
+            reply = struct.pack('i', veh_id + 1)
+        else:
+            reply = struct.pack('i', -1001)
+
+        replies.append(ac.FRAME_HEADER.pack(
+            ac.FRAMED_COMMAND, command, request_id, len(reply)))
+        replies.append(reply)
+
+    conn.sendall(b''.join(replies))
+
+
 def threaded_client(conn):
     """Create a dummy threaded process.
 
@@ -119,6 +213,10 @@ def threaded_client(conn):
             if data == '':
                 continue
 
+            if data[:1] == struct.pack('B', ac.FRAMED_COMMAND):
+                serve_frames(conn, data)
+                continue
+
             # convert to integer
             data = int(data)
 
@@ -170,6 +268,29 @@ def threaded_client(conn):
                                        'i i',
                              values=output)
 
+            elif data == ac.VEH_GET_TRACKING_BULK:
+                send_message(conn, in_format='i', values=(0,))
+                payload = retrieve_packed_message(conn)
+                bitmap_len, = struct.unpack('<i', payload[:4])
+                info_bitmap = payload[4:4 + bitmap_len].decode()
+                num_veh = (len(payload) - 4 - bitmap_len) // 4
+                veh_ids = struct.unpack(
+                    '<%di' % num_veh, payload[4 + bitmap_len:])
+                values = (4, 5, 6, 7, 8, 9, 10, 11, 12, 14, 17, 18, 19, 20, 21,
+                          22, 23, 24, 25, 26, 27)
+                in_format = '<'
+                output = []
+                for i in range(len(info_bitmap)):
+                    if info_bitmap[i] == '1':
+                        in_format += 'f' if i <= 12 else 'i'
+                        output.append(values[i])
+                packer = struct.Struct(in_format + 'ii')
+                # the leader of each vehicle is the next vehicle id, and the
+                # next section is always 28
+                send_packed_message(conn, b''.join(
+                    packer.pack(*(output + [veh_id + 1, 28]))
+                    for veh_id in veh_ids))
+
             elif data == ac.TL_GET_IDS:
                 send_message(conn, in_format='i', values=(0,))
                 data = None
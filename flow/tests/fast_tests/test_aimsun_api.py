@@ -15,9 +15,11 @@ class TestConstants(unittest.TestCase):
 
     def test_none_equal(self):
         """Verify that no two constants share the same value."""
-        # get the names of all variables in the constants file
+        # get the names of all command constants in the constants file (the
+        # frame header and the modules it is built from are left out)
         var = [item for item in dir(flow.utils.aimsun.constants)
-               if not item.startswith("__")]
+               if not item.startswith("__") and isinstance(
+                   getattr(flow.utils.aimsun.constants, item), int)]
 
         # get the variable values from the names
         variables = []
@@ -157,6 +159,36 @@ class TestDummyAPI(unittest.TestCase):
         self.assertEqual(tracking_inf.idSectionTo, 26)
         self.assertEqual(tracking_inf.idLaneTo, 27)
 
+        # test the bulk tracking info method
+        bulk_inf = self.kernel_api.get_vehicles_tracking_info(
+            veh_ids=[1, 2, 3], info_bitmap='1'*13 + '0'*7 + '1')
+        self.assertEqual(len(bulk_inf), 3)
+        for veh_id, (tracking_inf, leader, next_section) in zip([1, 2, 3],
+                                                                bulk_inf):
+            self.assertEqual(tracking_inf.CurrentPos, 4)
+            self.assertEqual(tracking_inf.stopped, 19)
+            self.assertIsNone(tracking_inf.idSection)
+            self.assertEqual(tracking_inf.idLaneTo, 27)
+            self.assertEqual(leader, veh_id + 1)
+            self.assertEqual(next_section, 28)
+        self.assertListEqual(
+            self.kernel_api.get_vehicles_tracking_info([], '1'*21), [])
+
+        # test pipelined commands, interleaved with the older framing
+        self.assertListEqual(
+            self.kernel_api.apply_lane_changes([1, 2, 3], [1, -1, 1]),
+            [0, 0, 0])
+        self.assertListEqual(
+            self.kernel_api.set_routes([1, 2], [[3, 4], [5]]), [0, 0])
+        self.assertListEqual(
+            self.kernel_api.send_commands([
+                (flow.utils.aimsun.constants.VEH_GET_LEADER, 'i', (v,), 'i')
+                for v in range(100)]),
+            [(v + 1,) for v in range(100)])
+        self.assertListEqual(self.kernel_api.send_commands([]), [])
+        static_info = self.kernel_api.get_vehicle_static_info(veh_id=1)
+        self.assertEqual(static_info.report, 1)
+
         # test the get traffic light IDs method when the list is not empty
         tl_ids = self.kernel_api.get_traffic_light_ids()
         self.assertListEqual(tl_ids, [1, 2, 3, 4, 5])
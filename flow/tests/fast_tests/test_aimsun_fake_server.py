@@ -0,0 +1,67 @@
+import socket
+import unittest
+
+import numpy as np
+
+from flow.core.kernel.vehicle.aimsun import AimsunKernelVehicle
+from flow.core.params import AimsunParams
+from flow.core.params import VehicleParams
+from flow.utils.aimsun.api import FlowAimsunAPI
+from flow.utils.aimsun.fake_server import FakeAimsunServer
+
+
+class TestFakeAimsunServer(unittest.TestCase):
+    """Tests the Aimsun vehicle kernel against the local stand-in for Aimsun
+    in flow/utils/aimsun/fake_server.py."""
+
+    def setUp(self):
+        self.server = FakeAimsunServer(num_vehicles=20, num_lanes=2)
+        self.server.start()
+        self.kernel_api = FlowAimsunAPI(port=self.server.port)
+
+        self.vehicle = AimsunKernelVehicle(None, AimsunParams(sim_step=0.5))
+        self.vehicle.initialize(VehicleParams())
+        self.vehicle.pass_api(self.kernel_api)
+        self.vehicle.update(reset=True)
+
+    def tearDown(self):
+        self.kernel_api.stop_simulation()
+        self.server.stop()
+
+    def test_update(self):
+        ids = self.vehicle.get_ids()
+        self.assertEqual(len(ids), 20)
+
+        # vehicles are evenly spaced in each lane
+        np.testing.assert_array_almost_equal(
+            self.vehicle.get_headway(ids), [15] * 20)
+        self.assertListEqual(sorted(self.vehicle.get_lane(ids)),
+                             [1] * 10 + [2] * 10)
+
+        # the leader of each vehicle is the next vehicle in its lane
+        for veh_id in ids:
+            leader = self.vehicle.get_leader(veh_id)
+            self.assertEqual(self.vehicle.get_lane(leader),
+                             self.vehicle.get_lane(veh_id))
+
+        # vehicles follow the speeds set by the kernel
+        self.vehicle.apply_acceleration(ids, [0.5] * 10 + [None] * 10)
+        self.kernel_api.simulation_step()
+        self.vehicle.update(reset=False)
+        np.testing.assert_array_almost_equal(
+            self.vehicle.get_speed(ids), [0.25] * 10 + [0.5] * 10)
+
+        # the cost of an update does not depend on the number of vehicles
+        round_trips = self.server.round_trips
+        self.kernel_api.simulation_step()
+        self.vehicle.update(reset=False)
+        self.assertLessEqual(self.server.round_trips - round_trips, 10)
+
+    def test_create_client(self):
+        # the commands sent by the client are not delayed by Nagle's algorithm
+        self.assertTrue(self.kernel_api.s.getsockopt(
+            socket.IPPROTO_TCP, socket.TCP_NODELAY))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -136,6 +136,72 @@ class TestEmissionPath(unittest.TestCase):
         self.assertIsNone(self.env.sim_params.emission_path)
 
 
+class TestRecordReplay(unittest.TestCase):
+    """
+    Tests that a simulation recorded with the `record_path` simulation
+    parameter is replayed identically, without a sumo instance, when the trace
+    is passed as the `replay_path` parameter.
+    """
+
+    def setUp(self):
+        self.record_path = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'test.trace')
+
+        vehicles = VehicleParams()
+        vehicles.add(
+            veh_id="idm",
+            acceleration_controller=(IDMController, {}),
+            routing_controller=(ContinuousRouter, {}),
+            num_vehicles=10)
+        self.vehicles = vehicles
+
+    def tearDown(self):
+        os.remove(self.record_path)
+
+    def run_env(self, sim_params):
+        env, _, _ = ring_road_exp_setup(
+            sim_params=sim_params, vehicles=self.vehicles)
+
+        states = []
+        for _ in range(2):
+            env.reset()
+            for _ in range(20):
+                env.step(None)
+                states.append((
+                    env.get_state(),
+                    env.k.vehicle.get_position(env.k.vehicle.get_ids()),
+                    env.k.vehicle.get_speed(env.k.vehicle.get_ids()),
+                    env.k.vehicle.get_headway(env.k.vehicle.get_ids())))
+        env.terminate()
+
+        return env, states
+
+    def test_record_replay(self):
+        _, recorded = self.run_env(
+            SumoParams(sim_step=0.1, record_path=self.record_path))
+        env, replayed = self.run_env(
+            SumoParams(sim_step=0.1, replay_path=self.record_path))
+
+        # no sumo instance was started during the replay
+        self.assertIsNone(env.k.simulation.sumo_proc)
+
+        self.assertEqual(len(recorded), len(replayed))
+        for rec, rep in zip(recorded, replayed):
+            for rec_val, rep_val in zip(rec, rep):
+                np.testing.assert_array_almost_equal(rec_val, rep_val)
+
+    def test_diverging_replay(self):
+        self.run_env(SumoParams(sim_step=0.1, record_path=self.record_path))
+
+        # replaying more steps than were recorded raises an error
+        env, _, _ = ring_road_exp_setup(
+            sim_params=SumoParams(sim_step=0.1, replay_path=self.record_path),
+            vehicles=self.vehicles)
+        with self.assertRaises(FatalFlowError):
+            for _ in range(100):
+                env.step(None)
+
+
 class TestApplyingActionsWithSumo(unittest.TestCase):
     """
     Tests the apply_acceleration, apply_lane_change, and choose_routes
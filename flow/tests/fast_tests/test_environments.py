@@ -21,6 +21,8 @@ from flow.envs.multiagent import MultiAgentHighwayPOEnv
 from flow.envs.multiagent import MultiAgentAccelPOEnv
 from flow.envs.multiagent import MultiAgentWaveAttenuationPOEnv
 from flow.envs.multiagent import MultiAgentMergePOEnv
+from flow.envs.multiagent.i210 import I210MultiEnv, MAX_LANES
+from flow.core.rewards import average_velocity
 
 os.environ["TEST_FLAG"] = "True"
 
@@ -306,6 +308,41 @@ class TestAccelEnv(unittest.TestCase):
             all(positions[i] <= positions[i + 1]
                 for i in range(len(positions) - 1)))
 
+    def test_sorting_cache(self):
+        """
+        Tests that the sorted ids are only recomputed after the kernel is
+        updated or the absolute positions are modified.
+        """
+        env_params = self.env_params
+        env_params.additional_params['sort_vehicles'] = True
+        self.network.initial_config.shuffle = True
+
+        env = AccelEnv(
+            sim_params=self.sim_params,
+            network=self.network,
+            env_params=env_params
+        )
+
+        env.reset()
+
+        # the sorting is reused within a step
+        sorted_ids = env.sorted_ids
+        self.assertIs(env.sorted_ids, sorted_ids)
+
+        # the sorting is recomputed after the kernel is updated
+        env.step(rl_actions=None)
+        self.assertIsNot(env.sorted_ids, sorted_ids)
+        sorted_ids = env.sorted_ids
+        positions = [env.absolute_position[veh_id] for veh_id in sorted_ids]
+        self.assertTrue(
+            all(positions[i] <= positions[i + 1]
+                for i in range(len(positions) - 1)))
+        self.assertCountEqual(sorted_ids, env.k.vehicle.get_ids())
+
+        # the sorting is recomputed if the absolute positions are modified
+        env.additional_command()
+        self.assertIsNot(env.sorted_ids, sorted_ids)
+
     def test_no_sorting(self):
         # setup a environment with the "sort_vehicles" attribute set to False,
         # and shuffling so that the vehicles are not sorted by their ids
@@ -946,6 +983,79 @@ class TestBottleneckDesiredVelocityEnv(unittest.TestCase):
         self.assertAlmostEqual(
             env.k.vehicle.get_inflow_rate(250)/expected_inflow, 1, 1)
 
+    def test_get_state(self):
+        """Tests that the lane-segment statistics match the vehicle data."""
+        sim_params = SumoParams(sim_step=0.5)
+
+        vehicles = VehicleParams()
+        vehicles.add(veh_id="human", num_vehicles=5)
+        vehicles.add(veh_id="followerstopper",
+                     acceleration_controller=(RLController, {}),
+                     num_vehicles=3)
+
+        controlled_segments = [("1", 1, False), ("2", 2, True), ("3", 2, True),
+                               ("4", 2, True), ("5", 1, False)]
+        num_observed_segments = [("1", 1), ("2", 3), ("3", 3), ("4", 3),
+                                 ("5", 1)]
+        env_params = EnvParams(
+            additional_params={
+                "target_velocity": 40,
+                "disable_tb": True,
+                "disable_ramp_metering": True,
+                "controlled_segments": controlled_segments,
+                "symmetric": False,
+                "observed_segments": num_observed_segments,
+                "reset_inflow": False,
+                "lane_change_duration": 5,
+                "max_accel": 3,
+                "max_decel": 3,
+                "inflow_range": [1000, 2000]
+            }
+        )
+
+        inflow = InFlows()
+        inflow.add(veh_type="human",
+                   edge="1",
+                   vehs_per_hour=3000,
+                   departLane="random",
+                   departSpeed=10)
+
+        net_params = NetParams(
+            inflows=inflow,
+            additional_params={"scaling": 1, "speed_limit": 23})
+
+        network = BottleneckNetwork(
+            name="bottleneck",
+            vehicles=vehicles,
+            net_params=net_params)
+
+        env = BottleneckDesiredVelocityEnv(env_params, sim_params, network)
+        env.reset()
+        for _ in range(50):
+            env.step(rl_actions=None)
+
+        obs = env.get_state()
+        num_cells = (obs.shape[0] - 1) // 4
+        self.assertEqual(obs.shape[0], env.observation_space.shape[0])
+
+        # check the number of vehicles and rl vehicles in all lane-segments
+        veh_ids = env.k.vehicle.get_ids_by_edge(["1", "2", "3", "4", "5"])
+        rl_ids = [veh_id for veh_id in veh_ids
+                  if veh_id in env.k.vehicle.get_rl_ids()]
+        num_human = obs[:num_cells] * 20
+        num_rl = obs[num_cells:2 * num_cells] * 20
+        self.assertAlmostEqual(sum(num_human), len(veh_ids) - len(rl_ids))
+        self.assertAlmostEqual(sum(num_rl), len(rl_ids))
+
+        # check the total speed of the human-driven vehicles
+        mean_speed = obs[2 * num_cells:3 * num_cells] * 50
+        human_ids = [veh_id for veh_id in veh_ids if veh_id not in rl_ids]
+        self.assertAlmostEqual(
+            np.dot(mean_speed, num_human),
+            sum(env.k.vehicle.get_speed(human_ids)))
+
+        env.terminate()
+
 
 class TestMultiAgentAccelPOEnv(unittest.TestCase):
     """Tests the MultiAgentAccelPOEnv environment in
@@ -1326,6 +1436,210 @@ class TestMultiAgentHighwayPOEnv(unittest.TestCase):
         )
 
 
+class _I210StubVehicleKernel(object):
+    """Vehicle kernel returning random, fixed values for the I210 tests.
+
+    As in the traci kernel, the getters accept a single id or a list of ids,
+    and the speed of a missing vehicle is -1001.
+    """
+
+    def __init__(self, num_rl, num_human, seed=0):
+        rng = random.Random(seed)
+        self.rl_ids = ['rl_%d' % i for i in range(num_rl)]
+        self.ids = ['human_%d' % i for i in range(num_human)] + self.rl_ids
+        self.speed = {veh_id: rng.uniform(0, 30) for veh_id in self.ids}
+        self.speed['rl_0'] = 0.  # no headway penalty at a standstill
+        self.lane = {veh_id: rng.randrange(MAX_LANES) for veh_id in self.ids}
+        self.leader = {veh_id: rng.choice(self.ids + ['']) for veh_id in
+                       self.ids}
+        self.headway = {veh_id: rng.uniform(0, 20) for veh_id in self.ids}
+
+        # the lanes of each vehicle, some of them without leader or follower
+        self.lane_data = {}
+        for veh_id in self.ids:
+            num_lanes = rng.randint(1, MAX_LANES)
+            self.lane_data[veh_id] = {
+                'leaders': [rng.choice(self.ids + ['']) for _ in
+                            range(num_lanes)],
+                'followers': [rng.choice(self.ids + ['']) for _ in
+                              range(num_lanes)],
+                'headways': [rng.uniform(0, 1000) for _ in range(num_lanes)],
+                'tailways': [rng.uniform(0, 1000) for _ in range(num_lanes)],
+            }
+
+    def _get(self, data, veh_id, error):
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self._get(data, vehID, error) for vehID in veh_id]
+        return data.get(veh_id, error)
+
+    def get_ids(self):
+        return list(self.ids)
+
+    def get_rl_ids(self):
+        return list(self.rl_ids)
+
+    def get_speed(self, veh_id, error=-1001):
+        return self._get(self.speed, veh_id, error)
+
+    def get_lane(self, veh_id, error=-1001):
+        return self._get(self.lane, veh_id, error)
+
+    def get_leader(self, veh_id, error=""):
+        return self._get(self.leader, veh_id, error)
+
+    def get_headway(self, veh_id, error=-1001):
+        return self._get(self.headway, veh_id, error)
+
+    def _get_lane_data(self, key, veh_id):
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self._get_lane_data(key, vehID) for vehID in veh_id]
+        return self.lane_data[veh_id][key]
+
+    def get_lane_leaders(self, veh_id):
+        return self._get_lane_data('leaders', veh_id)
+
+    def get_lane_followers(self, veh_id):
+        return self._get_lane_data('followers', veh_id)
+
+    def get_lane_headways(self, veh_id):
+        return self._get_lane_data('headways', veh_id)
+
+    def get_lane_tailways(self, veh_id):
+        return self._get_lane_data('tailways', veh_id)
+
+    def get_lane_leaders_speed(self, veh_id):
+        return [0 if l_id == '' else self.get_speed(l_id) for l_id in
+                self.get_lane_leaders(veh_id)]
+
+    def get_lane_followers_speed(self, veh_id):
+        return [0 if f_id == '' else self.get_speed(f_id) for f_id in
+                self.get_lane_followers(veh_id)]
+
+
+class _I210StubKernel(object):
+    """Kernel containing only a stub vehicle kernel."""
+
+    def __init__(self, vehicle):
+        self.vehicle = vehicle
+
+
+def _i210_reference_state(env):
+    """Compute the observations of I210MultiEnv one vehicle at a time."""
+    veh = env.k.vehicle
+    veh_info = {}
+    for rl_id in veh.get_rl_ids():
+        if env.lead_obs:
+            lead_speed = veh.get_speed(veh.get_leader(rl_id))
+            if lead_speed == -1001:
+                lead_speed = 0
+            veh_info[rl_id] = np.array([veh.get_speed(rl_id) / 50.0,
+                                        veh.get_headway(rl_id) / 1000.0,
+                                        lead_speed / 50.0])
+        else:
+            rl_ids = veh.get_rl_ids()
+            diff = MAX_LANES - len(veh.get_lane_leaders(rl_id))
+            lanes = [
+                np.asarray(veh.get_lane_headways(rl_id) + diff * [-1]) / 1000,
+                np.asarray(veh.get_lane_tailways(rl_id) + diff * [-1]) / 1000,
+                np.asarray(veh.get_lane_leaders_speed(rl_id) + diff * [-1])
+                / 100,
+                np.asarray(veh.get_lane_followers_speed(rl_id) + diff * [-1])
+                / 100,
+                [1 if l_id in rl_ids else 0 for l_id in
+                 veh.get_lane_leaders(rl_id)] + diff * [-1],
+                [1 if f_id in rl_ids else 0 for f_id in
+                 veh.get_lane_followers(rl_id)] + diff * [-1],
+            ]
+            veh_info[rl_id] = np.concatenate(
+                lanes + [[veh.get_speed(rl_id) / 100.0,
+                          (veh.get_lane(rl_id) + 1) / 10.0]])
+    return veh_info
+
+
+def _i210_reference_reward(env, rl_actions, fail):
+    """Compute the rewards of I210MultiEnv one vehicle at a time."""
+    if rl_actions is None:
+        return {}
+
+    veh = env.k.vehicle
+    rewards = {}
+    for rl_id in veh.get_rl_ids():
+        if env.env_params.evaluate:
+            reward = veh.get_speed(rl_id)
+        elif fail:
+            reward = 0
+        else:
+            cost1 = average_velocity(env, fail=fail)
+            cost2 = 0
+            t_min = 1
+            lead_id = veh.get_leader(rl_id)
+            if lead_id not in ["", None] and veh.get_speed(rl_id) > 0:
+                t_headway = max(
+                    veh.get_headway(rl_id) / veh.get_speed(rl_id), 0)
+                cost2 += min((t_headway - t_min) / t_min, 0)
+            reward = max(1.00 * cost1 + 0.10 * cost2, 0)
+        rewards[rl_id] = reward
+    return rewards
+
+
+class TestI210MultiEnv(unittest.TestCase):
+    """Compares I210MultiEnv with a per-vehicle reference implementation.
+
+    The environment is not started: the vehicle kernel is a stub returning
+    random values.
+    """
+
+    def make_env(self, num_rl=5, num_human=20, lead_obs=True,
+                 evaluate=False):
+        env = I210MultiEnv.__new__(I210MultiEnv)
+        env.k = _I210StubKernel(_I210StubVehicleKernel(num_rl, num_human))
+        env.env_params = EnvParams(evaluate=evaluate)
+        env.lead_obs = lead_obs
+        return env
+
+    def assert_states_equal(self, env):
+        state = env.get_state()
+        expected = _i210_reference_state(env)
+        self.assertListEqual(sorted(state), sorted(expected))
+        for rl_id in expected:
+            self.assertEqual(state[rl_id].shape,
+                             env.observation_space.shape)
+            np.testing.assert_array_almost_equal(state[rl_id],
+                                                 expected[rl_id])
+
+    def assert_rewards_equal(self, env, rl_actions, fail=False):
+        reward = env.compute_reward(rl_actions, fail=fail)
+        expected = _i210_reference_reward(env, rl_actions, fail)
+        self.assertListEqual(sorted(reward), sorted(expected))
+        for rl_id in expected:
+            self.assertAlmostEqual(reward[rl_id], expected[rl_id])
+
+    def test_get_state(self):
+        self.assert_states_equal(self.make_env(lead_obs=True))
+        self.assert_states_equal(self.make_env(lead_obs=False))
+
+    def test_compute_reward(self):
+        env = self.make_env()
+        rl_actions = {rl_id: [0] for rl_id in env.k.vehicle.get_rl_ids()}
+
+        # some agents are penalized for their headways
+        rewards = env.compute_reward(rl_actions, fail=False)
+        self.assertGreater(len(set(rewards.values())), 1)
+        self.assert_rewards_equal(env, rl_actions)
+
+        # warmup, failure and evaluation cases
+        self.assertDictEqual(env.compute_reward(None, fail=False), {})
+        self.assert_rewards_equal(env, rl_actions, fail=True)
+        self.assert_rewards_equal(
+            self.make_env(evaluate=True), rl_actions)
+
+    def test_no_rl_vehicles(self):
+        for lead_obs in [True, False]:
+            env = self.make_env(num_rl=0, lead_obs=lead_obs)
+            self.assertDictEqual(env.get_state(), {})
+            self.assertDictEqual(env.compute_reward({}, fail=False), {})
+
+
 ###############################################################################
 #                              Utility methods                                #
 ###############################################################################
@@ -0,0 +1,76 @@
+import json
+import subprocess
+import sys
+import unittest
+
+import flow.envs
+import flow.envs.multiagent
+
+# time budget for `import flow.envs` in a fresh interpreter, in seconds
+IMPORT_TIME_BUDGET = 0.25
+
+# heavy dependencies that should not be imported before they are used
+HEAVY_MODULES = ['pyglet', 'matplotlib', 'scipy.optimize', 'ray',
+                 'flow.utils.aimsun.api', 'flow.renderer.pyglet_renderer',
+                 'flow.renderer.numpy_renderer']
+
+
+def imported_modules(statement, modules):
+    """Return the modules imported by a statement in a fresh interpreter."""
+    code = 'import json, sys\n{}\nprint(json.dumps([m for m in {} if m in ' \
+           'sys.modules]))'.format(statement, modules)
+    out = subprocess.check_output(
+        [sys.executable, '-c', code], stderr=subprocess.DEVNULL)
+    return json.loads(out.decode().splitlines()[-1])
+
+
+class TestLazyImports(unittest.TestCase):
+    """Tests the lazy imports of flow/utils/lazy.py."""
+
+    def test_lazy_attributes(self):
+        from flow.envs.ring.accel import AccelEnv
+
+        # the lazy attributes are the classes in their modules, and are listed
+        # by dir() before they are imported
+        self.assertIs(flow.envs.AccelEnv, AccelEnv)
+        self.assertIn('BayBridgeEnv', dir(flow.envs))
+        self.assertIn('MultiEnv', dir(flow.envs.multiagent))
+        self.assertListEqual(
+            sorted(flow.envs.__all__),
+            sorted(name for name in dir(flow.envs)
+                   if name in flow.envs.__all__))
+
+        # unknown attributes still raise an AttributeError
+        self.assertRaises(AttributeError, getattr, flow.envs, 'FakeEnv')
+        self.assertFalse(hasattr(flow.envs, 'FakeEnv'))
+
+    def test_import_packages(self):
+        # importing the environment packages imports none of the environments
+        self.assertListEqual(
+            imported_modules(
+                'import flow.envs, flow.envs.multiagent, flow.renderer',
+                HEAVY_MODULES + ['gym', 'traci', 'flow.envs.base']),
+            [])
+
+    def test_import_headless_env(self):
+        # a non-rendering sumo environment does not import the renderer, the
+        # aimsun api, or the dependencies of the other environments
+        self.assertListEqual(
+            imported_modules('from flow.envs import AccelEnv', HEAVY_MODULES),
+            [])
+
+    def test_import_time_budget(self):
+        out = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import flow.envs'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+
+        # the cumulative import time (in us) of the flow.envs package
+        import_time = [int(line.split('|')[1])
+                       for line in out.stderr.decode().splitlines()
+                       if line.split('|')[-1].strip() == 'flow.envs']
+        self.assertEqual(len(import_time), 1)
+        self.assertLess(import_time[0] / 1e6, IMPORT_TIME_BUDGET)
+
+
+if __name__ == '__main__':
+    unittest.main()
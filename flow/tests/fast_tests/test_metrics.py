@@ -0,0 +1,221 @@
+import unittest
+import os
+
+import numpy as np
+
+from flow.core.experiment import Experiment
+from flow.core.metrics import RunningStats, RollingWindow, QuantileSketch
+from flow.core.metrics import FleetMetrics, SteadyState
+from flow.core.metrics import Mean, Max, Last, Quantiles, Histogram
+from flow.core.metrics import get_reduction
+from flow.core.params import VehicleParams
+from flow.controllers import IDMController, ContinuousRouter
+from tests.setup_scripts import ring_road_exp_setup
+
+os.environ["TEST_FLAG"] = "True"
+
+
+class TestStreamingStatistics(unittest.TestCase):
+    """Tests the streaming statistics in flow/core/metrics.py."""
+
+    def setUp(self):
+        self.values = np.random.RandomState(0).normal(3, 2, 10000)
+
+    def test_running_stats(self):
+        stats = RunningStats()
+        self.assertTrue(np.isnan(stats.variance))
+
+        # batches of any size, and nan values, can be added
+        for batch in np.array_split(self.values, 37):
+            stats.update(batch)
+        stats.update(np.nan)
+
+        self.assertEqual(stats.count, len(self.values))
+        self.assertAlmostEqual(stats.mean, np.mean(self.values))
+        self.assertAlmostEqual(stats.std, np.std(self.values))
+        self.assertEqual(stats.min, np.min(self.values))
+        self.assertEqual(stats.max, np.max(self.values))
+
+    def test_rolling_window(self):
+        window = RollingWindow(5)
+        self.assertTrue(np.isnan(window.mean))
+
+        for value in range(3):
+            window.update(value)
+        self.assertFalse(window.full)
+        np.testing.assert_array_equal(window.values, [0, 1, 2])
+
+        for value in range(3, 7):
+            window.update(value)
+        self.assertTrue(window.full)
+        np.testing.assert_array_equal(window.values, [2, 3, 4, 5, 6])
+        self.assertAlmostEqual(window.mean, 4)
+        self.assertAlmostEqual(window.std, np.std([2, 3, 4, 5, 6]))
+
+    def test_quantile_sketch(self):
+        sketch = QuantileSketch(size=128)
+        self.assertTrue(np.isnan(sketch.quantile(0.5)))
+
+        for batch in np.array_split(self.values, 100):
+            sketch.update(batch)
+
+        # the sketch stays within its size, and approximates the quantiles
+        self.assertEqual(sketch.count, len(self.values))
+        self.assertLessEqual(len(sketch._values), 128)
+        quantiles = [0.05, 0.25, 0.5, 0.75, 0.95]
+        np.testing.assert_allclose(sketch.quantile(quantiles),
+                                   np.quantile(self.values, quantiles),
+                                   atol=0.05)
+
+        # small streams are exact
+        sketch = QuantileSketch()
+        sketch.update([4, 1, 3, 2])
+        np.testing.assert_array_almost_equal(
+            sketch.quantile([0, 0.5, 1]), [1, 2.5, 4])
+
+
+class TestReductions(unittest.TestCase):
+    """Tests the reductions of custom callables in flow/core/metrics.py."""
+
+    def test_reductions(self):
+        values = [1., np.nan, 3., [2., 4.]]
+        expected = {
+            Mean(): 2.5,
+            Max(): 4.,
+            Last(): [2., 4.],
+            Quantiles([0.5]): {'q50': 2.5},
+            Histogram([0, 2, 4]): [1, 3],
+        }
+        for reduction, result in expected.items():
+            # results do not carry over between runs
+            for _ in range(2):
+                reduction.reset()
+                for value in values:
+                    reduction.update(value)
+                if isinstance(result, dict):
+                    self.assertDictEqual(reduction.result(), result)
+                else:
+                    np.testing.assert_array_equal(reduction.result(), result)
+
+    def test_get_reduction(self):
+        self.assertIsInstance(get_reduction('max'), Max)
+        histogram = Histogram([0, 1])
+        self.assertIs(get_reduction(histogram), histogram)
+        self.assertRaises(ValueError, get_reduction, 'histogram')
+
+    def test_custom_callables(self):
+        custom_callables = {
+            "time": lambda env: env.time_counter,
+            "max_time": (lambda env: env.time_counter, "max"),
+            "time_quantiles": (lambda env: env.time_counter,
+                               Quantiles([0, 1])),
+            "time_histogram": (lambda env: env.time_counter,
+                               Histogram([0, 5, 10])),
+        }
+
+        # the callables are called at every step by default
+        info_dict = self.run_experiment(custom_callables)
+        self.assertListEqual(info_dict["time"], [5.5])
+        self.assertListEqual(info_dict["max_time"], [10])
+        self.assertListEqual(info_dict["time_quantiles_q0"], [1])
+        self.assertListEqual(info_dict["time_quantiles_q100"], [10])
+        np.testing.assert_array_equal(info_dict["time_histogram"], [[4, 6]])
+
+        # the callables are called at steps 1, 5 and 9
+        info_dict = self.run_experiment(custom_callables, callables_interval=4)
+        self.assertListEqual(info_dict["time"], [5])
+        self.assertListEqual(info_dict["max_time"], [9])
+        np.testing.assert_array_equal(info_dict["time_histogram"], [[1, 2]])
+
+    @staticmethod
+    def run_experiment(custom_callables, **kwargs):
+        """Run an experiment of 10 steps on a ring road."""
+        env, _, flow_params = ring_road_exp_setup()
+        flow_params['sim'].render = False
+        flow_params['env'].horizon = 10
+
+        exp = Experiment(flow_params, custom_callables)
+        exp.env = env
+        return exp.run(num_runs=1, **kwargs)
+
+
+class TestFleetMetrics(unittest.TestCase):
+    """Tests the online metrics of the Experiment class."""
+
+    def test_fleet_metrics(self):
+        env, _, flow_params = ring_road_exp_setup()
+        flow_params['sim'].render = False
+        flow_params['env'].horizon = 20
+
+        exp = Experiment(flow_params, metrics=[FleetMetrics(window=10)])
+        exp.env = env
+        info_dict = exp.run(num_runs=2)
+
+        # every summary has one value per run
+        for key in ['speed_mean', 'speed_q50', 'headway_std', 'accel_max',
+                    'emergency_brakes', 'rolling_speed_std']:
+            self.assertEqual(len(info_dict[key]), 2)
+
+        # the mean speed of all samples matches the average speed per step,
+        # since the number of vehicles is constant
+        np.testing.assert_array_almost_equal(info_dict['speed_mean'],
+                                             info_dict['velocities'])
+        self.assertTrue(all(np.array(info_dict['headway_min']) > 0))
+
+
+class TestSteadyState(unittest.TestCase):
+    """Tests the early termination of runs in a steady state."""
+
+    def setUp(self):
+        # a congested ring, which settles to a uniform flow
+        vehicles = VehicleParams()
+        vehicles.add("idm",
+                     acceleration_controller=(IDMController, {}),
+                     routing_controller=(ContinuousRouter, {}),
+                     num_vehicles=22)
+        self.env, _, self.flow_params = ring_road_exp_setup(vehicles=vehicles)
+        self.flow_params['sim'].render = False
+        self.flow_params['env'].horizon = 500
+
+    def test_early_termination(self):
+        steady_state = SteadyState(window=50, patience=20)
+        exp = Experiment(self.flow_params, metrics=[steady_state])
+        exp.env = self.env
+        info_dict = exp.run(num_runs=1)
+
+        # the run ends as soon as the steady state is detected, and the
+        # convergence time is the start of the steady period
+        self.assertTrue(steady_state.done)
+        self.assertLess(self.env.time_counter, 500)
+        self.assertEqual(steady_state.steady_steps, 20)
+        self.assertAlmostEqual(info_dict['convergence_time'][0],
+                               (self.env.time_counter - 20) * self.env.sim_step)
+        self.assertLessEqual(steady_state.mean_speed.std, 0.05)
+
+    def test_sims_per_step(self):
+        # several simulation steps are taken per environment step
+        self.env.env_params.sims_per_step = 2
+        steady_state = SteadyState(window=50, patience=20)
+        exp = Experiment(self.flow_params, metrics=[steady_state])
+        exp.env = self.env
+        info_dict = exp.run(num_runs=1)
+
+        self.assertTrue(steady_state.done)
+        self.assertEqual(self.env.time_counter, 2 * steady_state.steps)
+        self.assertAlmostEqual(info_dict['convergence_time'][0],
+                               (self.env.time_counter - 2 * 20) * self.env.sim_step)
+
+    def test_no_convergence(self):
+        # the patience is longer than the horizon
+        steady_state = SteadyState(window=50, patience=1000)
+        exp = Experiment(self.flow_params, metrics=[steady_state])
+        exp.env = self.env
+        info_dict = exp.run(num_runs=1)
+
+        self.assertFalse(steady_state.done)
+        self.assertEqual(self.env.time_counter, 500)
+        self.assertTrue(np.isnan(info_dict['convergence_time'][0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+from flow.renderer.numpy_renderer import NumpyRenderer as Renderer
+from flow.renderer.image_writer import AsyncImageWriter
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class TestNumpyRenderer(unittest.TestCase):
+    """Tests numpy_renderer"""
+
+    def setUp(self):
+        # a ring of radius 40 m centered on (50, 50)
+        self.radius = 40
+        theta = np.linspace(0, 2 * np.pi, 65)
+        self.network = [[coord for t in theta for coord in
+                         (self.radius * np.cos(t) + 50,
+                          self.radius * np.sin(t) + 50)]]
+
+        # vehicles evenly spaced on the ring, the first one being an RL vehicle
+        theta = np.linspace(0, 2 * np.pi, 22, endpoint=False)
+        orientations = [[self.radius * np.cos(t) + 50,
+                         self.radius * np.sin(t) + 50,
+                         -np.degrees(t) % 360] for t in theta]
+        self.human_orientations = orientations[1:]
+        self.machine_orientations = orientations[:1]
+        self.human_dynamics = list(np.linspace(0, 1, 21))
+        self.machine_dynamics = [0.5]
+        self.human_logs = [[0, 100, 'human_%d' % i] for i in range(21)]
+        self.machine_logs = [[0, 100, 'rl_0']]
+
+        # Default renderer parameters
+        self.mode = "drgb"
+        self.sight_radius = 25
+        self.pxpm = 3
+        self.show_radius = True
+        self.alpha = 0.9
+
+    def make_renderer(self, **kwargs):
+        params = dict(mode=self.mode,
+                      sight_radius=self.sight_radius,
+                      pxpm=self.pxpm,
+                      show_radius=self.show_radius,
+                      alpha=self.alpha)
+        params.update(kwargs)
+        return Renderer(self.network, **params)
+
+    def render(self, renderer):
+        return renderer.render(
+            self.human_orientations, self.machine_orientations,
+            self.human_dynamics, self.machine_dynamics,
+            self.human_logs, self.machine_logs)
+
+    def test_init(self):
+        renderer = self.make_renderer()
+
+        # the frame covers the network and the sight radius around it
+        self.assertEqual(renderer.width, (80 + 2 * 25) * 3)
+        self.assertEqual(renderer.height, (80 + 2 * 25) * 3)
+        self.assertEqual(renderer.frame.shape, (390, 390, 3))
+
+        # the static layer contains the background and the lanes
+        colors = np.unique(renderer.network.reshape(-1, 3), axis=0)
+        self.assertEqual(len(colors), 2)
+        np.testing.assert_array_equal(renderer.network[0, 0], [32, 32, 32])
+
+        self.assertRaises(ValueError, Renderer, self.network, mode="rgbd")
+
+    def test_render(self):
+        for mode, shape in [('drgb', (390, 390, 3)), ('rgb', (390, 390, 3)),
+                            ('dgray', (390, 390)), ('gray', (390, 390))]:
+            renderer = self.make_renderer(mode=mode)
+            frame = self.render(renderer)
+            self.assertEqual(frame.shape, shape)
+            self.assertEqual(frame.dtype, np.uint8)
+            self.assertEqual(renderer.time, 1)
+
+        # the static layer is not modified by the vehicles
+        renderer = self.make_renderer(mode='rgb', alpha=1.0, show_radius=False)
+        network = renderer.network.copy()
+        frame = self.render(renderer)
+        np.testing.assert_array_equal(renderer.network, network)
+
+        # the vehicles are drawn in their colors ([b, g, r])
+        colors = np.unique(frame.reshape(-1, 3), axis=0).tolist()
+        self.assertIn([0, 225, 0], colors)
+        self.assertIn([200, 150, 0], colors)
+
+        # the tip of each triangle lies on the position of its vehicle
+        x, y, _ = self.human_orientations[5]
+        col = int((x - renderer.x_shift) * renderer.x_scale * renderer.pxpm)
+        row = renderer.height - 1 - int(
+            (y - renderer.y_shift) * renderer.y_scale * renderer.pxpm)
+        window = frame[row - 2:row + 3, col - 2:col + 3].reshape(-1, 3)
+        self.assertIn([0, 225, 0], window.tolist())
+
+    def test_get_sight(self):
+        renderer = self.make_renderer()
+        self.render(renderer)
+        sight = renderer.get_sight(self.machine_orientations[0], 'rl_0')
+
+        # the sight is a square of twice the sight radius, masked outside of
+        # the sight radius
+        size = 2 * self.sight_radius * self.pxpm
+        self.assertEqual(sight.shape, (size, size, 3))
+        np.testing.assert_array_equal(sight[0, 0], [0, 0, 0])
+        np.testing.assert_array_equal(
+            sight[size // 2, size // 2 + 40], [32, 32, 32])
+
+        # without rotation, the sight is the (masked) crop of the frame
+        x, y, _ = self.machine_orientations[0]
+        sight = renderer.get_sight([x, y, 0], 'rl_0')
+        col = int((x - renderer.x_shift) * renderer.x_scale * renderer.pxpm)
+        row = int(renderer.height -
+                  (y - renderer.y_shift) * renderer.y_scale * renderer.pxpm)
+        crop = renderer.frame[row - size // 2:row + size // 2,
+                              col - size // 2:col + size // 2]
+        mask = sight.any(axis=-1)
+        np.testing.assert_array_equal(sight[mask], crop[mask])
+
+        # a rotation of 180 degrees flips the sight
+        flipped = renderer.get_sight([x, y, 180], 'rl_0')
+        np.testing.assert_array_equal(flipped[1:, 1:], sight[:0:-1, :0:-1])
+
+        # gray sights only have one channel
+        renderer = self.make_renderer(mode='gray')
+        self.render(renderer)
+        sight = renderer.get_sight(self.machine_orientations[0], 'rl_0')
+        self.assertEqual(sight.shape, (size, size))
+
+    def test_get_sights(self):
+        renderer = self.make_renderer()
+        self.render(renderer)
+        orientations = self.human_orientations[:4]
+        veh_ids = ['human_%d' % i for i in range(4)]
+
+        # the batched sights match the sights of the individual vehicles
+        sights = renderer.get_sights(orientations, veh_ids)
+        self.assertEqual(sights.shape, (4, 150, 150, 3))
+        for orientation, veh_id, sight in zip(orientations, veh_ids, sights):
+            np.testing.assert_array_equal(
+                renderer.get_sight(orientation, veh_id), sight)
+
+        # no vehicles have no sights
+        self.assertEqual(renderer.get_sights([], []).shape, (0, 150, 150, 3))
+
+    def test_save_render(self):
+        path = tempfile.mkdtemp()
+        try:
+            renderer = self.make_renderer(save_render=True, path=path)
+            for _ in range(2):
+                self.render(renderer)
+            save_path = renderer.close()
+
+            # the initial network and the data of every frame are saved
+            data = np.load(save_path, allow_pickle=True)
+            self.assertEqual(len(data), 3)
+            self.assertListEqual(list(data[2][5]), self.machine_logs)
+            self.assertTrue(os.path.exists(
+                os.path.join(renderer.path, 'frame_000002.png')))
+        finally:
+            shutil.rmtree(path)
+
+
+class TestAsyncImageWriter(unittest.TestCase):
+    """Tests image_writer"""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_write(self):
+        writer = AsyncImageWriter(max_pending=2)
+        images = np.random.RandomState(0).randint(
+            0, 255, (5, 10, 20, 3)).astype(np.uint8)
+        for i, image in enumerate(images):
+            writer.write(os.path.join(self.path, '%d.png' % i), image)
+
+        # all images are written once the writer is closed
+        writer.close()
+        import cv2
+        for i, image in enumerate(images):
+            np.testing.assert_array_equal(
+                cv2.imread(os.path.join(self.path, '%d.png' % i)), image)
+
+    def test_write_error(self):
+        writer = AsyncImageWriter()
+        writer.write(os.path.join(self.path, 'missing', '0.png'),
+                     np.zeros((10, 10, 3), np.uint8))
+
+        # the errors of the background thread are raised in the caller
+        self.assertRaises(IOError, writer.close)
+
+
+if __name__ == '__main__':
+    unittest.main()
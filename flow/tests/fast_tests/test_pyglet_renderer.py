@@ -167,6 +167,35 @@ class TestPygletRenderer(unittest.TestCase):
         sight = self.renderer.get_sight(orientation, id)
         self.assertEqual(sight.shape, (150, 150, 3))
 
+    def test_get_sights(self):
+        # Initialize a pyglet renderer
+        self.renderer = Renderer(
+            self.network,
+            mode=self.mode,
+            save_render=self.save_render,
+            sight_radius=self.sight_radius,
+            pxpm=self.pxpm,
+            show_radius=self.show_radius,
+            alpha=self.alpha
+        )
+
+        _human_orientations, _machine_orientations, \
+            _human_dynamics, _machine_dynamics, \
+            _human_logs, _machine_logs = self.data[101]
+
+        self.renderer.render(
+            _human_orientations, _machine_orientations,
+            _human_dynamics, _machine_dynamics,
+            _human_logs, _machine_logs
+        )
+        orientations = self.data[101][0][:3]
+        ids = [log[-1] for log in self.data[101][4][:3]]
+        sights = self.renderer.get_sights(orientations, ids)
+        self.assertEqual(sights.shape, (3, 150, 150, 3))
+        for orientation, id, sight in zip(orientations, ids, sights):
+            np.testing.assert_array_equal(
+                self.renderer.get_sight(orientation, id), sight)
+
     def test_save_renderer(self):
         self.save_render = True
         # Initialize a pyglet renderer
@@ -8,6 +8,16 @@ from flow.core.rewards import average_velocity, min_delay
 from flow.core.rewards import desired_velocity, boolean_action_penalty
 from flow.core.rewards import penalize_near_standstill, penalize_standstill
 from flow.core.rewards import energy_consumption
+from flow.core.rewards import miles_per_megajoule, miles_per_gallon
+from flow.core.rewards import min_delay_unscaled, fleet_speeds
+from flow.core.rewards import average_velocity_array, min_delay_array
+from flow.core.rewards import desired_velocity_array
+from flow.core.rewards import penalize_near_standstill_array
+from flow.core.rewards import penalize_standstill_array
+from flow.core.rewards import energy_consumption_array
+from flow.core.rewards import miles_per_megajoule_array
+from flow.core.rewards import miles_per_gallon_array
+from flow.core.rewards import min_delay_unscaled_array
 
 os.environ["TEST_FLAG"] = "True"
 
@@ -192,5 +202,84 @@ class TestRewards(unittest.TestCase):
         self.assertEqual(boolean_action_penalty(actions, gain=2), 4)
 
 
+class TestArrayRewards(unittest.TestCase):
+    """Tests the array-based rewards against their scalar counterparts."""
+
+    def setUp(self):
+        vehicles = VehicleParams()
+        vehicles.add("test", num_vehicles=10)
+
+        env_params = EnvParams(additional_params={
+            "target_velocity": np.sqrt(10), "max_accel": 1, "max_decel": 1,
+            "sort_vehicles": False})
+
+        self.env, _, _ = ring_road_exp_setup(vehicles=vehicles,
+                                             env_params=env_params)
+
+    def tearDown(self):
+        self.env.terminate()
+        self.env = None
+
+    def compare_rewards(self):
+        """Assert that the scalar and array rewards match."""
+        env = self.env
+        veh_ids = env.k.vehicle.get_ids()
+        speed, prev_speed = fleet_speeds(env)
+        v_top = max(env.k.network.speed_limit(edge)
+                    for edge in env.k.network.get_edge_list())
+        target_vel = env.env_params.additional_params['target_velocity']
+
+        np.testing.assert_array_almost_equal(
+            speed, env.k.vehicle.get_speed(veh_ids))
+        np.testing.assert_array_almost_equal(
+            prev_speed, env.k.vehicle.get_previous_speed(veh_ids))
+
+        self.assertAlmostEqual(desired_velocity_array(speed, target_vel),
+                               desired_velocity(env))
+        self.assertAlmostEqual(
+            desired_velocity_array(speed, target_vel, fail=True),
+            desired_velocity(env, fail=True))
+        self.assertAlmostEqual(average_velocity_array(speed),
+                               average_velocity(env))
+        self.assertAlmostEqual(min_delay_array(speed, v_top, env.sim_step),
+                               min_delay(env))
+        self.assertAlmostEqual(
+            min_delay_unscaled_array(speed, v_top, env.sim_step),
+            min_delay_unscaled(env))
+        self.assertEqual(penalize_standstill_array(speed, gain=2),
+                         penalize_standstill(env, gain=2))
+        self.assertEqual(
+            penalize_near_standstill_array(speed, thresh=0.5, gain=2),
+            penalize_near_standstill(env, thresh=0.5, gain=2))
+        self.assertAlmostEqual(
+            energy_consumption_array(speed, prev_speed, env.sim_step),
+            energy_consumption(env))
+        self.assertAlmostEqual(
+            miles_per_megajoule_array(speed, prev_speed, env.sim_step),
+            miles_per_megajoule(env))
+        self.assertAlmostEqual(
+            miles_per_gallon_array(
+                speed, env.k.vehicle.get_fuel_consumption(veh_ids)),
+            miles_per_gallon(env))
+
+    def test_reset(self):
+        """Test the array rewards with all vehicles at standstill."""
+        self.compare_rewards()
+
+    def test_modified_speeds(self):
+        """Test the array rewards after modifying vehicle speeds."""
+        self.env.k.vehicle.test_set_speed("test_0", 1)
+        self.env.k.vehicle.test_set_speed("test_3", 0.4)
+        self.env.k.vehicle.test_set_speed("test_8", 10)
+        self.compare_rewards()
+
+    def test_after_steps(self):
+        """Test the array rewards once previous speeds are populated."""
+        for _ in range(5):
+            self.env.step(rl_actions=None)
+        self.assertGreater(self.env.k.vehicle.get_previous_speed("test_0"), 0)
+        self.compare_rewards()
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -64,6 +64,22 @@ class TestGetX(unittest.TestCase):
         pos = 4.72
         self.assertAlmostEqual(self.env.k.network.get_x(edge, pos), -1001)
 
+    def test_getx_array(self):
+        # internal links generalized by a single element do not add the
+        # relative position, and unknown edges fall back to get_x
+        edges = ["bottom", ":bottom", "", ":bottom_0", "right", ":top_5"]
+        pos = [4.72, 0.1, 4.72, 3., 10., 1.]
+        np.testing.assert_array_almost_equal(
+            self.env.k.network.get_x_array(edges, pos),
+            [self.env.k.network.get_x(e, p) for e, p in zip(edges, pos)])
+
+        # positions of all vehicles at once, and of missing vehicles
+        veh_ids = self.env.k.vehicle.get_ids() + ["missing"]
+        np.testing.assert_array_almost_equal(
+            self.env.k.vehicle.get_x_by_id(veh_ids),
+            [self.env.k.vehicle.get_x_by_id(veh_id) for veh_id in veh_ids])
+        self.assertEqual(self.env.k.vehicle.get_x_by_id(veh_ids)[-1], 0.)
+
 
 class TestGetEdge(unittest.TestCase):
     """
@@ -3,9 +3,15 @@ import csv
 import os
 import json
 import collections
+import tempfile
+import pickle
+
+import numpy as np
+import ray
 
 from flow.envs import AccelEnv
-from flow.networks import FigureEightNetwork
+from flow.networks import FigureEightNetwork, RingNetwork
+from flow.networks.ring import ADDITIONAL_NET_PARAMS
 from flow.core.params import VehicleParams
 from flow.core.params import TrafficLightParams
 from flow.controllers import IDMController, ContinuousRouter, RLController
@@ -15,11 +21,25 @@ from flow.core.util import emission_to_csv
 from flow.envs import MergePOEnv
 from flow.networks import MergeNetwork
 from flow.utils.registry import make_create_env
-from flow.utils.rllib import FlowParamsEncoder, get_flow_params
+from flow.utils.catalog import write_catalog, read_catalog, load_runs, \
+    params_hash
+from flow.utils.rllib import FlowParamsEncoder, get_flow_params, \
+    compute_actions
+from flow.utils.leaderboard.evaluate import evaluate_policy, \
+    get_compute_action_rllib
+from scripts.benchmark_kernel import compare
 
 os.environ["TEST_FLAG"] = "True"
 
 
+def _get_actions(state):
+    """Accelerate the RL vehicle of the figure eight at a constant rate.
+
+    Defined at the module level to be serializable.
+    """
+    return [0.5]
+
+
 class TestEmissionToCSV(unittest.TestCase):
     """Tests the emission_to_csv function on a small file.
 
@@ -150,6 +170,57 @@ class TestRegistry(unittest.TestCase):
         self.assertEqual(env.network.__class__.__name__,
                          flow_params["network"].__name__)
 
+    def test_create_env_multiple_times(self):
+        """Tests that the method returned by make_create_env can be called
+        several times, and that the environments it creates share their
+        (read-only) parameters without modifying them."""
+        vehicles = VehicleParams()
+        vehicles.add(
+            veh_id="idm",
+            acceleration_controller=(IDMController, {}),
+            routing_controller=(ContinuousRouter, {}),
+            num_vehicles=5)
+
+        flow_params = dict(
+            exp_tag="ring",
+            env_name=AccelEnv,
+            network=RingNetwork,
+            simulator='traci',
+            sim=SumoParams(sim_step=0.1, render=False),
+            env=EnvParams(
+                horizon=100,
+                additional_params={
+                    "target_velocity": 10,
+                    "max_accel": 1,
+                    "max_decel": 1,
+                    "sort_vehicles": False
+                },
+            ),
+            net=NetParams(
+                additional_params=ADDITIONAL_NET_PARAMS.copy()),
+            veh=vehicles,
+        )
+
+        create_env, env_name = make_create_env(params=flow_params, version=1)
+        env1 = create_env().unwrapped
+        env2 = create_env().unwrapped
+
+        # the environments and their networks are distinct objects
+        self.assertIsNot(env1, env2)
+        self.assertIsNot(env1.network, env2.network)
+        self.assertIsNot(env1.network.vehicles, vehicles)
+
+        # the vehicle types are shared, and the original vehicles and
+        # simulation parameters are left untouched
+        self.assertIs(env1.network.vehicles.type_parameters["idm"],
+                      env2.network.vehicles.type_parameters["idm"])
+        self.assertListEqual(vehicles.ids, env1.initial_ids)
+        self.assertEqual(vehicles.num_types, 1)
+        self.assertIsNone(flow_params["sim"].port)
+
+        env1.terminate()
+        env2.terminate()
+
 
 class TestRllib(unittest.TestCase):
     """Tests the methods located in flow/utils/rllib.py"""
@@ -322,6 +393,227 @@ class TestRllib(unittest.TestCase):
         self.assertTrue(search_dicts(imported_flow_params["veh"].__dict__,
                                      flow_params["veh"].__dict__))
 
+    def test_compute_actions(self):
+        """Tests the batched computation of the actions of multiple agents."""
+        # the spaces clipped by RLlib are those of gym up to ray 0.8, and
+        # those of gymnasium in later versions
+        try:
+            from ray.rllib.evaluation.sampler import clip_action  # noqa: F401
+            from gym.spaces import Box
+        except ImportError:
+            from gymnasium.spaces import Box
+
+        class Policy:
+            action_space = Box(low=-5, high=5, shape=())
+
+            def __init__(self, scale):
+                self.scale = scale
+                self.num_calls = 0
+
+            def get_initial_state(self):
+                return [np.zeros(1)]
+
+            def compute_actions(self, obs_batch, state_batches=None):
+                self.num_calls += 1
+                # the state counts the number of actions of every agent
+                state_out = [state_batches[0] + 1] if state_batches else []
+                return self.scale * obs_batch.sum(axis=1), state_out, {}
+
+        class Preprocessor:
+            def transform(self, obs):
+                return np.asarray(obs, dtype=float)
+
+        class Worker:
+            preprocessors = collections.defaultdict(Preprocessor)
+            filters = collections.defaultdict(
+                lambda: lambda obs, update: obs)
+
+        class Agent:
+            workers = collections.namedtuple(
+                "WorkerSet", "local_worker")(local_worker=Worker)
+
+            def __init__(self, clip_actions=False):
+                self.policies = {"av": Policy(1), "human": Policy(-1)}
+                self.config = {"clip_actions": clip_actions}
+
+            def get_policy(self, policy_id):
+                return self.policies[policy_id]
+
+        agent = Agent()
+        observations = {"av_0": [1, 2], "av_1": [3, 4], "human_0": [5, 6]}
+
+        def policy_mapping_fn(agent_id):
+            return agent_id.split("_")[0]
+
+        # one forward pass per policy
+        actions = compute_actions(agent, observations, policy_mapping_fn)
+        self.assertDictEqual(actions, {"av_0": 3, "av_1": 7, "human_0": -11})
+        self.assertEqual(agent.policies["av"].num_calls, 1)
+        self.assertEqual(agent.policies["human"].num_calls, 1)
+
+        # the recurrent states are initialized and updated in place
+        states = {"av_0": [np.array([5.])]}
+        compute_actions(agent, observations, policy_mapping_fn, states)
+        self.assertDictEqual({key: val[0][0] for key, val in states.items()},
+                             {"av_0": 6, "av_1": 1, "human_0": 1})
+
+        # the actions out of the action space are clipped, as in
+        # agent.compute_action, if the agent clips actions
+        agent = Agent(clip_actions=True)
+        actions = compute_actions(agent, observations, policy_mapping_fn)
+        self.assertDictEqual(actions, {"av_0": 3, "av_1": 5, "human_0": -5})
+
+
+class TestBenchmarkKernel(unittest.TestCase):
+    """Tests the comparison of benchmarks in scripts/benchmark_kernel.py"""
+
+    def test_compare(self):
+        def result(steps_per_second, step_ms, headways_us):
+            return {'steps_per_second': steps_per_second,
+                    'phases_ms': {'simulation_step': step_ms},
+                    'functions_us': {'multi_lane_headways': headways_us}}
+
+        baseline = {'networks': {
+            'ring': {'1': result(100, 5, 10), '2': result(50, 10, 20)},
+            'merge': {'1': {'error': 'KeyError()'}, '2': result(50, 10, 20)},
+        }}
+        results = {'networks': {
+            # within the tolerance, and slower by more than the tolerance
+            'ring': {'1': result(95, 5.4, 10), '2': result(40, 12, 20)},
+            # failing in both, and newly failing
+            'merge': {'1': {'error': 'KeyError()'},
+                      '2': {'error': 'ValueError()'}},
+            # not in the baseline
+            'highway': {'1': result(1, 100, 100)},
+        }}
+
+        self.assertListEqual(compare(results, baseline, tolerance=0.1), [
+            ('ring/2/steps_per_second', 50, 40),
+            ('ring/2/phases_ms/simulation_step', 10, 12),
+            ('merge/2/error', 50, 'ValueError()'),
+        ])
+
+        # no regressions against itself, or with a large enough tolerance
+        self.assertListEqual(compare(baseline, baseline, tolerance=0), [])
+        self.assertListEqual(compare(results, baseline, tolerance=1), [
+            ('merge/2/error', 50, 'ValueError()'),
+        ])
+
+
+class TestRunCatalog(unittest.TestCase):
+    """Tests the run catalog located in flow/utils/catalog.py"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.catalog = os.path.join(self.dir.name, 'catalog.jsonl')
+
+        # two experiments of two runs each, with different numbers of vehicles
+        for num_vehicles in [2, 3]:
+            emission_files = []
+            for run in range(2):
+                path = os.path.join(
+                    self.dir.name, 'ring_{}-{}_emission.csv'.format(
+                        num_vehicles, run))
+                with open(path, 'w') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(['time', 'id', 'speed', 'leader_id'])
+                    for t in range(3):
+                        for i in range(num_vehicles):
+                            leader = 'veh_{}'.format(i + 1) \
+                                if i + 1 < num_vehicles else ''
+                            writer.writerow([0.1 * t, 'veh_{}'.format(i),
+                                             run + t, leader])
+                emission_files.append(path)
+            write_catalog(self.catalog, emission_files,
+                          {'exp_tag': 'ring', 'veh': num_vehicles},
+                          params={'N_VEHICLES': num_vehicles})
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_read_catalog(self):
+        manifest = read_catalog(self.catalog)
+        self.assertListEqual(list(manifest.run_id),
+                             ['ring_2-0', 'ring_2-1', 'ring_3-0', 'ring_3-1'])
+        self.assertListEqual(list(manifest.N_VEHICLES), [2, 2, 3, 3])
+        self.assertListEqual(list(manifest.run), [0, 1, 0, 1])
+        self.assertEqual(manifest.flow_params_hash[0],
+                         params_hash({'veh': 2, 'exp_tag': 'ring'}))
+        self.assertNotEqual(manifest.flow_params_hash[0],
+                            manifest.flow_params_hash[2])
+        self.assertTrue(all(os.path.exists(path) for path in manifest.path))
+
+    def test_filters(self):
+        # runs that are filtered out are never read, nor cached
+        df = load_runs(self.catalog, filters={'N_VEHICLES': 3, 'run': [1]},
+                       num_workers=1)
+        self.assertListEqual(list(df.run_id.unique()), ['ring_3-1'])
+        self.assertEqual(len(df), 9)
+        self.assertListEqual(os.listdir(os.path.join(self.dir.name, '.cache')),
+                             ['ring_3-1.npz'])
+
+        df = load_runs(self.catalog, filters={'N_VEHICLES': lambda n: n < 3},
+                       num_workers=1, use_cache=False)
+        self.assertListEqual(list(df.run_id.unique()), ['ring_2-0', 'ring_2-1'])
+
+        self.assertRaises(KeyError, load_runs, self.catalog,
+                          filters={'MAX_SPEED': 30})
+
+    def test_cache(self):
+        expected = load_runs(self.catalog, num_workers=1, use_cache=False)
+
+        # the cache is created by parallel workers, and then reused
+        df = load_runs(self.catalog, num_workers=2)
+        cache = os.path.join(self.dir.name, '.cache', 'ring_2-0.npz')
+        mtime = os.path.getmtime(cache)
+        cached = load_runs(self.catalog, num_workers=2)
+        self.assertEqual(os.path.getmtime(cache), mtime)
+
+        for df_ in [df, cached]:
+            self.assertListEqual(list(df_.columns), list(expected.columns))
+            self.assertListEqual(list(df_.id.astype(str)),
+                                 list(expected.id.astype(str)))
+            self.assertListEqual(list(df_.speed), list(expected.speed))
+            self.assertListEqual(list(df_.leader_id.isna()),
+                                 list(expected.leader_id.isna()))
+
+        # columns are read individually from the cache
+        df = load_runs(self.catalog, columns=['speed'], num_workers=1)
+        self.assertListEqual(list(df.columns),
+                             ['speed', 'N_VEHICLES', 'run', 'run_id'])
+
+
+class TestEvaluate(unittest.TestCase):
+    """Tests the evaluation methods in flow/utils/leaderboard/evaluate.py"""
+
+    def tearDown(self):
+        ray.shutdown()
+
+    def test_evaluate_policy_num_workers(self):
+        # the runs are split among the workers, and the statistics of every
+        # run are returned
+        mean, std, info = evaluate_policy(
+            "figureeight0", _get_actions, num_workers=2, num_runs=2,
+            return_info=True)
+        self.assertEqual(len(info["returns"]), 2)
+        for key in ["velocities", "outflows", "inflows"]:
+            self.assertEqual(len(info[key]), 2)
+        self.assertAlmostEqual(mean, np.mean(info["returns"]))
+        self.assertAlmostEqual(std, np.std(info["returns"]))
+
+    def test_compute_action_rllib_serializable(self):
+        # the agent is not restored until actions are computed, and only the
+        # location of its checkpoint is serialized
+        compute_action = get_compute_action_rllib("/tmp/results/", 10, "PPO")
+        compute_action._compute = _get_actions
+        copy = pickle.loads(pickle.dumps(compute_action))
+        self.assertIsNone(copy._compute)
+        self.assertEqual(copy.path_to_dir, "/tmp/results/")
+        self.assertEqual(copy.checkpoint_num, 10)
+        self.assertEqual(copy.alg, "PPO")
+        self.assertFalse(copy.multiagent)
+        self.assertEqual(compute_action([0]), [0.5])
+
 
 if __name__ == '__main__':
     unittest.main()
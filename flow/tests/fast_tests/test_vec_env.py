@@ -0,0 +1,138 @@
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from flow.controllers import IDMController, RLController, ContinuousRouter
+from flow.core.params import EnvParams, SumoParams, VehicleParams
+from flow.utils.vec_env import SharedMemoryVecEnv
+from tests.setup_scripts import ring_road_exp_setup
+
+os.environ["TEST_FLAG"] = "True"
+
+HORIZON = 10
+
+
+def make_env():
+    """Create a ring road with one RL vehicle and a short horizon."""
+    vehicles = VehicleParams()
+    vehicles.add(
+        veh_id="rl",
+        acceleration_controller=(RLController, {}),
+        routing_controller=(ContinuousRouter, {}),
+        num_vehicles=1)
+    vehicles.add(
+        veh_id="idm",
+        acceleration_controller=(IDMController, {}),
+        routing_controller=(ContinuousRouter, {}),
+        num_vehicles=5)
+
+    env_params = EnvParams(
+        horizon=HORIZON,
+        additional_params={
+            "target_velocity": 8,
+            "max_accel": 1,
+            "max_decel": 1,
+            "sort_vehicles": False,
+        })
+
+    env, _, _ = ring_road_exp_setup(
+        sim_params=SumoParams(sim_step=0.1),
+        vehicles=vehicles,
+        env_params=env_params)
+    return env
+
+
+class TestSharedMemoryVecEnv(unittest.TestCase):
+    """Tests the vectorized environment in flow/utils/vec_env.py."""
+
+    def setUp(self):
+        self.vec_env = SharedMemoryVecEnv([make_env, make_env])
+
+    def tearDown(self):
+        self.vec_env.close()
+
+    def test_spaces(self):
+        env = make_env()
+        self.assertEqual(self.vec_env.num_envs, 2)
+        self.assertEqual(self.vec_env.observation_space,
+                         env.observation_space)
+        self.assertEqual(self.vec_env.action_space, env.action_space)
+        env.terminate()
+
+    def test_init(self):
+        # the environments are only created in the worker processes
+        main_pid = os.getpid()
+
+        def make_worker_env():
+            if os.getpid() == main_pid:
+                raise AssertionError('Environment created in the main process.')
+            return make_env()
+
+        vec_env = SharedMemoryVecEnv([make_worker_env])
+        self.assertEqual(vec_env.observation_space,
+                         self.vec_env.observation_space)
+        vec_env.close()
+
+        # the errors raised when creating the environments are forwarded
+        def make_failing_env():
+            raise ValueError('Could not create the environment.')
+
+        self.assertRaises(RuntimeError, SharedMemoryVecEnv,
+                          [make_env, make_failing_env])
+
+        # without shared memory (python < 3.8), no worker is started
+        with mock.patch('flow.utils.vec_env.shared_memory', None):
+            self.assertRaises(ImportError, SharedMemoryVecEnv,
+                              [make_worker_env])
+
+    def test_step(self):
+        # the vectorized environments match environments stepped in the main
+        # process with the same actions
+        envs = [make_env(), make_env()]
+        obs = self.vec_env.reset()
+        np.testing.assert_array_almost_equal(
+            obs, [env.reset() for env in envs])
+
+        for t in range(HORIZON - 1):
+            actions = np.array([[1.], [-1.]]) * (t % 3 - 1)
+            obs, rewards, dones, _ = self.vec_env.step(actions)
+
+            expected = [env.step(action) for env, action in
+                        zip(envs, actions)]
+            np.testing.assert_array_almost_equal(
+                obs, [res[0] for res in expected])
+            np.testing.assert_array_almost_equal(
+                rewards, [res[1] for res in expected])
+            self.assertListEqual(dones.tolist(), [False, False])
+
+        for env in envs:
+            env.terminate()
+
+    def test_auto_reset(self):
+        initial_obs = self.vec_env.reset()
+        for _ in range(HORIZON):
+            obs, _, dones, infos = self.vec_env.step(np.ones((2, 1)))
+
+        # the environments are reset as soon as they are done, and their last
+        # observation is returned with the info dict
+        self.assertListEqual(dones.tolist(), [True, True])
+        np.testing.assert_array_almost_equal(obs, initial_obs)
+        for info in infos:
+            self.assertIn('terminal_observation', info)
+
+    def test_async(self):
+        self.vec_env.reset()
+
+        # only the first environment is stepped
+        self.vec_env.step_async(np.ones((1, 1)), env_ids=[0])
+        self.assertListEqual(self.vec_env.ready_ids(timeout=10), [0])
+        obs, _, _, _ = self.vec_env.step_wait(env_ids=[0])
+        self.assertEqual(obs.shape, (1,) + self.vec_env.observation_space.shape)
+
+        self.assertListEqual(self.vec_env.get_attr('step_counter'), [1, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
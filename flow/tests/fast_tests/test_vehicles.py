@@ -567,6 +567,100 @@ class TestIdsByEdge(unittest.TestCase):
         expected_ids = ["test_0", "test_1", "test_2", "test_3", "test_4"]
         self.assertCountEqual(ids, expected_ids)
 
+    def test_ids_by_edge_list(self):
+        self.env.reset()
+        ids = self.env.k.vehicle.get_ids_by_edge(["bottom", "right"])
+        self.assertEqual(
+            ids, self.env.k.vehicle.get_ids_by_edge("bottom") +
+            self.env.k.vehicle.get_ids_by_edge("right"))
+
+    def test_ids_by_edge_updates(self):
+        self.env.reset()
+        for _ in range(50):
+            self.env.step(rl_actions=None)
+
+            # every vehicle is stored in its edge (and only there), and the
+            # vehicles in an edge are sorted by position
+            ids_by_edge = self.env.k.vehicle._ids_by_edge
+            self.assertCountEqual(
+                [veh_id for ids in ids_by_edge.values() for veh_id in ids],
+                self.env.k.vehicle.get_ids())
+            for edge, ids in ids_by_edge.items():
+                self.assertTrue(len(ids) > 0)
+                self.assertListEqual(
+                    self.env.k.vehicle.get_edge(ids), [edge] * len(ids))
+                pos = self.env.k.vehicle.get_position(ids)
+                self.assertListEqual(pos, sorted(pos))
+
+        # removed vehicles are removed from their edge
+        veh_id = self.env.k.vehicle.get_ids_by_edge("bottom")[0]
+        self.env.k.vehicle.remove(veh_id)
+        self.env.step(rl_actions=None)
+        self.assertNotIn(veh_id, self.env.k.vehicle.get_ids_by_edge(
+            self.env.k.network.get_edge_list()))
+
+    def test_closest_to_edge_end(self):
+        self.env.reset()
+        ids = self.env.k.vehicle.get_closest_to_edge_end("bottom", 3)
+        self.assertEqual(ids, ["test_4", "test_3", "test_2"])
+
+        ids = self.env.k.vehicle.get_closest_to_edge_end("bottom", 10)
+        self.assertEqual(
+            ids, ["test_4", "test_3", "test_2", "test_1", "test_0"])
+
+        self.assertEqual(
+            self.env.k.vehicle.get_closest_to_edge_end("no_edge", 3), [])
+
+    def test_num_vehicles_and_mean_speed_by_edge(self):
+        self.env.reset()
+        self.assertEqual(
+            self.env.k.vehicle.get_num_vehicles_by_edge("bottom"), 5)
+        self.assertEqual(
+            self.env.k.vehicle.get_num_vehicles_by_edge("no_edge"), 0)
+
+        self.env.k.vehicle.test_set_speed("test_0", 5)
+        self.assertAlmostEqual(
+            self.env.k.vehicle.get_mean_speed_by_edge("bottom"), 1)
+        self.assertEqual(
+            self.env.k.vehicle.get_mean_speed_by_edge("no_edge", error=-1),
+            -1)
+
+    def test_closest_to_edge_end_multi_lane(self):
+        # vehicles changing lanes on a highway with three lanes and edges
+        vehicles = VehicleParams()
+        vehicles.add(veh_id="test",
+                     acceleration_controller=(IDMController, {}),
+                     lane_change_params=SumoLaneChangeParams(
+                         lane_change_mode="strategic"),
+                     num_vehicles=30)
+        net_params = NetParams(additional_params={
+            "length": 600, "lanes": 3, "speed_limit": 30, "num_edges": 3,
+            "use_ghost_edge": False, "ghost_speed_limit": 25,
+            "boundary_cell_length": 300})
+        env, _, _ = highway_exp_setup(
+            sim_params=SumoParams(sim_step=0.1, render=False),
+            net_params=net_params,
+            vehicles=vehicles,
+            initial_config=InitialConfig(lanes_distribution=3))
+        env.reset()
+
+        for _ in range(50):
+            env.step(rl_actions=None)
+
+            # the vehicles of every edge are sorted by decreasing position
+            # across lanes
+            vehicle = env.k.vehicle
+            for edge in env.k.network.get_edge_list():
+                ids = vehicle.get_ids_by_edge(edge)
+                self.assertEqual(vehicle.get_num_vehicles_by_edge(edge),
+                                 len(ids))
+                closest = vehicle.get_closest_to_edge_end(edge, len(ids))
+                self.assertCountEqual(closest, ids)
+                pos = vehicle.get_position(closest)
+                self.assertListEqual(pos, sorted(pos, reverse=True))
+
+        env.terminate()
+
 
 class TestObservedIDs(unittest.TestCase):
     """Tests the observed_ids methods, which are used for visualization."""
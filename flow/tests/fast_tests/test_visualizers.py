@@ -8,8 +8,11 @@ import os
 import unittest
 import ray
 import numpy as np
+import pandas as pd
 import contextlib
+import tempfile
 from io import StringIO
+from unittest import mock
 
 os.environ['TEST_FLAG'] = 'True'
 
@@ -312,6 +315,87 @@ class TestPlotters(unittest.TestCase):
 
         np.testing.assert_array_almost_equal(segs, expected_segs)
 
+    def test_time_space_diagram_chunks(self):
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        flow_params = tsd.get_flow_params(
+            os.path.join(dir_path, 'test_files/ring_230.json'))
+
+        # three vehicles on a 230m ring, with samples ordered by time
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fp = os.path.join(tmp_dir, 'ring_emission.csv')
+            with open(fp, 'w') as f:
+                f.write('time,id,speed,edge_id,lane_number,relative_position\n')
+                for t in range(1, 5):
+                    for i, edge in enumerate(['bottom', 'top', ':left_0']):
+                        f.write('{},veh_{},1,{},0,{}\n'.format(
+                            0.1 * t, i, edge, 0.01 * t))
+
+            emission_data = tsd.import_data_from_trajectory(fp, flow_params)
+            chunks = list(tsd.iter_data_from_trajectory(fp, flow_params, chunksize=2))
+            time_slice = tsd.import_data_from_trajectory(
+                fp, flow_params, chunksize=2, time_range=(0.15, 0.35))
+
+        # the positions are the edge starts plus the relative positions
+        np.testing.assert_array_almost_equal(
+            emission_data['distance'][:3], [0.01, 115.21, 172.71])
+        np.testing.assert_array_almost_equal(
+            emission_data['next_pos'][:3], [0.02, 115.22, 172.72])
+
+        # the chunks complete the segments split between chunks
+        self.assertGreater(len(chunks), 1)
+        chunked_data = pd.concat(chunks).loc[emission_data.index]
+        for col in ['time_step', 'distance', 'next_time', 'next_pos']:
+            np.testing.assert_array_almost_equal(
+                chunked_data[col], emission_data[col])
+        np.testing.assert_array_almost_equal(
+            sorted(time_slice['time_step']), [0.2] * 3 + [0.3] * 3)
+
+    def test_time_space_diagram_chunks_departures(self):
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        flow_params = tsd.get_flow_params(
+            os.path.join(dir_path, 'test_files/ring_230.json'))
+
+        # five vehicles at every time step, one of which leaves the network
+        # and is replaced by a new vehicle at every step
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fp = os.path.join(tmp_dir, 'ring_emission.csv')
+            with open(fp, 'w') as f:
+                f.write('time,id,speed,edge_id,lane_number,relative_position\n')
+                for t in range(1, 21):
+                    for i in range(t - 1, t + 4):
+                        f.write('{},veh_{},1,bottom,0,{}\n'.format(
+                            0.1 * t, i, t + 0.1 * i))
+
+            emission_data = tsd.import_data_from_trajectory(fp, flow_params)
+            for chunksize in [3, 7]:
+                with mock.patch.object(tsd.pd, 'concat', wraps=pd.concat) as concat:
+                    chunks = list(tsd.iter_data_from_trajectory(
+                        fp, flow_params, chunksize=chunksize))
+
+                # the segments are the same as when reading the whole file
+                chunked_data = pd.concat(chunks).loc[emission_data.index]
+                for col in ['time_step', 'distance', 'next_time', 'next_pos']:
+                    np.testing.assert_array_almost_equal(
+                        chunked_data[col], emission_data[col])
+
+                # the samples of the vehicles that left are not carried over
+                pending = [len(call[0][0][0]) for call in concat.call_args_list]
+                self.assertLessEqual(max(pending), 5 + chunksize)
+
+    def test_time_space_diagram_raster(self):
+        data = pd.DataFrame({
+            'time_step': [0., 0.5, 1., 1.5, 0., 0.5],
+            'distance': [0., 1., 2., 3., 12., 13.],
+            'speed': [2., 4., 6., 8., 1., 3.],
+        })
+
+        grid, extent = tsd.rasterize_time_space(data, time_bin=1., space_bin=5.)
+
+        # the speeds are averaged within 1s x 5m cells, and empty cells are nan
+        np.testing.assert_array_almost_equal(
+            grid, [[3., 7.], [np.nan, np.nan], [2., np.nan]])
+        self.assertTupleEqual(extent, (0., 2., 0., 15.))
+
     def test_plot_ray_results(self):
         dir_path = os.path.dirname(os.path.realpath(__file__))
         file_path = os.path.join(dir_path, 'test_files/progress.csv')
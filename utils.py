@@ -3,36 +3,19 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt 
 import seaborn as sns
+from headways import add_headways, arc_headways, euclidean_headways, \
+    leader_offsets
 sns.set_style("whitegrid")
 
-# Later found out this is headway
-def get_leader_distances(rundf, ncars):
-    leader_distances = []
-    for idm in rundf.id.unique():
-        leader_id = f'idm_{(int(idm.split("_")[1]) + 1) % ncars}'
-        leader_dist = np.linalg.norm(
-            rundf[rundf.id == idm][['x','y']].to_numpy() - rundf[rundf.id == leader_id][['x','y']].to_numpy()
-            , axis=1) 
-        leader_distances.append(pd.Series(leader_dist))
-    return pd.concat(leader_distances, ignore_index=True)
+# Later found out this is headway. The leaders are read from the recorded
+# leader_id column (ncars is kept for backwards compatibility)
+def get_leader_distances(rundf, ncars=None):
+    return pd.Series(euclidean_headways(leader_offsets(rundf)),
+                     index=rundf.index)
 
 # Later found out this is headway
-def get_leader_arc_distances(rundf, ncars):
-    leader_distances = []
-    for idm in rundf.id.unique():
-        leader_id = f'idm_{(int(idm.split("_")[1]) + 1) % ncars}'
-        
-        car_pos = rundf[rundf.id == idm][['x','y']].to_numpy() - 100
-        leader_pos = rundf[rundf.id == leader_id][['x','y']].to_numpy() - 100
-        
-        diff = leader_pos - car_pos
-        leader_dist = 100*np.abs(np.arctan2(diff[:,1], diff[:,0]))
-        
-        
-        diff = rundf[rundf.id == idm][['x','y']].to_numpy() -  rundf[rundf.id == leader_id][['x','y']].to_numpy()
-
-        leader_distances.append(pd.Series(leader_dist))
-    return pd.concat(leader_distances, ignore_index=True)
+def get_leader_arc_distances(rundf, ncars=None):
+    return pd.Series(arc_headways(leader_offsets(rundf)), index=rundf.index)
 
 
 def load_baseline_exp():
@@ -44,8 +27,7 @@ def load_baseline_exp():
             rundf['acc'] = 2
             rundf['vel'] = 30
             rundf['course'] = course
-            rundf['leader_dist'] = get_leader_distances(rundf, ncars)
-            rundf['leader_arc_dist'] = get_leader_arc_distances(rundf, ncars)
+            add_headways(rundf)
             expdfs.append(rundf)
 
         for acc in [.5,1,1.5,2,2.5,3,3.5,4]:
@@ -54,8 +36,7 @@ def load_baseline_exp():
             rundf['acc'] = acc
             rundf['vel'] = 30
             rundf['course'] = course
-            rundf['leader_dist'] = get_leader_distances(rundf, 20)
-            rundf['leader_arc_dist'] = get_leader_arc_distances(rundf, 20)
+            add_headways(rundf)
             expdfs.append(rundf)
 
         for vel in range(5,35,5):
@@ -64,8 +45,7 @@ def load_baseline_exp():
             rundf['acc'] = 2
             rundf['vel'] = vel
             rundf['course'] = course
-            rundf['leader_dist'] = get_leader_distances(rundf, 20)
-            rundf['leader_arc_dist'] = get_leader_arc_distances(rundf, 20)
+            add_headways(rundf)
             expdfs.append(rundf)
 
     all_car_df = pd.concat(expdfs)